@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import shutil
+import threading
+
+from shard_queue import FileLock
+
+# แคชไฟล์แบบ content-addressed สำหรับภาพและเสียงที่สร้างขึ้น
+# ไฟล์จะถูกเก็บตาม hash ของค่าที่ใช้สร้าง (prompt, ข้อความ, การตั้งค่าโมเดล ฯลฯ)
+# ทำให้ฉากที่ไม่เปลี่ยนแปลงไม่ต้องสร้างใหม่ แม้จะสลับลำดับฉากหรือใช้ในหลายสคริปต์
+# หลาย process (เช่น worker ของ shard.py) ใช้แคชเดียวกันได้: ก่อนเขียน manifest จะอ่านของเดิมบนดิสก์มารวมภายใต้ lock
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_LOCK_NAME = "manifest.lock"
+
+
+def make_key(**params):
+    """
+    สร้างคีย์ของแคชจากพารามิเตอร์ที่ใช้สร้างไฟล์
+
+    Args:
+        **params: ค่าที่มีผลต่อผลลัพธ์ เช่น prompt, model_id, steps, seed
+
+    Returns:
+        สตริง hash (sha256) ที่ใช้เป็นคีย์ของแคช
+    """
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def image_cache_key(prompt, negative_prompt, model_id, steps, guidance_scale, width, height, seed,
+                    profile="default"):
+    """
+    สร้างคีย์สำหรับภาพที่สร้างด้วย Stable Diffusion
+    (โปรไฟล์ default ไม่อยู่ในคีย์ เพื่อให้ภาพที่แคชไว้ก่อนมีโปรไฟล์ยังใช้ได้)
+    """
+    extra = {"profile": profile} if profile != "default" else {}
+    return make_key(
+        kind="image",
+        prompt=prompt,
+        negative_prompt=negative_prompt,
+        model_id=model_id,
+        steps=steps,
+        guidance_scale=guidance_scale,
+        width=width,
+        height=height,
+        seed=seed,
+        **extra,
+    )
+
+
+def speech_cache_key(text, lang, engine, slow=False):
+    """
+    สร้างคีย์สำหรับไฟล์เสียงพูดที่สร้างด้วย Text-to-Speech
+    """
+    return make_key(kind="speech", text=text, lang=lang, engine=engine, slow=slow)
+
+
+class AssetCache:
+    """
+    แคชไฟล์บนดิสก์พร้อม manifest และการลบไฟล์เก่าแบบ LRU เมื่อขนาดรวมเกินกำหนด
+
+    Args:
+        root: โฟลเดอร์ที่ใช้เก็บไฟล์ของแคช
+        extension: นามสกุลไฟล์ เช่น ".png" หรือ ".mp3"
+        max_bytes: ขนาดรวมสูงสุดของแคช (None = ไม่จำกัด)
+        flush_interval: การเปลี่ยนแปลงจาก get และ put จะเขียนลง manifest ไม่บ่อยกว่าทุกกี่วินาที
+            (ส่วนที่ค้างอยู่เขียนเมื่อเรียก flush หรือตอนจบ process)
+    """
+
+    def __init__(self, root, extension, max_bytes=None, flush_interval=5.0):
+        self.root = root
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.manifest_lock_path = os.path.join(root, MANIFEST_LOCK_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._entries = self._load_manifest()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError) as e:
+            print(f"ไม่สามารถอ่าน manifest ของแคชได้ ({e}) จะเริ่มแคชใหม่")
+            return {}
+
+    def _merge(self, disk_entries):
+        # รวม manifest บนดิสก์ (ที่ process อื่นเขียน) กับรายการของ process นี้
+        # รายการที่มีเพียงฝั่งเดียวเก็บไว้เฉพาะเมื่อไฟล์ยังอยู่ (อีกฝั่งอาจลบไฟล์ออกจากแคชไปแล้ว)
+        merged = {}
+        for key in disk_entries.keys() | self._entries.keys():
+            ours, theirs = self._entries.get(key), disk_entries.get(key)
+            if ours is not None and theirs is not None:
+                merged[key] = dict(ours, last_used=max(ours["last_used"], theirs["last_used"]))
+                continue
+            entry = ours or theirs
+            if os.path.exists(os.path.join(self.root, key[:2], key + entry["extension"])):
+                merged[key] = entry
+        return merged
+
+    def _save_manifest(self):
+        with FileLock(self.manifest_lock_path):
+            self._entries = self._merge(self._load_manifest())
+            # นับขนาดรวมจากรายการของทุก process
+            self._evict()
+            # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ manifest เสียหายถ้าโปรแกรมหยุดกลางคัน
+            temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries}, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.manifest_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _mark_dirty(self):
+        # การเปลี่ยนแปลงเขียนรวมกันเป็นระยะ ไม่เขียน manifest ทั้งไฟล์ทุกครั้ง
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.flush_interval:
+            self._save_manifest()
+
+    def flush(self):
+        """
+        เขียนการเปลี่ยนแปลงที่ยังค้างอยู่ลง manifest
+        """
+        with self._lock:
+            if self._dirty:
+                self._save_manifest()
+
+    def path_for(self, key, extension=None):
+        """
+        คืนเส้นทางของไฟล์ในแคชสำหรับคีย์ที่กำหนด (แยกโฟลเดอร์ย่อยตาม 2 ตัวอักษรแรก)
+        """
+        if extension is None:
+            extension = self._entries.get(key, {}).get("extension", self.extension)
+        return os.path.join(self.root, key[:2], key + extension)
+
+    def get(self, key):
+        """
+        ค้นหาไฟล์ในแคช
+
+        Args:
+            key: คีย์ของแคช
+
+        Returns:
+            เส้นทางของไฟล์ถ้ามีในแคช หรือ None ถ้าไม่มี
+        """
+        with self._lock:
+            entry = self._entries.get(key) or self._adopt(key)
+            path = self.path_for(key)
+            if entry is None or not os.path.exists(path):
+                if entry is not None:
+                    # ไฟล์ถูกลบไปนอกแคช ลบรายการออกจาก manifest
+                    del self._entries[key]
+                    self._mark_dirty()
+                return None
+            entry["last_used"] = time.time()
+            self._mark_dirty()
+        return path
+
+    def put(self, key, source_path, meta=None):
+        """
+        ย้ายไฟล์ที่สร้างเสร็จแล้วเข้าแคช
+
+        Args:
+            key: คีย์ของแคช
+            source_path: ไฟล์ที่สร้างเสร็จแล้ว (จะถูกย้ายเข้าแคช)
+            meta: ข้อมูลเพิ่มเติมที่ต้องการเก็บใน manifest
+
+        Returns:
+            เส้นทางของไฟล์ในแคช
+        """
+        # ใช้นามสกุลของไฟล์ที่สร้างได้ (เช่น .wav จากเอนจิน TTS แบบ local)
+        extension = os.path.splitext(source_path)[1] or self.extension
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(source_path, path)
+        except OSError:
+            # ข้ามไดรฟ์ไม่สามารถ rename ได้ ให้คัดลอกไปเป็นไฟล์ชั่วคราวแล้วค่อยแทนที่
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+            os.remove(source_path)
+
+        with self._lock:
+            now = time.time()
+            self._entries[key] = {
+                "size": os.path.getsize(path),
+                "extension": extension,
+                "created": now,
+                "last_used": now,
+                "meta": meta or {},
+            }
+            self._evict(keep=key)
+            self._mark_dirty()
+        return path
+
+    def _adopt(self, key):
+        # ไฟล์ที่ process อื่นใส่ไว้ในแคชเดียวกัน (เช่น worker ของ shard.py) อาจยังไม่อยู่ใน manifest ของ process นี้
+        folder = os.path.join(self.root, key[:2])
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            return None
+        for name in names:
+            stem, extension = os.path.splitext(name)
+            if stem == key:
+                path = os.path.join(folder, name)
+                now = time.time()
+                self._entries[key] = {
+                    "size": os.path.getsize(path),
+                    "extension": extension,
+                    "created": os.path.getmtime(path),
+                    "last_used": now,
+                    "meta": {},
+                }
+                return self._entries[key]
+        return None
+
+    def total_bytes(self):
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def _evict(self, keep=None):
+        # ลบไฟล์ที่ไม่ได้ใช้นานที่สุดจนกว่าขนาดรวมจะไม่เกิน max_bytes
+        if self.max_bytes is None:
+            return
+        total = self.total_bytes()
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del self._entries[key]
+            print(f"ลบไฟล์เก่าออกจากแคช: {key[:12]}...")
@@ -0,0 +1,239 @@
+import math
+import struct
+import subprocess
+
+from video_assembly import get_ffmpeg_exe
+
+# ประกอบเสียงของทั้งวิดีโอเป็น track เดียวก่อนส่งให้ encoder
+#
+# - ถอดรหัสเสียงพูดของแต่ละฉากเป็น PCM (NumPy) เพียงครั้งเดียว แล้วเก็บเป็น .npy ในแคช
+#   รันใหม่จะเปิดไฟล์ .npy แบบ memory-mapped แทนการถอดรหัส MP3 ซ้ำ
+# - ปรับความดังของเสียงพูดแต่ละฉากให้เท่ากัน (integrated loudness แบบ ITU-R BS.1770 คำนวณด้วย NumPy)
+# - วางเสียงของแต่ละฉากที่ต้นช่วงของฉาก ส่วนที่เหลือของ duration (เสียง + 1 วินาที) เป็นความเงียบ
+# - เพลงประกอบ (ถ้ามี) วนซ้ำตลอดวิดีโอ และลดเสียงลงอัตโนมัติเมื่อมีเสียงพูด (ducking)
+#
+# track เขียนลงไฟล์ WAV ที่เปิดแบบ memory-mapped ทีละฉาก หน่วยความจำจึงไม่เพิ่มตามความยาววิดีโอ
+
+SAMPLE_RATE = 44100
+
+# ค่าต่ำกว่านี้ถือว่าเงียบ (dBFS) ใช้หาช่วงที่มีเสียงพูดสำหรับ ducking
+_SPEECH_THRESHOLD_DB = -45.0
+
+# ระยะเวลาที่เสียงเพลงค่อย ๆ ลดและกลับเมื่อเริ่มและหยุดพูด (วินาที)
+_DUCK_SMOOTHING = 0.3
+
+
+def decode(path, sample_rate=SAMPLE_RATE, channels=1):
+    """
+    ถอดรหัสไฟล์เสียงเป็น array float32 ด้วย ffmpeg
+
+    Args:
+        path: ไฟล์เสียง (MP3, WAV ฯลฯ)
+        sample_rate: อัตราสุ่มที่ต้องการ
+        channels: 1 = (จำนวน sample,) หรือ 2 = (จำนวน sample, 2)
+    """
+    import numpy as np
+
+    ffmpeg = get_ffmpeg_exe()
+    if ffmpeg is None:
+        raise RuntimeError("ไม่พบ ffmpeg")
+    completed = subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", path,
+         "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate), "pipe:1"],
+        check=True, capture_output=True)
+    samples = np.frombuffer(completed.stdout, dtype=np.float32)
+    return samples if channels == 1 else samples.reshape(-1, channels)
+
+
+def _biquad(kind, sample_rate, frequency, q, gain_db=0.0):
+    # สัมประสิทธิ์ของ filter ตาม Audio EQ Cookbook (ใช้สร้าง K-weighting ที่อัตราสุ่มใดก็ได้)
+    a = 10 ** (gain_db / 40)
+    w0 = 2 * math.pi * frequency / sample_rate
+    alpha = math.sin(w0) / (2 * q)
+    cos_w0 = math.cos(w0)
+    if kind == "high_shelf":
+        root = 2 * math.sqrt(a) * alpha
+        b = [a * ((a + 1) + (a - 1) * cos_w0 + root), -2 * a * ((a - 1) + (a + 1) * cos_w0),
+             a * ((a + 1) + (a - 1) * cos_w0 - root)]
+        den = [(a + 1) - (a - 1) * cos_w0 + root, 2 * ((a - 1) - (a + 1) * cos_w0),
+               (a + 1) - (a - 1) * cos_w0 - root]
+    else:
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    return [value / den[0] for value in b], [value / den[0] for value in den]
+
+
+def _k_weighted(samples, sample_rate):
+    # K-weighting ของ BS.1770 (ใช้ scipy ถ้ามี ไม่เช่นนั้นวัดแบบไม่ถ่วงน้ำหนัก ซึ่งใกล้เคียงกันสำหรับเสียงพูด)
+    try:
+        from scipy.signal import lfilter
+    except ImportError:
+        return samples
+    for kind, frequency, q, gain in (("high_shelf", 1681.97, 1 / math.sqrt(2), 4.0), ("high_pass", 38.135, 0.5, 0.0)):
+        b, a = _biquad(kind, sample_rate, frequency, q, gain)
+        samples = lfilter(b, a, samples, axis=0)
+    return samples
+
+
+def integrated_loudness(samples, sample_rate=SAMPLE_RATE):
+    """
+    integrated loudness (LUFS) ตาม BS.1770: บล็อก 400 ms ซ้อนกัน 75% พร้อม gate -70 LUFS และ gate สัมพัทธ์ -10 LU
+    คำนวณพลังงานของทุกบล็อกพร้อมกันด้วยผลรวมสะสม (cumsum)
+
+    Args:
+        samples: array (n,) สำหรับเสียง mono (วัดแบบเล่นทั้งสองลำโพง) หรือ (n, ช่อง)
+
+    Returns:
+        ความดังเป็น LUFS หรือ -inf ถ้าเงียบ
+    """
+    import numpy as np
+
+    weighted = np.asarray(_k_weighted(np.asarray(samples, dtype=np.float64), sample_rate))
+    if weighted.ndim == 1:
+        power = 2 * weighted ** 2
+    else:
+        power = (weighted ** 2).sum(axis=1)
+    block = int(0.4 * sample_rate)
+    hop = block // 4
+    if len(power) < block:
+        energies = np.array([power.mean()]) if len(power) else np.zeros(0)
+    else:
+        cumulative = np.concatenate([[0.0], np.cumsum(power)])
+        starts = np.arange(0, len(power) - block + 1, hop)
+        energies = (cumulative[starts + block] - cumulative[starts]) / block
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(energies)
+    gated = energies[loudness > -70]
+    if len(gated) == 0:
+        return float("-inf")
+    relative_gate = -0.691 + 10 * math.log10(gated.mean()) - 10
+    with np.errstate(divide="ignore"):
+        gated = gated[-0.691 + 10 * np.log10(gated) > relative_gate]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+def normalize(samples, target=-16.0, peak_db=-1.0, sample_rate=SAMPLE_RATE):
+    """
+    ปรับความดังให้เท่ากับ target (LUFS) โดยไม่ให้ค่าสูงสุดเกิน peak_db (dBFS)
+    """
+    import numpy as np
+
+    loudness = integrated_loudness(samples, sample_rate)
+    if not math.isfinite(loudness):
+        return np.asarray(samples, dtype=np.float32)
+    gain = 10 ** ((target - loudness) / 20)
+    peak = float(np.abs(samples).max())
+    if peak > 0:
+        gain = min(gain, 10 ** (peak_db / 20) / peak)
+    return (np.asarray(samples, dtype=np.float32) * np.float32(gain))
+
+
+def duck_gain(speech, ducking_db=12.0, sample_rate=SAMPLE_RATE, window=0.02, smoothing=_DUCK_SMOOTHING):
+    """
+    อัตราขยายของเพลงประกอบในแต่ละ sample: ลดลง ducking_db เมื่อมีเสียงพูด และค่อย ๆ เปลี่ยน (ไม่กระตุก)
+
+    Args:
+        speech: เสียงพูด (n,)
+        ducking_db: ลดเสียงเพลงลงกี่ dB ขณะมีเสียงพูด
+        window: ความยาวของบล็อกที่ใช้ตรวจว่ามีเสียงพูด (วินาที)
+        smoothing: ระยะเวลาที่เสียงเพลงค่อย ๆ ลดและกลับ (วินาที)
+
+    Returns:
+        array float32 (n,) ของอัตราขยาย
+    """
+    import numpy as np
+
+    count = len(speech)
+    size = max(1, int(window * sample_rate))
+    blocks = -(-count // size)
+    padded = np.zeros(blocks * size, dtype=np.float32)
+    padded[:count] = speech
+    rms = np.sqrt((padded.reshape(blocks, size) ** 2).mean(axis=1))
+    active = (rms > 10 ** (_SPEECH_THRESHOLD_DB / 20)).astype(np.float32)
+    # ขยายช่วงที่มีเสียงพูดออกไปทั้งสองด้านแล้วทำให้เรียบด้วยค่าเฉลี่ยเคลื่อนที่
+    width = max(1, min(blocks, int(smoothing / window)))
+    kernel = np.ones(width, dtype=np.float32) / width
+    active = np.minimum(1.0, np.convolve(active, kernel, mode="same") * 2)
+    active = np.convolve(active, kernel, mode="same")
+    gain_db = -ducking_db * np.repeat(active, size)[:count]
+    return (10 ** (gain_db / 20)).astype(np.float32)
+
+
+def open_wav(path, frames, sample_rate=SAMPLE_RATE, channels=2):
+    """
+    สร้างไฟล์ WAV 16-bit ขนาด frames sample แล้วคืน array แบบ memory-mapped ของข้อมูลเสียง (frames, channels)
+    """
+    import numpy as np
+
+    data_bytes = frames * channels * 2
+    header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1, channels,
+                         sample_rate, sample_rate * channels * 2, channels * 2, 16, b"data", data_bytes)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + data_bytes)
+    return np.memmap(path, dtype="<i2", mode="r+", offset=len(header), shape=(frames, channels))
+
+
+def mix_track(clips, durations, output_path, sample_rate=SAMPLE_RATE, fades=None, music=None,
+              music_gain=1.0, ducking_db=12.0):
+    """
+    ประกอบเสียงทุกฉากเป็นไฟล์ WAV เดียว (stereo 16-bit) ทีละฉาก
+
+    Args:
+        clips: iterator ของเสียงพูดที่ปรับความดังแล้ว (array float32 (n,)) ตามลำดับฉาก
+        durations: ความยาวของแต่ละฉาก (วินาที) ตามลำดับ
+        output_path: ไฟล์ WAV ที่ต้องการ
+        sample_rate: อัตราสุ่ม
+        fades: ระยะเวลาที่เสียงค่อย ๆ เบาลงที่ท้ายแต่ละฉาก (รอยต่อระหว่างฉาก) หรือ None
+        music: เพลงประกอบ array float32 (n, 2) (วนซ้ำตลอดวิดีโอ) หรือ None
+        music_gain: อัตราขยายของเพลงประกอบ
+        ducking_db: ลดเสียงเพลงลงกี่ dB ขณะมีเสียงพูด
+
+    Returns:
+        output_path
+    """
+    import numpy as np
+
+    # ขอบของฉากคำนวณจากเวลาสะสม (ไม่ปัดทีละฉาก) เสียงจึงไม่คลาดจากภาพเมื่อวิดีโอยาว
+    boundaries = np.rint(np.concatenate([[0.0], np.cumsum(durations)]) * sample_rate).astype(np.int64)
+    # ducking ของแต่ละฉากคำนวณรวมกับช่วงท้ายของฉากก่อนหน้าและช่วงต้นของฉากถัดไป
+    # อัตราขยายของเพลงจึงต่อเนื่องข้ามรอยต่อ (ไม่กระโดดเมื่อค่าเฉลี่ยเคลื่อนที่ถูกตัดที่ขอบฉาก)
+    margin = int(2 * _DUCK_SMOOTHING * sample_rate)
+    slots = _scene_slots(clips, boundaries, fades, sample_rate)
+    track = open_wav(output_path, int(boundaries[-1]), sample_rate)
+    try:
+        previous = np.zeros(0, dtype=np.float32)
+        slot = next(slots, None)
+        i = 0
+        while slot is not None:
+            following = next(slots, None)
+            start, end = int(boundaries[i]), int(boundaries[i + 1])
+            mixed = np.repeat(slot[:, None], 2, axis=1)
+            if music is not None and len(music):
+                head = following[:margin] if following is not None else np.zeros(0, dtype=np.float32)
+                gain = duck_gain(np.concatenate([previous, slot, head]), ducking_db, sample_rate)
+                gain = gain[len(previous):len(previous) + len(slot)] * np.float32(music_gain)
+                positions = np.arange(start, end) % len(music)
+                mixed += music[positions] * gain[:, None]
+            track[start:end] = np.rint(np.clip(mixed, -1.0, 1.0) * 32767).astype("<i2")
+            previous = slot[-margin:]
+            slot = following
+            i += 1
+        track.flush()
+    finally:
+        del track
+    return output_path
+
+
+def _scene_slots(clips, boundaries, fades, sample_rate):
+    # เสียงพูดของแต่ละฉากที่เติมความเงียบจนยาวเท่าช่วงของฉาก (และเฟดท้ายฉากถ้ามีรอยต่อ)
+    import numpy as np
+
+    for i, clip in enumerate(clips):
+        slot = np.zeros(int(boundaries[i + 1] - boundaries[i]), dtype=np.float32)
+        length = min(len(clip), len(slot))
+        slot[:length] = clip[:length]
+        if fades and fades[i]:
+            fade = min(len(slot), int(round(fades[i] * sample_rate)))
+            slot[len(slot) - fade:] *= np.linspace(1, 0, fade, dtype=np.float32)
+        yield slot
@@ -0,0 +1,239 @@
+import os
+import json
+import atexit
+import struct
+import threading
+
+# อ่านความยาวของไฟล์เสียงจาก header ของไฟล์โดยตรง (WAV และ MP3) โดยไม่ต้อง import librosa
+# ถ้าอ่าน header ไม่ได้จะใช้ librosa เป็นทางสำรอง
+# DurationIndex เก็บความยาวที่อ่านแล้วไว้ในไฟล์ข้างแคชเสียง ไฟล์ที่ไม่เปลี่ยนจะไม่ถูกอ่านซ้ำ
+
+# ตาราง bitrate (kbps) ของ MPEG audio: (version, layer) -> รายการตาม bitrate index 1-14
+_BITRATES = {
+    (1, 1): [32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+class ProbeError(ValueError):
+    """
+    อ่านความยาวของไฟล์เสียงจาก header ไม่ได้
+    """
+
+
+def _parse_frame_header(data, offset):
+    # คืนข้อมูลของ MPEG audio frame ที่ตำแหน่ง offset หรือ None ถ้าไม่ใช่ frame header
+    if offset + 4 > len(data):
+        return None
+    header = struct.unpack(">I", data[offset:offset + 4])[0]
+    if header & 0xFFE00000 != 0xFFE00000:
+        return None
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version = {0: 2.5, 2: 2, 3: 1}[version_bits]
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_index - 1] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (header >> 9) & 0x1
+    mono = ((header >> 6) & 0x3) == 3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+
+    return {
+        "version": version,
+        "layer": layer,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "length": length,
+        "mono": mono,
+    }
+
+
+def _skip_id3v2(data):
+    # ข้าม ID3v2 tag ที่ต้นไฟล์ (ขนาดเก็บแบบ syncsafe integer)
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def mp3_duration(data):
+    """
+    อ่านความยาวของ MP3 จาก header ของ Xing/Info หรือ VBRI ถ้ามี
+    ถ้าไม่มีจะไล่อ่านเฉพาะ header ของทุก frame (ไม่ถอดรหัสเสียง)
+
+    Args:
+        data: ข้อมูลไฟล์ MP3 (bytes)
+
+    Returns:
+        ความยาวเป็นวินาที
+    """
+    offset = _skip_id3v2(data)
+    # หา frame แรกที่ถูกต้อง (frame ถัดไปต้องเป็น header ด้วย เพื่อกันการเจอ sync ปลอม)
+    first = None
+    while offset < len(data) - 4:
+        first = _parse_frame_header(data, offset)
+        if first and (offset + first["length"] >= len(data)
+                      or _parse_frame_header(data, offset + first["length"])):
+            break
+        first = None
+        offset += 1
+    if first is None:
+        raise ProbeError("ไม่พบ MPEG audio frame")
+
+    # Xing/Info header อยู่หลัง side information ของ frame แรก
+    if first["version"] == 1:
+        side_info = 17 if first["mono"] else 32
+    else:
+        side_info = 9 if first["mono"] else 17
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            return frames * first["samples"] / first["sample_rate"]
+
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * first["samples"] / first["sample_rate"]
+
+    # ไม่มี header สรุปจำนวน frame ให้นับ frame ทีละตัว
+    samples = 0
+    while True:
+        frame = _parse_frame_header(data, offset)
+        if frame is None or frame["length"] <= 0:
+            break
+        samples += frame["samples"]
+        offset += frame["length"]
+    return samples / first["sample_rate"]
+
+
+def wav_duration(data):
+    """
+    อ่านความยาวของ WAV จาก chunk "fmt " และ "data" (รองรับทั้ง PCM และ float)
+
+    Args:
+        data: ข้อมูลไฟล์ WAV (bytes)
+
+    Returns:
+        ความยาวเป็นวินาที
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ProbeError("ไม่ใช่ไฟล์ WAV")
+    offset = 12
+    byte_rate = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", data[offset + 16:offset + 20])[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                raise ProbeError("ไม่พบ fmt chunk ก่อน data chunk")
+            # ถ้าไฟล์ถูกเขียนแบบ streaming ขนาดใน header อาจไม่ถูกต้อง ให้ใช้ขนาดจริงแทน
+            available = len(data) - offset - 8
+            return min(chunk_size, available) / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise ProbeError("ไม่พบ data chunk")
+
+
+def probe_duration(path):
+    """
+    อ่านความยาวของไฟล์เสียง (วินาที) จาก header ถ้าไม่ได้จะใช้ librosa แทน
+
+    Args:
+        path: เส้นทางไปยังไฟล์เสียง
+
+    Returns:
+        ความยาวเป็นวินาที
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        if data[:4] == b"RIFF":
+            return wav_duration(data)
+        return mp3_duration(data)
+    except (ProbeError, struct.error, IndexError):
+        # รูปแบบที่อ่านเองไม่ได้ ให้ librosa (audioread/soundfile) อ่านแทน
+        import librosa
+        return librosa.get_duration(path=path)
+
+
+class DurationIndex:
+    """
+    ดัชนีความยาวของไฟล์เสียงที่เก็บในไฟล์ JSON ข้างแคชเสียง
+    ใช้ขนาดไฟล์และเวลาแก้ไขเป็นตัวตรวจว่าไฟล์เปลี่ยนหรือไม่
+    ค่าที่อ่านใหม่จะเขียนลงไฟล์เมื่อเรียก flush() (ท้ายขั้นตอนเสียง) หรือตอนจบ process
+
+    Args:
+        index_path: ไฟล์ JSON ของดัชนี
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        atexit.register(self.flush)
+
+    def _save(self):
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(temp_path, self.index_path)
+        self._dirty = False
+
+    def flush(self):
+        """
+        เขียนค่าที่อ่านใหม่ลงไฟล์ดัชนี (ไม่ทำอะไรถ้าไม่มีค่าใหม่)
+        """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def duration(self, path):
+        """
+        คืนความยาวของไฟล์เสียง (อ่านจากดัชนีถ้าไฟล์ไม่เปลี่ยน ไม่เช่นนั้นอ่าน header แล้วเก็บไว้รอ flush)
+        """
+        stat = os.stat(path)
+        name = os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(self.index_path)))
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                return entry["duration"]
+
+        duration = probe_duration(path)
+        with self._lock:
+            self._entries[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "duration": duration}
+            self._dirty = True
+        return duration
@@ -0,0 +1,168 @@
+import os
+import glob
+import json
+import time
+import itertools
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from image_to_text import generate_captions
+from ocr_pool import OCRPool
+
+# สร้างคำอธิบายภาพ (GIT) และดึงข้อความ (OCR) ของภาพจำนวนมาก
+# ภาพถูกโหลดและเตรียมล่วงหน้าด้วย thread pool (คล้าย DataLoader) ระหว่างที่โมเดลประมวลผลกลุ่มก่อนหน้า
+# OCR รันใน process pool แยก (ocr_pool.py) พร้อมกับการสร้างคำอธิบายภาพ
+# ผลลัพธ์เขียนต่อท้ายไฟล์ JSONL ทีละกลุ่ม รันซ้ำจะข้ามภาพที่มีในไฟล์ผลลัพธ์แล้ว
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
+
+def collect_images(input_dir=None, pattern=None, file_list=None):
+    """
+    รวบรวมรายการไฟล์ภาพจากโฟลเดอร์ (รวมโฟลเดอร์ย่อย), glob pattern หรือไฟล์รายชื่อ (บรรทัดละหนึ่งไฟล์)
+
+    Returns:
+        รายการเส้นทางของไฟล์ภาพ (ไม่ซ้ำ เรียงตามลำดับที่พบ)
+    """
+    paths = []
+    if input_dir:
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if name.lower().endswith(IMAGE_EXTENSIONS))
+    if pattern:
+        paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    if file_list:
+        with open(file_list, "r", encoding="utf-8") as f:
+            paths.extend(line.strip() for line in f if line.strip())
+    return list(dict.fromkeys(os.path.normpath(path) for path in paths))
+
+
+def read_done(output_path):
+    """
+    อ่านรายชื่อภาพที่มีผลลัพธ์อยู่แล้วในไฟล์ JSONL (บรรทัดที่เขียนไม่ครบจะถูกข้าม)
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["image"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+def prefetch(items, fn, workers=4, depth=None):
+    """
+    เรียก fn กับแต่ละรายการล่วงหน้าด้วย thread pool โดยมีงานค้างไม่เกิน depth งาน
+
+    Yields:
+        tuple: (item, future) ตามลำดับเดิมของ items
+    """
+    depth = depth or workers * 2
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch") as executor:
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) >= depth:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+
+def _load_image(path, processor):
+    # โหลดภาพและแปลงเป็น tensor ที่โมเดลต้องการ
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+    return processor(images=image, return_tensors="pt").pixel_values
+
+
+def caption_images(paths, model, processor, output_path, batch_size=8, workers=4, ocr=True,
+                   ocr_workers=2, ocr_preprocess=None, num_beams=5):
+    """
+    สร้างคำอธิบายและดึงข้อความของภาพทั้งหมด แล้วเขียนผลลัพธ์แบบ JSONL (หนึ่งบรรทัดต่อภาพ)
+
+    Args:
+        paths: รายการไฟล์ภาพ
+        model: โมเดลที่ใช้ในการแปลง
+        processor: processor สำหรับเตรียมข้อมูล
+        output_path: ไฟล์ JSONL ของผลลัพธ์ (เขียนต่อท้าย)
+        batch_size: จำนวนภาพต่อการเรียก model.generate หนึ่งครั้ง
+        workers: จำนวน thread ที่โหลดและเตรียมภาพล่วงหน้า
+        ocr: ดึงข้อความจากภาพด้วย Tesseract ด้วยหรือไม่
+        ocr_workers: จำนวน process ที่รัน Tesseract พร้อมกัน
+        ocr_preprocess: การเตรียมภาพก่อน OCR (ดู image_to_text.preprocess_for_ocr)
+        num_beams: จำนวน beam ของการสร้างคำอธิบาย (1 = greedy)
+
+    Returns:
+        จำนวนภาพที่ประมวลผลในครั้งนี้
+    """
+    import torch
+
+    done = read_done(output_path)
+    todo = [path for path in paths if path not in done]
+    print(f"พบภาพ {len(paths)} ภาพ มีผลลัพธ์แล้ว {len(paths) - len(todo)} ภาพ ต้องประมวลผล {len(todo)} ภาพ")
+    if not todo:
+        return 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    # ถ้ารอบก่อนถูกหยุดกลางบรรทัด ให้ขึ้นบรรทัดใหม่ก่อนเขียนต่อ
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    else:
+        needs_newline = False
+
+    start = time.perf_counter()
+    count = 0
+    ocr_pool = OCRPool(ocr_workers, ocr_preprocess) if ocr else None
+    try:
+        with open(output_path, "a", encoding="utf-8") as out:
+            if needs_newline:
+                out.write("\n")
+
+            def flush(batch):
+                captions = generate_captions(torch.cat([item[1] for item in batch]), model, processor, num_beams)
+                for (path, _, ocr_future), caption in zip(batch, captions):
+                    text = ocr_future.result() if ocr_future else None
+                    out.write(json.dumps({"image": path, "caption": caption, "text": text}, ensure_ascii=False) + "\n")
+                out.flush()
+
+            loaded = prefetch(todo, lambda path: _load_image(path, processor), workers)
+            if ocr_pool:
+                # OCR ของภาพล่วงหน้าอย่างน้อยสองกลุ่ม เพื่อให้เสร็จทันตอนเขียนผลลัพธ์
+                ocr_futures = (future for _, future in ocr_pool.stream(todo, depth=max(ocr_workers, batch_size) * 2))
+            else:
+                ocr_futures = itertools.repeat(None)
+
+            batch = []
+            for (path, future), ocr_future in zip(loaded, ocr_futures):
+                try:
+                    pixel_values = future.result()
+                except Exception as e:
+                    # ภาพที่เปิดไม่ได้บันทึกข้อผิดพลาดไว้ จะไม่ถูกประมวลผลซ้ำในรอบถัดไป
+                    out.write(json.dumps({"image": path, "error": str(e)}, ensure_ascii=False) + "\n")
+                    count += 1
+                    continue
+                batch.append((path, pixel_values, ocr_future))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    count += len(batch)
+                    batch = []
+                    elapsed = time.perf_counter() - start
+                    print(f"ประมวลผลแล้ว {count}/{len(todo)} ภาพ ({count / elapsed:.2f} ภาพ/วินาที)")
+            if batch:
+                flush(batch)
+                count += len(batch)
+    finally:
+        if ocr_pool:
+            ocr_pool.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"ประมวลผลเสร็จ {count} ภาพใน {elapsed:.1f} วินาที ({count / max(elapsed, 1e-9):.2f} ภาพ/วินาที)")
+    return count
@@ -0,0 +1,53 @@
+import torch
+
+# สร้างภาพหลายฉากด้วย StableDiffusionPipeline ในการเรียกครั้งเดียว (micro-batch)
+# แต่ละฉากมี prompt, negative prompt และ seed ของตัวเอง
+# เนื่องจากใช้ generator แยกต่อภาพ noise เริ่มต้นของแต่ละฉากจะเหมือนกับการสร้างทีละฉาก
+
+
+def chunked(items, size):
+    """
+    แบ่งรายการออกเป็นกลุ่มย่อยขนาดไม่เกิน size
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def generate_batched(pipe, jobs, batch_size=1, num_inference_steps=30, guidance_scale=7.5,
+                     width=512, height=512):
+    """
+    สร้างภาพจากรายการงานเป็นกลุ่ม ๆ ละ batch_size ฉาก
+
+    Args:
+        pipe: StableDiffusionPipeline ที่โหลดแล้ว
+        jobs: รายการ dict ที่มี "prompt", "negative_prompt" (หรือ None) และ "seed"
+        batch_size: จำนวนฉากต่อการเรียก pipe หนึ่งครั้ง (1 = สร้างทีละฉาก)
+        num_inference_steps: จำนวน steps ของการ denoise
+        guidance_scale: ค่า classifier-free guidance
+        width, height: ขนาดภาพ
+
+    Yields:
+        tuple: (job, ภาพ PIL) ตามลำดับเดิมของ jobs
+    """
+    batch_size = max(1, int(batch_size))
+    for batch in chunked(list(jobs), batch_size):
+        # generator แยกต่อภาพเพื่อให้ผลลัพธ์ตรงกับการสร้างทีละฉาก
+        generators = [
+            torch.Generator(device=pipe.device).manual_seed(job["seed"])
+            for job in batch
+        ]
+        # negative prompt ที่เป็น None ให้ใช้ข้อความว่าง (เทียบเท่ากับไม่กำหนด)
+        negative_prompts = [job.get("negative_prompt") or "" for job in batch]
+
+        images = pipe(
+            prompt=[job["prompt"] for job in batch],
+            negative_prompt=negative_prompts,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            width=width,
+            height=height,
+            generator=generators
+        ).images
+
+        for job, image in zip(batch, images):
+            yield job, image
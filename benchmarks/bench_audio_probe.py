@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import struct
+import argparse
+import tempfile
+import subprocess
+
+# เปรียบเทียบการอ่านความยาวของเสียงด้วย audio_probe กับ librosa.get_duration
+# 1. เวลาเริ่มต้น: เวลาที่ใช้ import โมดูลใน process ใหม่
+# 2. เวลาต่อไฟล์: อ่านความยาวของไฟล์ WAV และ MP3 (ครั้งแรก และครั้งที่อ่านจากดัชนี)
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_audio_probe.py --files 200
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from audio_probe import DurationIndex, probe_duration  # noqa: E402
+from tts import ToneBackend  # noqa: E402
+
+
+def import_seconds(module, repeat):
+    # เวลาที่น้อยที่สุดของการ import โมดูลใน process ใหม่ (ไม่รวมเวลาเริ่ม Python เปล่า)
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        seconds = float(result.stdout.strip())
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def write_mp3(path, seconds):
+    # สร้าง MP3 (MPEG-2 Layer III, 24 kHz, 32 kbps, mono แบบเดียวกับ gTTS) ที่มีเฉพาะ frame header
+    # เพียงพอสำหรับวัดการอ่าน header แต่ librosa อาจถอดรหัสไม่ได้
+    header = 0xFFE00000 | (2 << 19) | (1 << 17) | (1 << 16) | (4 << 12) | (1 << 10) | (3 << 6)
+    frame = struct.pack(">I", header) + b"\0" * (72 * 32000 // 24000 - 4)
+    with open(path, "wb") as f:
+        f.write(frame * int(seconds * 24000 / 576))
+
+
+def time_per_file(fn, paths):
+    start = time.perf_counter()
+    for path in paths:
+        fn(path)
+    return (time.perf_counter() - start) / len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดความเร็วการอ่านความยาวของไฟล์เสียง")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=5.0, help="ความยาวของไฟล์เสียงแต่ละไฟล์")
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนครั้งที่วัดเวลา import")
+    args = parser.parse_args()
+
+    print("เวลา import (ms)")
+    for module in ("audio_probe", "librosa"):
+        seconds = import_seconds(module, args.repeat)
+        print(f"  {module:>12}: " + ("ไม่ได้ติดตั้ง" if seconds is None else f"{seconds * 1000:.1f}"))
+
+    try:
+        import librosa
+    except ImportError:
+        librosa = None
+
+    tone = ToneBackend(seconds_per_char=args.seconds / 10)
+    with tempfile.TemporaryDirectory(prefix="bench_probe_") as work_dir:
+        files = {"wav": [], "mp3": []}
+        for i in range(args.files):
+            wav_path = os.path.join(work_dir, f"speech_{i}.wav")
+            tone.synthesize("x" * 10, {}, wav_path)
+            files["wav"].append(wav_path)
+            mp3_path = os.path.join(work_dir, f"speech_{i}.mp3")
+            write_mp3(mp3_path, args.seconds)
+            files["mp3"].append(mp3_path)
+
+        print(f"\nเวลาต่อไฟล์ (ms) จาก {args.files} ไฟล์ ไฟล์ละ {args.seconds:.1f} วินาที")
+        print(f"{'format':>8} {'probe':>10} {'index':>10} {'librosa':>10}")
+        for fmt, paths in files.items():
+            probe = time_per_file(probe_duration, paths)
+            index = DurationIndex(os.path.join(work_dir, f"durations_{fmt}.json"))
+            time_per_file(index.duration, paths)
+            index.flush()
+            # ครั้งที่สองอ่านจากดัชนีทั้งหมด (เปิดดัชนีใหม่เหมือนการรันครั้งถัดไป)
+            index = DurationIndex(os.path.join(work_dir, f"durations_{fmt}.json"))
+            cached = time_per_file(index.duration, paths)
+            reference = "-"
+            if librosa is not None:
+                try:
+                    reference = f"{time_per_file(lambda p: librosa.get_duration(path=p), paths) * 1000:.3f}"
+                except Exception:
+                    reference = "อ่านไม่ได้"
+            print(f"{fmt:>8} {probe * 1000:>10.3f} {cached * 1000:>10.3f} {reference:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import resource
+
+# เปรียบเทียบเวลาและหน่วยความจำสูงสุดระหว่างการสร้างภาพทีละฉากกับแบบ batch บน CPU
+# แต่ละโหมดรันใน process แยก เพื่อให้ค่า peak RSS ไม่ปนกัน
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_batched_diffusion.py --model ./model_cache/stable-diffusion --scenes 8 --batch-sizes 1 2 4
+#   python benchmarks/bench_batched_diffusion.py --model hf-internal-testing/tiny-stable-diffusion-torch --steps 5
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PROMPTS = [
+    "a penguin, a cat and a dog packing luggage together in a messy room",
+    "a penguin standing on a tropical beach with sunglasses",
+    "a cat chef trying to barbecue fish on a grill",
+    "a superhero dog stuck in a palm tree",
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss เป็น KB บน Linux และเป็นไบต์บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    import numpy as np
+    import torch
+    from diffusers import StableDiffusionPipeline
+    from batch_diffusion import generate_batched
+
+    pipe = StableDiffusionPipeline.from_pretrained(args.model, torch_dtype=torch.float32).to("cpu")
+    pipe.safety_checker = None
+    pipe.set_progress_bar_config(disable=True)
+
+    jobs = [
+        {"prompt": PROMPTS[i % len(PROMPTS)], "negative_prompt": "low quality, blurry", "seed": 1000 + i}
+        for i in range(args.scenes)
+    ]
+    load_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    images = [image for _, image in generate_batched(
+        pipe, jobs, args.child_batch_size, args.steps, 7.5, args.size, args.size)]
+    elapsed = time.perf_counter() - start
+
+    np.save(args.child_output, np.stack([np.asarray(image, dtype=np.float32) for image in images]))
+    print(json.dumps({
+        "batch_size": args.child_batch_size,
+        "seconds": elapsed,
+        "seconds_per_image": elapsed / args.scenes,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_after_load_mb": load_rss,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบการสร้างภาพทีละฉากกับแบบ batch")
+    parser.add_argument("--model", default="./model_cache/stable-diffusion")
+    parser.add_argument("--scenes", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--child-batch-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_batch_size:
+        run_child(args)
+        return
+
+    import numpy as np
+
+    results = []
+    outputs = {}
+    for batch_size in args.batch_sizes:
+        output = f"bench_images_b{batch_size}.npy"
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--model", args.model, "--scenes", str(args.scenes), "--steps", str(args.steps),
+            "--size", str(args.size), "--child-batch-size", str(batch_size), "--child-output", output,
+        ]
+        completed = subprocess.run(command, check=True, capture_output=True, text=True)
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        outputs[batch_size] = output
+
+    baseline = np.load(outputs[args.batch_sizes[0]])
+    print(f"{'batch':>6} {'seconds':>9} {'s/image':>9} {'peak MB':>9} {'max |diff|':>11}")
+    for result in results:
+        images = np.load(outputs[result["batch_size"]])
+        diff = float(np.abs(images - baseline).max())
+        print(f"{result['batch_size']:>6} {result['seconds']:>9.2f} {result['seconds_per_image']:>9.2f} "
+              f"{result['peak_rss_mb']:>9.0f} {diff:>11.1f}")
+
+    for output in outputs.values():
+        os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
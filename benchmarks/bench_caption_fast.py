@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import difflib
+import argparse
+import resource
+import statistics
+import subprocess
+
+# เปรียบเทียบโหมดเร็วของโมเดลสร้างคำอธิบายภาพ (int8, torch.compile, greedy) กับแบบเดิม (fp32, beam 5)
+# รายงานเวลาโหลด เวลาภาพแรก เวลาต่อภาพ หน่วยความจำสูงสุด และความตรงกันของคำอธิบายกับแบบเดิม
+# แต่ละโหมดรันใน process แยก เพื่อให้ค่า peak RSS ไม่ปนกัน
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_caption_fast.py --input-dir images/cache --limit 16
+#   python benchmarks/bench_caption_fast.py --input-dir frames --configs baseline greedy int8-greedy
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+# ชื่อโหมด -> (quantize, compile, num_beams)
+CONFIGS = {
+    "baseline": (False, False, 5),
+    "greedy": (False, False, 1),
+    "int8": (True, False, 5),
+    "int8-greedy": (True, False, 1),
+    "compile": (False, True, 5),
+    "int8-compile-greedy": (True, True, 1),
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss เป็น KB บน Linux และเป็นไบต์บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    from PIL import Image
+    from batch_caption import collect_images
+    from image_to_text import load_model_and_processor, generate_caption
+
+    quantize, compiled, num_beams = CONFIGS[args.child_config]
+    paths = collect_images(args.input_dir)[:args.limit]
+
+    start = time.perf_counter()
+    model, processor = load_model_and_processor(quantize, compiled)
+    load_seconds = time.perf_counter() - start
+
+    captions = []
+    latencies = []
+    for path in paths:
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+        start = time.perf_counter()
+        captions.append(generate_caption(image, model, processor, num_beams))
+        latencies.append(time.perf_counter() - start)
+
+    # ภาพแรกรวมเวลาคอมไพล์ (ถ้าใช้ torch.compile) จึงแยกออกจากค่าเฉลี่ย
+    steady = latencies[1:] or latencies
+    print(json.dumps({
+        "config": args.child_config,
+        "load_seconds": load_seconds,
+        "first_seconds": latencies[0],
+        "mean_ms": statistics.mean(steady) * 1000,
+        "p50_ms": statistics.median(steady) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "captions": captions,
+    }, ensure_ascii=False))
+
+
+def agreement(captions, reference):
+    # สัดส่วนคำอธิบายที่ตรงกันทุกคำ และความคล้ายเฉลี่ยระดับคำ (0-1)
+    exact = sum(a == b for a, b in zip(captions, reference)) / len(reference)
+    similarity = statistics.mean(
+        difflib.SequenceMatcher(None, a.split(), b.split()).ratio() for a, b in zip(captions, reference))
+    return exact, similarity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบโหมดเร็วของโมเดลสร้างคำอธิบายภาพ")
+    parser.add_argument("--input-dir", default="images/cache", help="โฟลเดอร์ของรูปภาพที่ใช้วัด")
+    parser.add_argument("--limit", type=int, default=16, help="จำนวนภาพที่ใช้วัด")
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS),
+                        default=["baseline", "greedy", "int8", "int8-greedy"])
+    parser.add_argument("--child-config", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_config:
+        run_child(args)
+        return
+
+    configs = args.configs if args.configs[0] == "baseline" else ["baseline"] + args.configs
+    results = []
+    for config in dict.fromkeys(configs):
+        command = [sys.executable, os.path.abspath(__file__), "--input-dir", os.path.abspath(args.input_dir),
+                   "--limit", str(args.limit), "--child-config", config]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{config}: ล้มเหลว\n{completed.stderr[-2000:]}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if not results or results[0]["config"] != "baseline":
+        return
+    reference = results[0]["captions"]
+    print(f"{len(reference)} ภาพ จาก {args.input_dir}")
+    print(f"{'config':>20} {'load s':>7} {'first s':>8} {'mean ms':>8} {'p50 ms':>7} {'peak MB':>8} "
+          f"{'speedup':>8} {'exact':>6} {'similar':>8}")
+    for result in results:
+        exact, similarity = agreement(result["captions"], reference)
+        print(f"{result['config']:>20} {result['load_seconds']:>7.1f} {result['first_seconds']:>8.2f} "
+              f"{result['mean_ms']:>8.0f} {result['p50_ms']:>7.0f} {result['peak_rss_mb']:>8.0f} "
+              f"{results[0]['mean_ms'] / result['mean_ms']:>7.2f}x {exact:>6.0%} {similarity:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
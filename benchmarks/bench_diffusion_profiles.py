@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import resource
+
+# เปรียบเทียบเวลาต่อภาพและหน่วยความจำสูงสุดของโปรไฟล์การสร้างภาพ (diffusion_profiles.py) บน CPU
+# แต่ละโปรไฟล์รันใน process แยก เพื่อให้ค่า peak RSS ไม่ปนกัน
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_diffusion_profiles.py --project projects/penguin_trip.yaml --images 4
+#   python benchmarks/bench_diffusion_profiles.py --profiles default cpu-fast lcm distilled
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+from diffusion_profiles import PROFILES  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss เป็น KB บน Linux และเป็นไบต์บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    from batch_diffusion import generate_batched
+    from diffusion_profiles import apply_profile
+    from pipeline import load_pipeline
+    from project import load_project
+
+    project = load_project(args.project)
+    settings = project.settings
+    settings["diffusion_profile"] = args.child_profile
+    apply_profile(settings)
+    scenes = list(project.iter_scenes())[:args.images]
+
+    start = time.perf_counter()
+    pipe = load_pipeline(settings)
+    pipe.set_progress_bar_config(disable=True)
+    load_seconds = time.perf_counter() - start
+
+    jobs = [{"prompt": scene["prompt"],
+             "negative_prompt": scene.get("negative_prompt", settings["negative_prompt"]),
+             "seed": scene.get("seed", settings["seed"])} for scene in scenes]
+    start = time.perf_counter()
+    for _ in generate_batched(pipe, jobs, 1, settings["num_inference_steps"], settings["guidance_scale"],
+                              settings["width"], settings["height"]):
+        pass
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "profile": args.child_profile,
+        "steps": settings["num_inference_steps"],
+        "dtype": str(pipe.unet.dtype).replace("torch.", ""),
+        "load_seconds": load_seconds,
+        "seconds_per_image": elapsed / len(jobs),
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบโปรไฟล์การสร้างภาพ")
+    parser.add_argument("--project", default="projects/penguin_trip.yaml")
+    parser.add_argument("--images", type=int, default=4, help="จำนวนภาพที่สร้างต่อโปรไฟล์")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=["default", "cpu-fast", "lcm"])
+    parser.add_argument("--child-profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_profile:
+        run_child(args)
+        return
+
+    print(f"{'profile':>10} {'steps':>6} {'dtype':>9} {'load s':>7} {'s/image':>8} {'peak MB':>8}")
+    for profile in args.profiles:
+        command = [sys.executable, os.path.abspath(__file__), "--project", os.path.abspath(args.project),
+                   "--images", str(args.images), "--child-profile", profile]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{profile:>10} ล้มเหลว: {completed.stderr.strip().splitlines()[-1:]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{result['profile']:>10} {result['steps']:>6} {result['dtype']:>9} {result['load_seconds']:>7.1f} "
+              f"{result['seconds_per_image']:>8.2f} {result['peak_rss_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
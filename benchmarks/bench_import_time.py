@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# วัดเวลา import ของ entry point ด้วย python -X importtime
+# 1. import อย่างเดียว: main, anime, image_to_text, pipeline
+# 2. รันโปรเจกต์ที่ทุกฉากมีภาพ เสียง และวิดีโอในแคชแล้ว (ไม่ควร import torch, diffusers, moviepy ฯลฯ)
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_import_time.py --top 10
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+from pipeline import get_cache, scene_image_key  # noqa: E402
+from project import load_project  # noqa: E402
+
+HEAVY_MODULES = ["torch", "diffusers", "transformers", "moviepy", "librosa", "numpy",
+                 "pydub", "matplotlib", "pytesseract", "PIL", "gtts"]
+
+CACHED_RUN = """
+import sys
+sys.path.insert(0, {root!r})
+from main import main
+main(["--project", {project!r}, "--scheduler", "sequential"])
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print("HEAVY=" + ",".join(heavy))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    แปลงผลของ -X importtime เป็นเวลารวม (วินาที) และรายการ (โมดูลที่ import โดยตรง, เวลาสะสม)
+    เรียงจากมากไปน้อย
+    """
+    total_us = 0
+    direct = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        # ระดับของการ import ดูจากจำนวนช่องว่างหน้าชื่อ (ระดับละ 2 ช่อง)
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 1:
+            direct.append((name.strip(), int(cumulative_us) / 1e6))
+    return total_us / 1e6, sorted(direct, key=lambda item: item[1], reverse=True)
+
+
+def run_importtime(code, cwd):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=cwd, capture_output=True, text=True)
+    return result, parse_importtime(result.stderr)
+
+
+def make_cached_project(work_dir):
+    # โปรเจกต์ขนาดเล็กที่ใช้เสียงจำลอง (tone) และแคชในโฟลเดอร์ชั่วคราว
+    project_path = os.path.join(work_dir, "cached.json")
+    with open(project_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "output_path": os.path.join(work_dir, "output", "cached.mp4"),
+            "image_cache_dir": os.path.join(work_dir, "images", "cache"),
+            "speech_cache_dir": os.path.join(work_dir, "audio", "cache"),
+            "voices": {"default": {"engine": "tone"}},
+            "scenes": [{"prompt": f"a penguin on a beach, shot {i}", "text": f"ฉากที่ {i}"} for i in range(8)],
+        }, f, ensure_ascii=False)
+
+    # ใส่ภาพลงแคชล่วงหน้า (ไฟล์ภาพจำลอง เพราะขั้นตอนนี้ตรวจแค่ว่ามีในแคช)
+    project = load_project(project_path)
+    image_cache = get_cache(project.settings, "image")
+    for scene in project.iter_scenes():
+        temp_path = os.path.join(work_dir, "image.png")
+        with open(temp_path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+        image_cache.put(scene_image_key(scene, project.settings), temp_path)
+
+    # วิดีโอผลลัพธ์มีอยู่แล้ว
+    os.makedirs(os.path.dirname(project.settings["output_path"]), exist_ok=True)
+    open(project.settings["output_path"], "wb").close()
+    return project_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดเวลา import ของ entry point")
+    parser.add_argument("--top", type=int, default=8, help="จำนวนโมดูลที่ใช้เวลามากที่สุดที่จะแสดง")
+    args = parser.parse_args()
+
+    print(f"{'import':>16} {'total ms':>10}  โมดูลที่ใช้เวลามากที่สุด")
+    for module in ("main", "anime", "image_to_text", "pipeline"):
+        result, (total, imported) = run_importtime(f"import {module}", ROOT)
+        if result.returncode != 0:
+            print(f"{module:>16} {'-':>10}  import ไม่ได้: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        top = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in imported[:args.top])
+        print(f"{module:>16} {total * 1000:>10.1f}  {top}")
+
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as work_dir:
+        project_path = make_cached_project(work_dir)
+        code = CACHED_RUN.format(root=ROOT, project=project_path, heavy=HEAVY_MODULES)
+        # รันครั้งแรกเพื่อสร้างเสียงลงแคช ครั้งที่สองคือกรณีที่ทุกอย่างอยู่ในแคชแล้ว
+        subprocess.run([sys.executable, "-c", code], cwd=work_dir, capture_output=True, text=True)
+        result, (total, imported) = run_importtime(code, work_dir)
+
+    heavy = [line[len("HEAVY="):] for line in result.stdout.splitlines() if line.startswith("HEAVY=")]
+    print(f"\nรันโปรเจกต์ที่อยู่ในแคชทั้งหมด: import รวม {total * 1000:.1f} ms")
+    for name, seconds in imported[:args.top]:
+        print(f"  {name:<24} {seconds * 1000:>8.1f} ms")
+    if not heavy:
+        print("  รันไม่สำเร็จ:\n" + result.stdout[-2000:])
+    else:
+        print(f"  ไลบรารีขนาดใหญ่ที่ถูก import: {heavy[0] or 'ไม่มี'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+
+# เปรียบเทียบการโหลดโมเดลจาก model_cache แบบ memory-mapped (model_store) กับ from_pretrained แบบเดิม
+# - cold: ล้าง page cache ของไฟล์โมเดลก่อนโหลด (posix_fadvise DONTNEED) เหมือนเปิดเครื่องใหม่
+# - warm: อ่านไฟล์ให้อยู่ใน page cache ก่อนโหลด
+# ทุกครั้งรัน --processes process พร้อมกัน แต่ละ process ถือโมเดลไว้จนทุก process โหลดเสร็จ
+# แล้วอ่าน RSS, Pss และ Shared จาก /proc/self/smaps_rollup ผลรวมของ Pss คือหน่วยความจำที่ใช้จริงทั้งหมด
+# (แบบ mmap หลาย process ใช้ page ของไฟล์ร่วมกัน ผลรวม Pss จึงไม่เพิ่มตามจำนวน process)
+#
+# โฟลเดอร์โมเดลต้องบันทึกผ่าน model_store แล้ว (เช่นรัน image_to_text.py หนึ่งครั้ง)
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_model_load.py --model-dir model_cache/text_to_image --processes 1 4
+#   python benchmarks/bench_model_load.py --model-dir model_cache/tts-tha --model-class text-to-waveform
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+MODEL_CLASSES = {
+    "causal-lm": "AutoModelForCausalLM",
+    "text-to-waveform": "AutoModelForTextToWaveform",
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss เป็น KB บน Linux และเป็นไบต์บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def memory_mb():
+    # Rss, Pss และ Shared_* ของ process นี้ (Linux)
+    values = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": values.get("Rss", 0.0),
+        "pss_mb": values.get("Pss", 0.0),
+        "shared_mb": values.get("Shared_Clean", 0.0) + values.get("Shared_Dirty", 0.0),
+    }
+
+
+def weight_files(model_dir):
+    return [os.path.join(model_dir, name) for name in sorted(os.listdir(model_dir))
+            if name.endswith(".safetensors")]
+
+
+def drop_page_cache(paths):
+    # ล้างเฉพาะ page ของไฟล์โมเดล (ไม่ต้องใช้สิทธิ์ root)
+    for path in paths:
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def warm_page_cache(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            while f.read(8 * 1024 * 1024):
+                pass
+
+
+def run_child(args):
+    import transformers
+    from model_store import load_pretrained
+
+    model_class = getattr(transformers, MODEL_CLASSES[args.model_class])
+    start = time.perf_counter()
+    model = load_pretrained(model_class, args.model_dir, mmap=args.child_mode == "mmap")
+    load_seconds = time.perf_counter() - start
+
+    # รอให้ process อื่นโหลดเสร็จก่อนอ่านหน่วยความจำ
+    ready_path = os.path.join(args.child_ready_dir, str(os.getpid()))
+    open(ready_path, "w").close()
+    deadline = time.time() + 600
+    while len(os.listdir(args.child_ready_dir)) < args.child_processes and time.time() < deadline:
+        time.sleep(0.05)
+    memory = memory_mb()
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "parameters": sum(param.numel() for param in model.parameters()),
+        **memory,
+    }))
+
+
+def run_case(args, mode, temperature, processes):
+    paths = weight_files(args.model_dir)
+    if temperature == "cold":
+        drop_page_cache(paths)
+    else:
+        warm_page_cache(paths)
+
+    with tempfile.TemporaryDirectory(prefix="bench_model_load_") as ready_dir:
+        command = [sys.executable, os.path.abspath(__file__), "--model-dir", args.model_dir,
+                   "--model-class", args.model_class, "--child-mode", mode,
+                   "--child-processes", str(processes), "--child-ready-dir", ready_dir]
+        start = time.perf_counter()
+        children = [subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                    for _ in range(processes)]
+        outputs = [child.communicate() for child in children]
+        wall_seconds = time.perf_counter() - start
+
+    results = []
+    for child, (stdout, stderr) in zip(children, outputs):
+        if child.returncode != 0:
+            print(f"{mode}/{temperature}/{processes}: ล้มเหลว\n{stderr[-2000:]}")
+            return None
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+    return {
+        "mode": mode,
+        "temperature": temperature,
+        "processes": processes,
+        "wall_seconds": wall_seconds,
+        "load_seconds": statistics.mean(result["load_seconds"] for result in results),
+        "rss_mb": statistics.mean(result["rss_mb"] for result in results),
+        "shared_mb": statistics.mean(result["shared_mb"] for result in results),
+        "total_pss_mb": sum(result["pss_mb"] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบการโหลดโมเดลแบบ memory-mapped กับ from_pretrained")
+    parser.add_argument("--model-dir", default="model_cache/text_to_image", help="โฟลเดอร์โมเดลใน model_cache")
+    parser.add_argument("--model-class", choices=list(MODEL_CLASSES), default="causal-lm")
+    parser.add_argument("--modes", nargs="+", choices=["from_pretrained", "mmap"], default=["from_pretrained", "mmap"])
+    parser.add_argument("--temperatures", nargs="+", choices=["cold", "warm"], default=["cold", "warm"])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 4], help="จำนวน process ที่โหลดพร้อมกัน")
+    parser.add_argument("--child-mode", help=argparse.SUPPRESS)
+    parser.add_argument("--child-processes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-ready-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.model_dir = os.path.abspath(args.model_dir)
+
+    if args.child_mode:
+        run_child(args)
+        return
+
+    from model_store import is_complete
+
+    if not is_complete(args.model_dir):
+        print(f"{args.model_dir} ยังไม่ได้บันทึกผ่าน model_store (รัน image_to_text.py หรือ main.py หนึ่งครั้งก่อน)")
+        sys.exit(1)
+    size_mb = sum(os.path.getsize(path) for path in weight_files(args.model_dir)) / 1024 / 1024
+    print(f"{args.model_dir}: น้ำหนัก {size_mb:.0f} MB")
+    print(f"{'mode':>16} {'cache':>6} {'procs':>6} {'load s':>7} {'wall s':>7} {'RSS MB':>7} "
+          f"{'shared MB':>10} {'total Pss MB':>13}")
+    for processes in args.processes:
+        for temperature in args.temperatures:
+            for mode in args.modes:
+                result = run_case(args, mode, temperature, processes)
+                if result is None:
+                    continue
+                print(f"{mode:>16} {temperature:>6} {processes:>6} {result['load_seconds']:>7.2f} "
+                      f"{result['wall_seconds']:>7.2f} {result['rss_mb']:>7.0f} {result['shared_mb']:>10.0f} "
+                      f"{result['total_pss_mb']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
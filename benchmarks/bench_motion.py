@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+# วัดความเร็ว (เฟรมต่อวินาที) ของการเคลื่อนกล้องบนภาพนิ่ง (motion.py) ที่ 720p และ 1080p
+#   frames   สร้างเฟรมอย่างเดียว (Pillow resize(box) หลาย thread)
+#   encode   สร้างเฟรมและเข้ารหัสเป็น segment ด้วย encode_scene_segment (เหมือนใน pipeline)
+#   moviepy  วิธีเดิม: callback ต่อเฟรมของ MoviePy (clip.fl) แล้ว write_videofile (เปรียบเทียบ)
+# แต่ละกรณีรันใน process แยก เพื่อให้ค่า peak RSS ไม่ปนกัน และ peak RSS ต้องไม่เพิ่มตามความยาวฉาก
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_motion.py
+#   python benchmarks/bench_motion.py --sizes 1080p --modes frames encode --threads 1 4 8 --seconds 20
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+SIZES = {"720p": (1280, 720), "1080p": (1920, 1080)}
+
+
+def peak_rss_mb():
+    # ru_maxrss เป็น KB บน Linux และเป็นไบต์บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def make_image(path, size=512):
+    # ภาพสังเคราะห์ที่มีรายละเอียด (gradient + noise) ให้การสุ่มตัวอย่างทำงานเหมือนภาพจริง
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size]
+    pixels = np.stack([x * 255 // size, y * 255 // size, (x + y) * 255 // (2 * size)], axis=2)
+    pixels = np.clip(pixels + rng.integers(-40, 40, pixels.shape), 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path)
+
+
+def run_moviepy(image_path, output_path, width, height, count, fps, zoom):
+    from moviepy.editor import ImageClip
+    from PIL import Image
+    import numpy as np
+    from motion import camera_boxes
+
+    image = Image.open(image_path).convert("RGB")
+    duration = count / fps
+    boxes = camera_boxes(image.size, (width, height), "zoom_in", np.linspace(0, 1, count), zoom)
+
+    def move(get_frame, t):
+        box = boxes[min(count - 1, int(t * fps))]
+        return np.asarray(image.crop(tuple(int(v) for v in box)).resize((width, height), Image.BILINEAR))
+
+    clip = ImageClip(image_path).set_duration(duration).fl(move, apply_to=[])
+    clip.write_videofile(output_path, fps=fps, codec="libx264", preset="veryfast", audio=False, logger=None)
+
+
+def run_child(args):
+    from motion import motion_frames
+
+    width, height = SIZES[args.child_size]
+    count = int(round(args.seconds * args.fps))
+    with tempfile.TemporaryDirectory(prefix="bench_motion_") as work_dir:
+        image_path = os.path.join(work_dir, "scene.png")
+        make_image(image_path)
+        start = time.perf_counter()
+        if args.child_mode == "frames":
+            for _ in motion_frames(image_path, "zoom_in", count, width, height, args.zoom, args.resample,
+                                   threads=args.child_threads):
+                pass
+        elif args.child_mode == "encode":
+            from tts import ToneBackend
+            from video_assembly import encode_scene_segment
+
+            audio_path = os.path.join(work_dir, "speech.wav")
+            ToneBackend(sample_rate=16000).synthesize("ก" * max(1, int(args.seconds / 0.06)), {}, audio_path)
+            frames = motion_frames(image_path, "zoom_in", count, width, height, args.zoom, args.resample,
+                                   threads=args.child_threads)
+            scene = {"image_path": image_path, "audio_path": audio_path, "duration": count / args.fps}
+            encode_scene_segment(scene, os.path.join(work_dir, "segment.mp4"), args.fps, width, height,
+                                 frames=frames)
+        else:
+            run_moviepy(image_path, os.path.join(work_dir, "segment.mp4"), width, height, count, args.fps,
+                        args.zoom)
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "size": args.child_size,
+        "mode": args.child_mode,
+        "threads": args.child_threads,
+        "frames": count,
+        "seconds": elapsed,
+        "fps": count / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดเฟรมต่อวินาทีของการเคลื่อนกล้องบนภาพนิ่ง")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--modes", nargs="+", choices=["frames", "encode", "moviepy"], default=["frames", "encode"])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--seconds", type=float, default=10.0, help="ความยาวของฉากที่สร้าง")
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--zoom", type=float, default=1.15)
+    parser.add_argument("--resample", choices=["bilinear", "bicubic", "nearest"], default="bilinear")
+    parser.add_argument("--child-size", help=argparse.SUPPRESS)
+    parser.add_argument("--child-mode", help=argparse.SUPPRESS)
+    parser.add_argument("--child-threads", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_mode:
+        run_child(args)
+        return
+
+    print(f"{args.seconds:.0f} วินาทีต่อฉาก {args.fps} fps zoom {args.zoom} ({args.resample})")
+    print(f"{'size':>6} {'mode':>8} {'threads':>8} {'frames':>7} {'seconds':>8} {'fps':>7} {'realtime':>9} "
+          f"{'peak MB':>8}")
+    for size in args.sizes:
+        for mode in args.modes:
+            # MoviePy ใช้ thread เดียวเสมอ
+            for threads in ([1] if mode == "moviepy" else args.threads):
+                command = [sys.executable, os.path.abspath(__file__), "--child-size", size, "--child-mode", mode,
+                           "--child-threads", str(threads), "--seconds", str(args.seconds), "--fps", str(args.fps),
+                           "--zoom", str(args.zoom), "--resample", args.resample]
+                completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+                if completed.returncode != 0:
+                    print(f"{size:>6} {mode:>8} {threads:>8} ล้มเหลว\n{completed.stderr[-2000:]}")
+                    continue
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                print(f"{size:>6} {mode:>8} {threads:>8} {result['frames']:>7} {result['seconds']:>8.2f} "
+                      f"{result['fps']:>7.1f} {result['fps'] / args.fps:>8.1f}x {result['peak_rss_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
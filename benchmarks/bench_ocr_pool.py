@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import argparse
+
+# วัดปริมาณงานของ OCR (Tesseract) ใน process pool ตามจำนวน process และการเตรียมภาพ
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_ocr_pool.py --input-dir frames --workers 1 2 4 8 --preprocess none grayscale,binarize
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from batch_caption import collect_images  # noqa: E402
+from image_to_text import get_tesseract  # noqa: E402
+from ocr_pool import OCRPool, parse_preprocess  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดปริมาณงานของ OCR ตามจำนวน process")
+    parser.add_argument("--input-dir", required=True, help="โฟลเดอร์ของรูปภาพ")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--preprocess", nargs="+", default=["none"],
+                        help='การเตรียมภาพที่ต้องการเปรียบเทียบ เช่น none grayscale,downscale=1600,binarize')
+    parser.add_argument("--limit", type=int, default=None, help="จำนวนภาพสูงสุดที่ใช้วัด")
+    args = parser.parse_args()
+
+    paths = collect_images(args.input_dir)[:args.limit]
+    if not paths:
+        print(f"ไม่พบไฟล์รูปภาพใน {args.input_dir}")
+        return
+    try:
+        print(f"Tesseract {get_tesseract().get_tesseract_version()}, {len(paths)} ภาพ, {os.cpu_count()} cores")
+    except Exception as e:
+        print(f"ไม่สามารถเรียก Tesseract ได้: {e}")
+        return
+
+    print(f"{'preprocess':>28} {'workers':>8} {'wall s':>8} {'img/s':>8} {'speedup':>8}")
+    for spec in args.preprocess:
+        preprocess = None if spec == "none" else parse_preprocess(spec)
+        baseline = None
+        for workers in args.workers:
+            with OCRPool(workers, preprocess) as pool:
+                # เริ่ม process ทั้งหมดก่อนจับเวลา
+                for _, future in pool.stream(paths[:workers]):
+                    future.result()
+                start = time.perf_counter()
+                chars = sum(len(future.result()) for _, future in pool.stream(paths))
+                elapsed = time.perf_counter() - start
+            rate = len(paths) / elapsed
+            baseline = baseline or rate
+            print(f"{spec:>28} {workers:>8} {elapsed:>8.2f} {rate:>8.2f} {rate / baseline:>7.2f}x"
+                  f"  ({chars} ตัวอักษร)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import resource
+import tempfile
+import subprocess
+
+# วัดประสิทธิภาพของ pipeline ทั้งเส้น (generate_images, generate_speech, create_video และ image_to_text)
+# ด้วยโมเดลจำลองขนาดเล็กแทน Stable Diffusion, GIT, gTTS และ Tesseract ที่กำหนดเวลาหน่วงต่อการเรียกได้
+# จึงรันแบบออฟไลน์ได้ และเวลาที่วัดเป็นของโค้ดใน repo (แคช journal การต่อเสียงและการเข้ารหัสวิดีโอ) เป็นหลัก
+#
+# รายงานปริมาณงาน (ฉาก/นาที, ภาพ/วินาที), percentile ของเวลาต่อรายการของแต่ละงาน และหน่วยความจำสูงสุด
+# แต่ละจำนวนฉากรันใน process แยก ผลลัพธ์ต่อท้ายไฟล์ JSONL ไว้เปรียบเทียบกับการรันครั้งก่อน
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_pipeline_e2e.py --scenes 5 25 100
+#   python benchmarks/bench_pipeline_e2e.py --scenes 1000 --scheduler sequential --image-latency 0
+#   python benchmarks/bench_pipeline_e2e.py --scenes 25 --label after-change   (เทียบกับผลก่อนหน้าที่ตั้งค่าเดียวกัน)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "pipeline_e2e.jsonl")
+
+TEXTS = [
+    "เพนกวิน: เฮ้ย! ทุกคนเตรียมตัวให้พร้อม! วันนี้เราจะไปเที่ยวทะเลกัน!",
+    "แมว: แต่ฉันเอาเสื้อเชฟไปทำไมฟะ?",
+    "หมา: ผมเอาเสื้อซูเปอร์ฮีโร่ไป...เผื่อต้องช่วยใคร!",
+    "คุณเสียเวลากับการตอบอีเมลซ้ำ ๆ ทุกวันใช่ไหม?",
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss เป็น KB บน Linux และเป็นไบต์บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+# ---------- โมเดลจำลอง ----------
+
+class StubDiffusionPipeline:
+    """
+    แทน StableDiffusionPipeline: หน่วงเวลา latency วินาทีต่อภาพ แล้วคืนภาพสีเรียบตาม prompt
+    """
+
+    device = "cpu"
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, prompt, width, height, **kwargs):
+        from PIL import Image
+
+        time.sleep(self.latency * len(prompt))
+        result = type("Output", (), {})()
+        result.images = [
+            Image.new("RGB", (width, height), tuple(hashlib.sha256(text.encode("utf-8")).digest()[:3]))
+            for text in prompt
+        ]
+        return result
+
+
+class StubCaptionModel:
+    """
+    แทนโมเดล GIT: หน่วงเวลา latency วินาทีต่อภาพใน batch
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate(self, pixel_values, **kwargs):
+        time.sleep(self.latency * len(pixel_values))
+        return [[1, 2, 3]] * len(pixel_values)
+
+
+class StubProcessor:
+    def __call__(self, images, return_tensors="pt"):
+        import torch
+
+        count = len(images) if isinstance(images, list) else 1
+        result = type("Inputs", (), {})()
+        result.pixel_values = torch.zeros((count, 3, 8, 8))
+        return result
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return ["a stub caption"] * len(ids)
+
+
+class StubTesseract:
+    """
+    แทน pytesseract: หน่วงเวลา latency วินาทีต่อภาพ
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def image_to_string(self, image, config=None, **kwargs):
+        time.sleep(self.latency)
+        return "stub text"
+
+
+def install_stubs(args, settings):
+    import image_to_text
+    import pipeline
+    import tts
+
+    class BenchTTSBackend(tts.ToneBackend):
+        # แทน gTTS: เสียงโทนสั้น ๆ พร้อมเวลาหน่วงต่อคำขอ
+        name = "bench"
+
+        def __init__(self):
+            super().__init__(seconds_per_char=0.01, latency=args.tts_latency, sample_rate=8000)
+
+    tts.register_backend(BenchTTSBackend)
+    pipeline._pipelines[(settings["local_model_path"], settings["diffusion_profile"])] = \
+        StubDiffusionPipeline(args.image_latency)
+    tesseract = StubTesseract(args.ocr_latency)
+    image_to_text.get_tesseract = lambda: tesseract
+
+
+# ---------- process ลูก: รันหนึ่งจำนวนฉาก ----------
+
+def write_project(work_dir, args):
+    scenes = [
+        {"prompt": f"bench scene {i}", "text": f"{TEXTS[i % len(TEXTS)]} ({i})"}
+        for i in range(args.child_scenes)
+    ]
+    # ฉากเก็บใน scenes_file เหมือนโปรเจกต์ขนาดใหญ่จริง
+    with open(os.path.join(work_dir, "scenes.jsonl"), "w", encoding="utf-8") as f:
+        for scene in scenes:
+            f.write(json.dumps(scene, ensure_ascii=False) + "\n")
+    project = {
+        "scenes_file": "scenes.jsonl",
+        "output_path": "output/bench.mp4",
+        "width": args.size,
+        "height": args.size,
+        "fps": args.fps,
+        "image_batch_size": args.image_batch_size,
+        "scheduler": args.scheduler,
+        "voices": {"default": {"engine": "bench", "lang": "th", "slow": False}},
+    }
+    path = os.path.join(work_dir, "project.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(project, f, ensure_ascii=False)
+    return path
+
+
+def summarize_spans(spans):
+    # เวลาต่อรายการของแต่ละงาน (งานที่ทำหลายรายการต่อครั้งหารด้วยจำนวนรายการ)
+    tasks = {}
+    for record in spans:
+        per_item = record["wall_seconds"] / record["items"] if record["items"] else record["wall_seconds"]
+        tasks.setdefault(record["name"], []).append(per_item)
+    return {
+        name: {
+            "calls": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+        for name, values in tasks.items()
+    }
+
+
+def run_child(args):
+    import contextlib
+    import io
+
+    import metrics
+    from pipeline import run_project
+    from project import load_project
+    from video_assembly import get_ffmpeg_exe
+    from image_to_text import image_to_text
+
+    def load():
+        project = load_project(project_path)
+        if get_ffmpeg_exe() is None:
+            project.settings["video_engine"] = "moviepy"
+        return project
+
+    with tempfile.TemporaryDirectory(prefix="bench_e2e_") as work_dir:
+        os.chdir(work_dir)
+        project_path = write_project(work_dir, args)
+        project = load()
+        install_stubs(args, project.settings)
+
+        # รอบแรก: แคชว่าง สร้างทุกอย่างใหม่ (ข้อความความคืบหน้าของ pipeline ไม่แสดง)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_project(project)
+        cold_seconds = time.perf_counter() - start
+        spans = metrics.spans()
+
+        # รอบสอง: ทุกฉากมาจากแคชและ journal (วัดค่าใช้จ่ายของการตรวจแคช)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_project(load())
+        warm_seconds = time.perf_counter() - start
+
+        # คำอธิบายภาพและ OCR ของภาพที่สร้างขึ้น (สูงสุด --caption-images ภาพ)
+        images = []
+        for root, _, files in os.walk(project.settings["image_cache_dir"]):
+            images.extend(os.path.join(root, name) for name in files if name.endswith(".png"))
+        images = sorted(images)[:args.caption_images]
+        model, processor = StubCaptionModel(args.caption_latency), StubProcessor()
+        metrics.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in images:
+                image_to_text(path, model, processor, display=False)
+        caption_seconds = time.perf_counter() - start
+        caption_spans = metrics.spans()
+        metrics.stop()
+        os.chdir(ROOT)
+
+    image_wall = sum(record["wall_seconds"] for record in spans
+                     if record["name"] == ("generate_images" if args.scheduler == "sequential"
+                                           else "render_image_jobs"))
+    print(json.dumps({
+        "scenes": args.child_scenes,
+        "cold_seconds": cold_seconds,
+        "warm_seconds": warm_seconds,
+        "scenes_per_minute": args.child_scenes / cold_seconds * 60,
+        "images_per_second": args.child_scenes / image_wall if image_wall else None,
+        "captions_per_second": len(images) / caption_seconds if images and caption_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "latency": summarize_spans(spans + caption_spans),
+    }, ensure_ascii=False))
+
+
+# ---------- process หลัก ----------
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def config_of(args):
+    # การตั้งค่าที่ต้องตรงกันจึงจะเปรียบเทียบผลกันได้
+    return {key: getattr(args, key) for key in (
+        "scheduler", "size", "fps", "image_batch_size", "image_latency", "tts_latency",
+        "caption_latency", "ocr_latency", "caption_images")}
+
+
+def load_previous(results_path, config):
+    previous = {}
+    if not os.path.exists(results_path):
+        return previous
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("config") == config:
+                previous[record["result"]["scenes"]] = record
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดประสิทธิภาพของ pipeline ทั้งเส้นด้วยโมเดลจำลอง")
+    parser.add_argument("--scenes", type=int, nargs="+", default=[5, 25, 100], help="จำนวนฉาก (5-1000)")
+    parser.add_argument("--scheduler", choices=["graph", "sequential"], default="graph")
+    parser.add_argument("--size", type=int, default=128, help="ขนาดภาพและวิดีโอ (พิกเซล)")
+    parser.add_argument("--fps", type=int, default=12)
+    parser.add_argument("--image-batch-size", type=int, default=2)
+    parser.add_argument("--image-latency", type=float, default=0.05, help="เวลาหน่วงของ diffusion ต่อภาพ (วินาที)")
+    parser.add_argument("--tts-latency", type=float, default=0.02, help="เวลาหน่วงของ TTS ต่อคำขอ (วินาที)")
+    parser.add_argument("--caption-latency", type=float, default=0.02, help="เวลาหน่วงของ GIT ต่อภาพ (วินาที)")
+    parser.add_argument("--ocr-latency", type=float, default=0.01, help="เวลาหน่วงของ Tesseract ต่อภาพ (วินาที)")
+    parser.add_argument("--caption-images", type=int, default=20, help="จำนวนภาพที่ใช้วัด image_to_text")
+    parser.add_argument("--results", default=RESULTS_PATH, help="ไฟล์ JSONL ที่เก็บผลไว้เปรียบเทียบ")
+    parser.add_argument("--label", default=None, help="ชื่อของการรันนี้ในไฟล์ผลลัพธ์")
+    parser.add_argument("--child-scenes", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_scenes:
+        run_child(args)
+        return
+
+    config = config_of(args)
+    previous = load_previous(args.results, config)
+    revision = git_revision()
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+
+    print(f"{'scenes':>7} {'cold s':>8} {'warm s':>7} {'scenes/min':>11} {'img/s':>7} {'cap/s':>7} "
+          f"{'peak MB':>8} {'vs prev':>8}")
+    for count in args.scenes:
+        command = [sys.executable, os.path.abspath(__file__), "--child-scenes", str(count)]
+        for key, value in config.items():
+            command += [f"--{key.replace('_', '-')}", str(value)]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{count:>7} ล้มเหลว\n{completed.stderr[-2000:]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        before = previous.get(count)
+        change = f"{before['result']['cold_seconds'] / result['cold_seconds']:>7.2f}x" if before else f"{'-':>8}"
+        print(f"{count:>7} {result['cold_seconds']:>8.2f} {result['warm_seconds']:>7.2f} "
+              f"{result['scenes_per_minute']:>11.1f} {result['images_per_second'] or 0:>7.2f} "
+              f"{result['captions_per_second'] or 0:>7.2f} {result['peak_rss_mb']:>8.0f} {change}")
+        for name, latency in sorted(result["latency"].items()):
+            print(f"        {name:>26}: p50 {latency['p50_ms']:8.1f} ms  p95 {latency['p95_ms']:8.1f} ms  "
+                  f"p99 {latency['p99_ms']:8.1f} ms  ({latency['calls']} ครั้ง)")
+
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "time": time.time(), "revision": revision, "label": args.label,
+                "config": config, "result": result,
+            }, ensure_ascii=False) + "\n")
+    print(f"บันทึกผลไว้ที่ {args.results} (vs prev = ความเร็วเทียบกับการรันก่อนหน้าที่ตั้งค่าเดียวกัน)")
+
+
+if __name__ == "__main__":
+    main()
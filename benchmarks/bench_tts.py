@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# วัดปริมาณงานของเอนจิน TTS แต่ละตัว เป็นวินาทีของเสียงที่สร้างได้ต่อหนึ่งวินาที
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_tts.py --engines tone local gtts --scenes 20 --concurrency 4
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_probe import probe_duration  # noqa: E402
+from tts import get_backend, synthesize_all  # noqa: E402
+
+TEXTS = [
+    "เพนกวิน: เฮ้ย! ทุกคนเตรียมตัวให้พร้อม! วันนี้เราจะไปเที่ยวทะเลกัน!",
+    "แมว: แต่ฉันเอาเสื้อเชฟไปทำไมฟะ?",
+    "หมา: ผมเอาเสื้อซูเปอร์ฮีโร่ไป...เผื่อต้องช่วยใคร!",
+    "คุณเสียเวลากับการตอบอีเมลซ้ำ ๆ ทุกวันใช่ไหม?",
+    "แค่ส่งอีเมล ระบบจะเข้าใจและจัดการให้แบบอัตโนมัติ",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดปริมาณงานของเอนจิน TTS")
+    parser.add_argument("--engines", nargs="+", default=["tone", "local"])
+    parser.add_argument("--scenes", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    voice = {"lang": "th", "slow": False}
+    print(f"{'engine':>8} {'scenes':>7} {'wall s':>8} {'audio s':>8} {'audio s/s':>10}")
+    for engine in args.engines:
+        backend = get_backend(engine)
+        with tempfile.TemporaryDirectory(prefix="bench_tts_") as work_dir:
+            requests = [
+                (f"{TEXTS[i % len(TEXTS)]} ({i})", voice, os.path.join(work_dir, f"speech_{i}{backend.extension}"))
+                for i in range(args.scenes)
+            ]
+            # โหลดโมเดลก่อนจับเวลา (เฉพาะเอนจินแบบ local)
+            warmup = os.path.join(work_dir, f"warmup{backend.extension}")
+            backend.synthesize(TEXTS[0], voice, warmup)
+
+            start = time.perf_counter()
+            paths = synthesize_all(requests, backend, max_concurrency=args.concurrency)
+            elapsed = time.perf_counter() - start
+            total = sum(probe_duration(path) for path in paths)
+        print(f"{engine:>8} {args.scenes:>7} {elapsed:>8.2f} {total:>8.1f} {total / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import math
+import time
+import wave
+import struct
+import argparse
+import tempfile
+
+# เปรียบเทียบเวลาประกอบวิดีโอระหว่างเอนจิน ffmpeg กับ MoviePy (วิธีเดิม)
+# ใช้ภาพและเสียงสังเคราะห์ จึงไม่ต้องโหลดโมเดลหรือเชื่อมต่ออินเทอร์เน็ต
+#
+# ตัวอย่าง:
+#   python benchmarks/bench_video_assembly.py --scene-counts 5 50 500 --engines ffmpeg moviepy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from video_assembly import assemble_with_ffmpeg, assemble_with_moviepy  # noqa: E402
+
+ENGINES = {
+    "ffmpeg": assemble_with_ffmpeg,
+    "moviepy": assemble_with_moviepy,
+}
+
+
+def write_tone(path, seconds, frequency, sample_rate=22050):
+    # เขียนไฟล์ WAV เสียงโทนเดียวด้วยไลบรารีมาตรฐาน
+    frames = bytearray()
+    for n in range(int(seconds * sample_rate)):
+        value = int(8000 * math.sin(2 * math.pi * frequency * n / sample_rate))
+        frames += struct.pack("<h", value)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(bytes(frames))
+
+
+def make_assets(work_dir, count, speech_seconds, size):
+    from PIL import Image
+
+    scenes = []
+    for i in range(count):
+        image_path = os.path.join(work_dir, f"scene_{i}.png")
+        audio_path = os.path.join(work_dir, f"speech_{i}.wav")
+        color = ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)
+        Image.new("RGB", (size, size), color).save(image_path)
+        write_tone(audio_path, speech_seconds, 220 + 20 * (i % 10))
+        scenes.append({
+            "image_path": image_path,
+            "audio_path": audio_path,
+            "duration": speech_seconds + 1,
+        })
+    return scenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบเวลาประกอบวิดีโอของแต่ละเอนจิน")
+    parser.add_argument("--scene-counts", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--speech-seconds", type=float, default=2.0)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--fps", type=int, default=24)
+    args = parser.parse_args()
+
+    print(f"{'scenes':>7} {'engine':>8} {'seconds':>9} {'video s':>9} {'realtime x':>11}")
+    for count in args.scene_counts:
+        with tempfile.TemporaryDirectory(prefix="bench_video_") as work_dir:
+            scenes = make_assets(work_dir, count, args.speech_seconds, args.size)
+            video_seconds = sum(scene["duration"] for scene in scenes)
+            for engine in args.engines:
+                output_path = os.path.join(work_dir, f"out_{engine}.mp4")
+                start = time.perf_counter()
+                ENGINES[engine](scenes, output_path, fps=args.fps)
+                elapsed = time.perf_counter() - start
+                print(f"{count:>7} {engine:>8} {elapsed:>9.2f} {video_seconds:>9.0f} "
+                      f"{video_seconds / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
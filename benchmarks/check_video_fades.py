@@ -0,0 +1,114 @@
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+# ตรวจสอบสีของเฟรมในวิดีโอที่ประกอบด้วย fade_in: ทุกฉากต้องเห็นภาพของตัวเองเต็มจอหลังช่วงเฟด
+# และช่วงต้นของฉากที่ 2 เป็นต้นไปต้องมืดกว่า (กำลังเฟดเข้าจากสีดำ) ส่วนฉากแรกไม่เฟด
+# ใช้ภาพสีเดียว (แดง เขียว น้ำเงิน) แล้วอ่านค่าเฉลี่ยของพิกเซลจากเฟรมที่เวลาต่าง ๆ ด้วย ffmpeg
+# จบด้วย exit code 1 ถ้าสีไม่ตรง (ใช้ใน CI ได้)
+#
+# ตัวอย่าง:
+#   python benchmarks/check_video_fades.py
+#   python benchmarks/check_video_fades.py --engines ffmpeg segments moviepy --fade-in 0.5
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+from video_assembly import (assemble_with_ffmpeg, assemble_with_moviepy, assemble_with_segments,  # noqa: E402
+                            get_ffmpeg_exe)
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+ENGINES = {
+    "ffmpeg": lambda scenes, path, fps, fade_in, size: assemble_with_ffmpeg(scenes, path, fps, fade_in),
+    "segments": lambda scenes, path, fps, fade_in, size: assemble_with_segments(scenes, path, fps, size, size,
+                                                                                fade_in),
+    "moviepy": lambda scenes, path, fps, fade_in, size: assemble_with_moviepy(scenes, path, fps, fade_in),
+}
+
+
+def make_scenes(work_dir, size, seconds):
+    from PIL import Image
+    from tts import ToneBackend
+
+    backend = ToneBackend(sample_rate=16000)
+    scenes = []
+    for i, color in enumerate(COLORS):
+        image_path = os.path.join(work_dir, f"image_{i}.png")
+        audio_path = os.path.join(work_dir, f"audio_{i}.wav")
+        Image.new("RGB", (size, size), color).save(image_path)
+        backend.synthesize("ก" * max(1, int(seconds / 0.06)), {}, audio_path)
+        scenes.append({"image_path": image_path, "audio_path": audio_path, "duration": seconds})
+    return scenes
+
+
+def mean_color(video_path, t, size):
+    # ค่าเฉลี่ย (R, G, B) ของเฟรมที่เวลา t
+    completed = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-ss", f"{t:.3f}", "-i", video_path,
+         "-frames:v", "1", "-vf", f"scale={size}:{size}", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"],
+        check=True, capture_output=True)
+    pixels = completed.stdout
+    count = len(pixels) // 3
+    return tuple(sum(pixels[c::3]) / max(1, count) for c in range(3))
+
+
+def check(video_path, scenes, fade_in, size):
+    """
+    คืนรายการข้อผิดพลาด (ว่าง = ผ่าน)
+    """
+    errors = []
+    start = 0.0
+    for i, scene in enumerate(scenes):
+        channel = COLORS[i].index(255)
+        # หลังช่วงเฟด ภาพต้องเป็นสีของฉากนี้เต็มที่
+        t = start + min(scene["duration"] - 0.2, fade_in + (scene["duration"] - fade_in) / 2)
+        full = mean_color(video_path, t, size)
+        if full[channel] < 200 or max(full[c] for c in range(3) if c != channel) > 60:
+            errors.append(f"ฉากที่ {i + 1} เวลา {t:.2f}: สี {tuple(round(v) for v in full)} ไม่ใช่ {COLORS[i]}")
+        # ช่วงต้นของฉาก: ฉากแรกไม่เฟด ฉากอื่นกำลังเฟดจากสีดำ (มืดกว่าตอนเต็มจอ)
+        if fade_in > 0:
+            t = start + fade_in * 0.25
+            early = mean_color(video_path, t, size)
+            if i == 0 and early[channel] < 200:
+                errors.append(f"ฉากที่ 1 เวลา {t:.2f}: สี {tuple(round(v) for v in early)} ไม่ควรเฟด")
+            if i > 0 and not 10 < early[channel] < full[channel] - 40:
+                errors.append(f"ฉากที่ {i + 1} เวลา {t:.2f}: สี {tuple(round(v) for v in early)} ไม่ได้เฟดเข้า")
+        start += scene["duration"]
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ตรวจสอบสีของเฟรมในวิดีโอที่ประกอบด้วย fade_in")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=["ffmpeg", "segments"])
+    parser.add_argument("--fade-in", type=float, default=1.0)
+    parser.add_argument("--seconds", type=float, default=2.0, help="ความยาวของแต่ละฉาก")
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--size", type=int, default=64, help="ขนาดภาพ (พิกเซล)")
+    args = parser.parse_args()
+
+    if get_ffmpeg_exe() is None:
+        print("ไม่พบ ffmpeg")
+        sys.exit(1)
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="check_video_fades_") as work_dir:
+        scenes = make_scenes(work_dir, args.size, args.seconds)
+        for engine in args.engines:
+            video_path = os.path.join(work_dir, f"{engine}.mp4")
+            ENGINES[engine](scenes, video_path, args.fps, args.fade_in, args.size)
+            errors = check(video_path, scenes, args.fade_in, args.size)
+            if errors:
+                failed = True
+                print(f"{engine}: ไม่ผ่าน")
+                for error in errors:
+                    print(f"  {error}")
+            else:
+                print(f"{engine}: ผ่าน (ทุกฉากเห็นภาพของตัวเองและเฟดเข้าเฉพาะต้นฉาก)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+# ตรวจสอบว่าการประกอบวิดีโอแบบเป็นช่วง (video_window) ใช้หน่วยความจำและจำนวนไฟล์ที่เปิดคงที่
+# เมื่อจำนวนฉากเพิ่มขึ้น แต่ละจำนวนฉากรันใน process แยก แล้วเทียบค่าสูงสุดกับจำนวนฉากที่น้อยที่สุด
+# จบด้วย exit code 1 ถ้าค่าเพิ่มขึ้นเกินเกณฑ์ (ใช้ใน CI ได้)
+#
+# ตัวอย่าง:
+#   python benchmarks/check_video_memory.py --scenes 25 100 400
+#   python benchmarks/check_video_memory.py --mode full --scenes 25 100   (วิธีเดิม เพื่อดูว่าเพิ่มขึ้นตามจำนวนฉาก)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+
+def current_rss_mb():
+    # VmRSS ของ process นี้ (Linux)
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+class Sampler(threading.Thread):
+    """
+    อ่านหน่วยความจำและจำนวนไฟล์ที่เปิดอยู่เป็นระยะ แล้วเก็บค่าสูงสุด
+    """
+
+    def __init__(self, interval=0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_fds = 0
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+            self.peak_fds = max(self.peak_fds, open_fds())
+            self._finished.wait(self.interval)
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+
+
+def make_scenes(work_dir, count, size, seconds):
+    from PIL import Image
+    from tts import ToneBackend
+
+    backend = ToneBackend(sample_rate=16000)
+    scenes = []
+    for i in range(count):
+        image_path = os.path.join(work_dir, f"image_{i}.png")
+        audio_path = os.path.join(work_dir, f"audio_{i}.wav")
+        Image.new("RGB", (size, size), ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)).save(image_path)
+        # ข้อความยาวตามความยาวเสียงที่ต้องการ (ToneBackend สร้าง 0.06 วินาทีต่อตัวอักษร)
+        backend.synthesize("ก" * max(1, int(seconds / 0.06)), {}, audio_path)
+        scenes.append({"image_path": image_path, "audio_path": audio_path, "duration": seconds})
+    return scenes
+
+
+def run_child(args):
+    from video_assembly import assemble_video
+
+    with tempfile.TemporaryDirectory(prefix="check_video_memory_") as work_dir:
+        scenes = make_scenes(work_dir, args.child_scenes, args.size, args.seconds)
+        output_path = os.path.join(work_dir, "output.mp4")
+        baseline_rss, baseline_fds = current_rss_mb(), open_fds()
+
+        sampler = Sampler()
+        sampler.start()
+        start = time.perf_counter()
+        assemble_video(scenes, output_path, fps=args.fps, engine="moviepy",
+                       window=args.window if args.mode == "windowed" else None, size=(args.size, args.size))
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({
+        "scenes": args.child_scenes,
+        "seconds": elapsed,
+        "rss_growth_mb": sampler.peak_rss_mb - baseline_rss,
+        "fd_growth": sampler.peak_fds - baseline_fds,
+        "child_peak_rss_mb": children,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ตรวจสอบว่าหน่วยความจำของการประกอบวิดีโอคงที่เมื่อจำนวนฉากเพิ่มขึ้น")
+    parser.add_argument("--scenes", type=int, nargs="+", default=[25, 100, 400])
+    parser.add_argument("--mode", choices=["windowed", "full"], default="windowed")
+    parser.add_argument("--window", type=int, default=16)
+    parser.add_argument("--size", type=int, default=64, help="ขนาดภาพ (พิกเซล)")
+    parser.add_argument("--fps", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=0.5, help="ความยาวของแต่ละฉาก")
+    parser.add_argument("--rss-tolerance-mb", type=float, default=50.0,
+                        help="หน่วยความจำที่เพิ่มขึ้นได้เทียบกับจำนวนฉากที่น้อยที่สุด (MB)")
+    parser.add_argument("--fd-tolerance", type=int, default=4,
+                        help="จำนวนไฟล์ที่เปิดเพิ่มขึ้นได้เทียบกับจำนวนฉากที่น้อยที่สุด")
+    parser.add_argument("--child-scenes", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_scenes:
+        run_child(args)
+        return
+
+    results = []
+    print(f"{'scenes':>7} {'seconds':>8} {'+RSS MB':>8} {'+fds':>5} {'ffmpeg MB':>10}")
+    for count in sorted(args.scenes):
+        command = [sys.executable, os.path.abspath(__file__), "--child-scenes", str(count),
+                   "--mode", args.mode, "--window", str(args.window), "--size", str(args.size),
+                   "--fps", str(args.fps), "--seconds", str(args.seconds)]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{count:>7} ล้มเหลว\n{completed.stderr[-2000:]}")
+            sys.exit(1)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{count:>7} {result['seconds']:>8.1f} {result['rss_growth_mb']:>8.1f} {result['fd_growth']:>5} "
+              f"{result['child_peak_rss_mb']:>10.1f}")
+
+    first, last = results[0], results[-1]
+    rss_ok = last["rss_growth_mb"] - first["rss_growth_mb"] <= args.rss_tolerance_mb
+    fds_ok = last["fd_growth"] - first["fd_growth"] <= args.fd_tolerance
+    if rss_ok and fds_ok:
+        print(f"ผ่าน: หน่วยความจำและไฟล์ที่เปิดไม่เพิ่มตามจำนวนฉาก ({first['scenes']} -> {last['scenes']} ฉาก)")
+        return
+    if not rss_ok:
+        print(f"ไม่ผ่าน: หน่วยความจำเพิ่มขึ้น {last['rss_growth_mb'] - first['rss_growth_mb']:.1f} MB "
+              f"(เกณฑ์ {args.rss_tolerance_mb} MB)")
+    if not fds_ok:
+        print(f"ไม่ผ่าน: ไฟล์ที่เปิดเพิ่มขึ้น {last['fd_growth'] - first['fd_growth']} "
+              f"(เกณฑ์ {args.fd_tolerance})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+
+# โปรไฟล์ความเร็วของ Stable Diffusion (เลือกด้วย diffusion_profile ในไฟล์โปรเจกต์ หรือ --profile)
+#
+#   default:   แบบเดิม (scheduler ของโมเดล, float32 บน CPU)
+#   cpu-fast:  DPM-Solver++ multistep 20 steps, attention/VAE slicing, channels_last และ bfloat16 ถ้า CPU รองรับ
+#   lcm:       LCM-LoRA + LCMScheduler 4 steps (guidance 1.0) เร็วที่สุด แต่ภาพต่างจากเดิมมาก
+#   distilled: โมเดลที่ถูกกลั่นให้เล็กลง (segmind/tiny-sd) + การตั้งค่าแบบ cpu-fast
+#
+# ค่า num_inference_steps, guidance_scale และ model_id ของโปรไฟล์จะแทนค่าในโปรเจกต์
+# ภาพที่ได้จากแต่ละโปรไฟล์จึงเก็บแยกกันในแคช
+
+PROFILES = {
+    "default": {},
+    "cpu-fast": {
+        "scheduler": "dpm++",
+        "attention_slicing": True,
+        "vae_slicing": True,
+        "channels_last": True,
+        "bfloat16": True,
+        "settings": {"num_inference_steps": 20},
+    },
+    "lcm": {
+        "scheduler": "lcm",
+        "lora": "latent-consistency/lcm-lora-sdv1-5",
+        "attention_slicing": True,
+        "vae_slicing": True,
+        "channels_last": True,
+        "bfloat16": True,
+        "settings": {"num_inference_steps": 4, "guidance_scale": 1.0},
+    },
+    "distilled": {
+        "scheduler": "dpm++",
+        "attention_slicing": True,
+        "vae_slicing": True,
+        "channels_last": True,
+        "bfloat16": True,
+        "settings": {
+            "model_id": "segmind/tiny-sd",
+            "local_model_path": "./model_cache/tiny-sd",
+            "num_inference_steps": 25,
+        },
+    },
+}
+
+
+def get_profile(name):
+    """
+    คืนการตั้งค่าของโปรไฟล์ตามชื่อ
+    """
+    if name not in PROFILES:
+        raise ValueError(f"ไม่รู้จักโปรไฟล์ {name} (มี: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def apply_profile(settings):
+    """
+    แทนค่า steps, guidance และโมเดลในการตั้งค่าของโปรเจกต์ด้วยค่าของโปรไฟล์ (แก้ไข settings โดยตรง)
+    """
+    for key, value in get_profile(settings["diffusion_profile"]).get("settings", {}).items():
+        if settings[key] != value:
+            print(f"โปรไฟล์ {settings['diffusion_profile']}: {key} = {value} (เดิม {settings[key]})")
+            settings[key] = value
+    return settings
+
+
+def cpu_supports_bf16():
+    """
+    ตรวจสอบว่า CPU มีคำสั่ง bfloat16 (AVX512-BF16 หรือ AMX) หรือไม่ ถ้าไม่มี bfloat16 จะช้ากว่า float32
+    """
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def configure_pipeline(pipe, profile_name):
+    """
+    ปรับ StableDiffusionPipeline ที่โหลดแล้วตามโปรไฟล์
+
+    Args:
+        pipe: StableDiffusionPipeline
+        profile_name: ชื่อโปรไฟล์
+
+    Returns:
+        pipeline ที่ปรับแล้ว
+    """
+    import torch
+
+    profile = get_profile(profile_name)
+    on_cpu = pipe.device.type == "cpu"
+
+    if profile.get("lora"):
+        print(f"กำลังโหลด LoRA {profile['lora']}...")
+        pipe.load_lora_weights(profile["lora"], cache_dir=os.path.abspath("./model_cache"))
+        pipe.fuse_lora()
+
+    scheduler = profile.get("scheduler")
+    if scheduler == "dpm++":
+        from diffusers import DPMSolverMultistepScheduler
+        pipe.scheduler = DPMSolverMultistepScheduler.from_config(
+            pipe.scheduler.config, algorithm_type="dpmsolver++", use_karras_sigmas=True)
+    elif scheduler == "lcm":
+        from diffusers import LCMScheduler
+        pipe.scheduler = LCMScheduler.from_config(pipe.scheduler.config)
+
+    if profile.get("attention_slicing"):
+        pipe.enable_attention_slicing()
+    if profile.get("vae_slicing"):
+        pipe.enable_vae_slicing()
+
+    if on_cpu and profile.get("bfloat16"):
+        if cpu_supports_bf16():
+            print("CPU รองรับ bfloat16 จะใช้ bfloat16")
+            pipe = pipe.to(torch.bfloat16)
+        else:
+            print("CPU ไม่รองรับ bfloat16 จะใช้ float32")
+            pipe = pipe.to(torch.float32)
+    if on_cpu and profile.get("channels_last"):
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+
+    return pipe
@@ -1,34 +1,88 @@
-import torch
-from PIL import Image
-from transformers import AutoProcessor, AutoModelForCausalLM
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 import argparse
 import os
 from pathlib import Path
-import pytesseract
-from pytesseract import Output
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from metrics import instrument
+from worker_client import call_worker
 
-# Configure matplotlib to use a Thai-compatible font
-plt.rcParams['font.family'] = 'Tahoma'  # or 'Arial', 'Angsana New', 'Cordia New', etc.
-plt.rcParams['axes.unicode_minus'] = False
+# torch, transformers, pytesseract และ matplotlib จะ import เมื่อใช้งานจริงเท่านั้น
+# เช่น --no-display จะไม่ import matplotlib และ --worker จะไม่โหลดโมเดลใน process นี้
 
 # Configure Tesseract path
 TESSERACT_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-if os.path.exists(TESSERACT_PATH):
-    pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-else:
-    print("Warning: Tesseract OCR not found at default path. Please install Tesseract OCR and set the correct path.")
-    print("Default path checked:", TESSERACT_PATH)
-    print("You can set the correct path by modifying TESSERACT_PATH in the code.")
 
-def load_model_and_processor():
+_tesseract = None
+
+def get_tesseract():
+    """
+    import pytesseract และตั้งค่าเส้นทางของ Tesseract (ครั้งเดียวต่อ process)
+    """
+    global _tesseract
+    if _tesseract is None:
+        import pytesseract
+        if os.path.exists(TESSERACT_PATH):
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+        else:
+            print("Warning: Tesseract OCR not found at default path. Please install Tesseract OCR and set the correct path.")
+            print("Default path checked:", TESSERACT_PATH)
+            print("You can set the correct path by modifying TESSERACT_PATH in the code.")
+        _tesseract = pytesseract
+    return _tesseract
+
+def get_pyplot():
+    """
+    import matplotlib และตั้งค่าฟอนต์ภาษาไทย (เฉพาะตอนที่ต้องแสดงรูปภาพ)
+    """
+    import matplotlib.pyplot as plt
+
+    # Configure matplotlib to use a Thai-compatible font
+    plt.rcParams['font.family'] = 'Tahoma'  # or 'Arial', 'Angsana New', 'Cordia New', etc.
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+# โมเดลที่ quantize แล้ว และ kernel ที่ torch.compile สร้างไว้ เก็บไว้ใช้ซ้ำใน model_cache
+QUANTIZED_MODEL_DIR = "./model_cache/text_to_image_int8"
+COMPILE_CACHE_DIR = "./model_cache/inductor"
+
+def _quantized_model_path():
+    # ไฟล์ที่ pickle ไว้ใช้ได้กับ torch/transformers เวอร์ชันเดียวกันเท่านั้น จึงใส่เวอร์ชันในชื่อไฟล์
+    import torch
+    import transformers
+    return os.path.join(QUANTIZED_MODEL_DIR, f"git-base-int8-torch{torch.__version__}-transformers{transformers.__version__}.pt")
+
+def quantize_model(model):
+    """
+    quantize ชั้น Linear ของโมเดลเป็น int8 แบบ dynamic (น้ำหนักเป็น int8, activation คำนวณตอนรัน)
+    """
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def compile_model(model):
+    """
+    คอมไพล์ forward ของโมเดลด้วย torch.compile (model.generate จะเรียก forward ที่คอมไพล์แล้ว)
+    การเรียกครั้งแรกจะช้าเพราะต้องคอมไพล์ kernel ซึ่งจะเก็บไว้ใน COMPILE_CACHE_DIR
+    """
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.abspath(COMPILE_CACHE_DIR))
+    import torch
+    model.forward = torch.compile(model.forward, dynamic=True)
+    return model
+
+@instrument("model_load")
+def load_model_and_processor(quantize=False, compiled=False):
     """
     โหลดโมเดลและ processor สำหรับการแปลงรูปภาพเป็นข้อความ
     เลือกใช้โมเดล microsoft/git-base ซึ่งเป็นโมเดลที่ไม่ต้องการ token
     
-    ตรวจสอบว่ามีโมเดลใน local หรือไม่ ถ้ามีจะใช้โมเดลใน local แทน
+    ตรวจสอบว่ามีโมเดลใน local ที่บันทึกครบถ้วนหรือไม่ (ดู model_store.py) ถ้ามีจะโหลดแบบ memory-mapped
+    
+    Args:
+        quantize: ใช้โมเดลที่ quantize เป็น int8 (เร็วขึ้นบน CPU คำอธิบายอาจต่างจากเดิมเล็กน้อย)
+        compiled: คอมไพล์โมเดลด้วย torch.compile
     """
+    from transformers import AutoProcessor, AutoModelForCausalLM
+    from model_store import is_complete, load_pretrained, open_model
+
     # ใช้โมเดล Git-base จาก Microsoft ซึ่งเป็นโมเดลขนาดกลางที่มีประสิทธิภาพดี
     model_name = "microsoft/git-base"
     
@@ -36,37 +90,117 @@ def load_model_and_processor():
     local_model_path = "./model_cache/text_to_image"
     # local_model_path.mkdir(parents=True, exist_ok=True)
     
-    # ตรวจสอบว่ามีโมเดลใน local หรือไม่
-    if os.path.exists(local_model_path):
-        print(f"กำลังโหลดโมเดลจาก local: {local_model_path}")
-        processor = AutoProcessor.from_pretrained(str(local_model_path))
-        model = AutoModelForCausalLM.from_pretrained(str(local_model_path))
+    # โมเดล int8 ที่บันทึกไว้ใช้ได้เอง (ไม่ต้องโหลดน้ำหนัก fp32) ถ้าโหลดไม่ได้จะ quantize ใหม่แล้วเขียนทับ
+    model = None
+    if quantize and os.path.exists(_quantized_model_path()):
+        import torch
+        print(f"กำลังโหลดโมเดล int8 จาก local: {_quantized_model_path()}")
+        try:
+            model = torch.load(_quantized_model_path(), weights_only=False)
+        except Exception as e:
+            print(f"ไม่สามารถโหลดโมเดล int8 ได้ ({e}) จะ quantize ใหม่")
+
+    if model is not None:
+        # ใช้เฉพาะ processor (ไฟล์เล็ก) จาก local ถ้าบันทึกไว้ครบ ไม่เช่นนั้นจากแคชของ HuggingFace
+        processor = AutoProcessor.from_pretrained(local_model_path if is_complete(local_model_path) else model_name)
     else:
-        print("กำลังดาวน์โหลดโมเดลจาก HuggingFace... (อาจใช้เวลาสักครู่)")
-        processor = AutoProcessor.from_pretrained(model_name)
-        model = AutoModelForCausalLM.from_pretrained(model_name)
-        
-        # บันทึกโมเดลและ processor ลงใน local
-        print(f"กำลังบันทึกโมเดลลงใน local: {local_model_path}")
-        processor.save_pretrained(str(local_model_path))
-        model.save_pretrained(str(local_model_path))
+        def load(path):
+            return AutoProcessor.from_pretrained(path), load_pretrained(AutoModelForCausalLM, path)
+
+        def save(loaded, path):
+            loaded[0].save_pretrained(path)
+            loaded[1].save_pretrained(path, safe_serialization=True)
+
+        # โหลดจาก local ถ้าบันทึกไว้ครบแล้ว ไม่เช่นนั้นดาวน์โหลดแล้วบันทึกแบบ atomic
+        processor, model = open_model(local_model_path, model_name, load, save)
+
+        if quantize:
+            import torch
+            print("กำลัง quantize โมเดลเป็น int8...")
+            model = quantize_model(model.eval())
+            # บันทึกไว้ใช้ในครั้งต่อไป เขียนไฟล์ชั่วคราวแล้วแทนที่ไฟล์เดิม (รวมถึงไฟล์ที่เสียหาย) แบบ atomic
+            os.makedirs(QUANTIZED_MODEL_DIR, exist_ok=True)
+            temp_path = f"{_quantized_model_path()}.{os.getpid()}.tmp"
+            torch.save(model, temp_path)
+            os.replace(temp_path, _quantized_model_path())
+    
+    model.eval()
+    if compiled:
+        print("กำลังคอมไพล์โมเดลด้วย torch.compile (ภาพแรกจะช้ากว่าปกติ)")
+        model = compile_model(model)
     
     print("โหลดโมเดลเสร็จเรียบร้อย")
     return model, processor
 
-def extract_text_from_image(image_path):
+def _otsu_threshold(histogram):
+    # หาค่า threshold ที่แยกพื้นหลังกับตัวอักษรได้ดีที่สุดจาก histogram ของภาพขาวดำ (Otsu)
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold, best_variance = 0, -1.0
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+def preprocess_for_ocr(image, grayscale=False, max_side=None, binarize=None):
+    """
+    เตรียมรูปภาพก่อนส่งให้ Tesseract
+    
+    Args:
+        image: รูปภาพ PIL
+        grayscale: แปลงเป็นภาพขาวดำ (ระดับเทา)
+        max_side: ย่อภาพให้ด้านที่ยาวที่สุดไม่เกินค่านี้ (None = ไม่ย่อ)
+        binarize: แปลงเป็นภาพสองสี ใช้ค่า threshold 0-255 หรือ "otsu" เพื่อหาค่าอัตโนมัติ (None = ไม่แปลง)
+    
+    Returns:
+        รูปภาพ PIL ที่เตรียมแล้ว
+    """
+    from PIL import Image
+
+    if max_side and max(image.size) > max_side:
+        scale = max_side / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+    if grayscale or binarize is not None:
+        image = image.convert("L")
+    if binarize is not None:
+        threshold = _otsu_threshold(image.histogram()) if binarize == "otsu" else int(binarize)
+        image = image.point(lambda value: 255 if value > threshold else 0)
+    return image
+
+@instrument("ocr", items=lambda image_path, preprocess=None: 1)
+def extract_text_from_image(image_path, preprocess=None):
     """
     ดึงข้อความจากรูปภาพโดยใช้ OCR
     
     Args:
         image_path: เส้นทางไปยังไฟล์รูปภาพ
+        preprocess: dict ของการเตรียมภาพที่ส่งให้ preprocess_for_ocr เช่น {"grayscale": True}
+            (None = ใช้ภาพต้นฉบับ)
     
     Returns:
         ข้อความที่ดึงได้จากรูปภาพ
     """
     try:
+        from PIL import Image
+        pytesseract = get_tesseract()
+
         # โหลดรูปภาพ
         image = Image.open(image_path)
+        if preprocess:
+            image = preprocess_for_ocr(image, **preprocess)
         
         # ตั้งค่าภาษาให้รองรับทั้งไทยและอังกฤษ
         custom_config = r'--oem 3 --psm 6 -l tha+eng'
@@ -82,7 +216,57 @@ def extract_text_from_image(image_path):
     except Exception as e:
         return f"เกิดข้อผิดพลาดในการดึงข้อความ: {str(e)}"
 
-def image_to_text(image_path, model, processor):
+@instrument("caption", items=lambda pixel_values, *args, **kwargs: len(pixel_values))
+def generate_captions(pixel_values, model, processor, num_beams=5):
+    """
+    สร้างคำอธิบายของรูปภาพหลายรูปในการเรียก model.generate ครั้งเดียว
+    
+    Args:
+        pixel_values: tensor ของรูปภาพที่ผ่าน processor แล้ว (batch, channels, height, width)
+        model: โมเดลที่ใช้ในการแปลง
+        processor: processor สำหรับเตรียมข้อมูล
+        num_beams: จำนวน beam ของ beam search (1 = greedy เร็วที่สุด)
+    
+    Returns:
+        รายการคำอธิบายรูปภาพตามลำดับเดิม
+    """
+    import torch
+
+    # early_stopping ใช้กับ beam search เท่านั้น
+    options = {"num_beams": num_beams, "early_stopping": True} if num_beams > 1 else {"do_sample": False}
+    with torch.no_grad():
+        generated_ids = model.generate(
+            pixel_values=pixel_values,
+            max_length=50,
+            **options
+        )
+    
+    # แปลงกลับเป็นข้อความ
+    return processor.batch_decode(generated_ids, skip_special_tokens=True)
+
+def generate_caption(image, model, processor, num_beams=5):
+    """
+    สร้างคำอธิบายรูปภาพด้วยโมเดล
+    
+    Args:
+        image: รูปภาพ PIL
+        model: โมเดลที่ใช้ในการแปลง
+        processor: processor สำหรับเตรียมข้อมูล
+        num_beams: จำนวน beam ของ beam search (1 = greedy)
+    
+    Returns:
+        คำอธิบายรูปภาพ
+    """
+    # แปลงรูปภาพเป็นรูปแบบที่โมเดลต้องการ
+    print("กำลังประมวลผลรูปภาพ...")
+    pixel_values = processor(images=image, return_tensors="pt").pixel_values
+    
+    # สร้างคำอธิบายรูปภาพ
+    print("กำลังสร้างคำอธิบายรูปภาพ...")
+    return generate_captions(pixel_values, model, processor, num_beams)[0]
+
+@instrument("caption", items=lambda image_path, *args, **kwargs: 1)
+def image_to_text(image_path, model, processor, display=True, ocr_preprocess=None, num_beams=5):
     """
     แปลงรูปภาพเป็นข้อความด้วยโมเดลและดึงข้อความจากรูปภาพ
     
@@ -90,70 +274,151 @@ def image_to_text(image_path, model, processor):
         image_path: เส้นทางไปยังไฟล์รูปภาพ
         model: โมเดลที่ใช้ในการแปลง
         processor: processor สำหรับเตรียมข้อมูล
+        display: แสดงรูปภาพด้วย matplotlib ระหว่างประมวลผล
+        ocr_preprocess: การเตรียมภาพก่อน OCR (ดู preprocess_for_ocr)
+        num_beams: จำนวน beam ของการสร้างคำอธิบาย (1 = greedy)
     
     Returns:
         tuple: (คำอธิบายรูปภาพ, ข้อความที่ดึงได้จากรูปภาพ)
     """
+    from PIL import Image
+
+    plt = get_pyplot() if display else None
     try:
         # โหลดรูปภาพ
         print(f"กำลังโหลดรูปภาพจาก {image_path}...")
         image = Image.open(image_path)
         
-        # ทางเลือก 1: แสดงรูปภาพแบบไม่บล็อกการทำงาน
-        plt.figure(figsize=(8, 8))
-        plt.imshow(image)
-        plt.axis('off')
-        plt.title("รูปภาพที่ต้องการแปลงเป็นข้อความ")
-        plt.draw()  # วาดรูปภาพ
-        plt.pause(0.001)  # แสดงรูปโดยไม่บล็อกการทำงาน
+        if plt is not None:
+            # ทางเลือก 1: แสดงรูปภาพแบบไม่บล็อกการทำงาน
+            plt.figure(figsize=(8, 8))
+            plt.imshow(image)
+            plt.axis('off')
+            plt.title("รูปภาพที่ต้องการแปลงเป็นข้อความ")
+            plt.draw()  # วาดรูปภาพ
+            plt.pause(0.001)  # แสดงรูปโดยไม่บล็อกการทำงาน
         
         # ดึงข้อความจากรูปภาพ
+        # (Tesseract รันเป็น process แยก จึงทำพร้อมกับการสร้างคำอธิบายรูปภาพได้)
         print("กำลังดึงข้อความจากรูปภาพ...")
-        extracted_text = extract_text_from_image(image_path)
-        
-        # แปลงรูปภาพเป็นรูปแบบที่โมเดลต้องการ
-        print("กำลังประมวลผลรูปภาพ...")
-        pixel_values = processor(images=image, return_tensors="pt").pixel_values
-        
-        # สร้างคำอธิบายรูปภาพ
-        print("กำลังสร้างคำอธิบายรูปภาพ...")
-        with torch.no_grad():
-            generated_ids = model.generate(
-                pixel_values=pixel_values,
-                max_length=50,
-                num_beams=5,
-                early_stopping=True
-            )
-        
-        # แปลงกลับเป็นข้อความ
-        generated_caption = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            ocr_future = executor.submit(extract_text_from_image, image_path, ocr_preprocess)
+            
+            # สร้างคำอธิบายรูปภาพ
+            generated_caption = generate_caption(image, model, processor, num_beams)
+            extracted_text = ocr_future.result()
         
         # หากยังแสดงรูปภาพอยู่ ให้คงไว้สักครู่แล้วปิด
-        plt.close('all')  # ปิดหน้าต่างแสดงรูปภาพทั้งหมด
+        if plt is not None:
+            plt.close('all')  # ปิดหน้าต่างแสดงรูปภาพทั้งหมด
         
         return generated_caption, extracted_text
     
     except Exception as e:
-        plt.close('all')  # ปิดหน้าต่างแสดงรูปภาพในกรณีเกิดข้อผิดพลาด
+        if plt is not None:
+            plt.close('all')  # ปิดหน้าต่างแสดงรูปภาพในกรณีเกิดข้อผิดพลาด
         return f"เกิดข้อผิดพลาด: {str(e)}", ""
 
+def run_batch(args):
+    """
+    โหมดหลายภาพ: สร้างคำอธิบายและดึงข้อความของภาพทั้งหมด แล้วเขียนลงไฟล์ JSONL
+    """
+    from batch_caption import collect_images, caption_images
+
+    if args.worker:
+        print("โหมดหลายภาพใช้โมเดลใน process นี้ ไม่ใช้ --worker")
+    paths = collect_images(args.input_dir, args.glob, args.file_list)
+    if not paths:
+        print("ไม่พบไฟล์รูปภาพ")
+        return
+    
+    try:
+        model, processor = load_model_and_processor(args.quantize, args.compile)
+        caption_images(paths, model, processor, args.output, batch_size=args.batch_size,
+                       workers=args.prefetch_workers, ocr=not args.no_ocr,
+                       ocr_workers=args.ocr_workers, ocr_preprocess=args.ocr_preprocess,
+                       num_beams=args.num_beams)
+        print(f"บันทึกผลลัพธ์ไว้ที่ {args.output}")
+    except KeyboardInterrupt:
+        print(f"\nโปรแกรมถูกยกเลิกโดยผู้ใช้ (ผลลัพธ์ที่เสร็จแล้วอยู่ใน {args.output} รันซ้ำเพื่อทำต่อ)")
+
 def main():
     parser = argparse.ArgumentParser(description='แปลงรูปภาพเป็นข้อความด้วย AI และดึงข้อความจากรูปภาพ')
-    parser.add_argument('--image', type=str, required=True, help='เส้นทางไปยังไฟล์รูปภาพ')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--image', type=str, help='เส้นทางไปยังไฟล์รูปภาพ')
+    source.add_argument('--input-dir', type=str, help='โฟลเดอร์ของรูปภาพ (รวมโฟลเดอร์ย่อย) สำหรับประมวลผลทีละมาก ๆ')
+    source.add_argument('--glob', type=str, help='glob pattern ของรูปภาพ เช่น "frames/**/*.png"')
+    source.add_argument('--file-list', type=str, help='ไฟล์รายชื่อรูปภาพ บรรทัดละหนึ่งไฟล์')
     parser.add_argument('--no-display', action='store_true', help='ไม่แสดงรูปภาพ')
+    parser.add_argument('--worker', type=str, default=os.environ.get('SHOTVDO_WORKER'),
+                        help='URL ของ model worker ที่โหลดโมเดลค้างไว้ เช่น http://127.0.0.1:8765')
+    parser.add_argument('--output', type=str, default='captions.jsonl',
+                        help='ไฟล์ผลลัพธ์ JSONL ของโหมดหลายภาพ (รันซ้ำจะข้ามภาพที่มีผลลัพธ์แล้ว)')
+    parser.add_argument('--batch-size', type=int, default=8, help='จำนวนภาพต่อการเรียกโมเดลหนึ่งครั้ง')
+    parser.add_argument('--prefetch-workers', type=int, default=4, help='จำนวน thread ที่โหลดและเตรียมภาพล่วงหน้า')
+    parser.add_argument('--no-ocr', action='store_true', help='ไม่ดึงข้อความจากรูปภาพด้วย Tesseract')
+    parser.add_argument('--ocr-workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='จำนวน process ที่รัน Tesseract พร้อมกับการสร้างคำอธิบายภาพ (โหมดหลายภาพ)')
+    parser.add_argument('--ocr-preprocess', type=str, default=None,
+                        help='เตรียมภาพก่อน OCR เช่น "grayscale,downscale=1600,binarize" (binarize=N กำหนด threshold เอง)')
+    parser.add_argument('--decoding', choices=['beam', 'greedy'], default='beam',
+                        help='beam = beam search (ค่าเริ่มต้น), greedy = เร็วกว่าแต่คำอธิบายอาจสั้นกว่า')
+    parser.add_argument('--num-beams', type=int, default=5, help='จำนวน beam เมื่อใช้ --decoding beam')
+    parser.add_argument('--quantize', action='store_true',
+                        help='ใช้โมเดล int8 แบบ dynamic quantization (เร็วขึ้นบน CPU เก็บไว้ใน model_cache)')
+    parser.add_argument('--compile', action='store_true', help='คอมไพล์โมเดลด้วย torch.compile')
+    parser.add_argument('--report', type=str, help='เขียนรายงาน JSON ของเวลาแต่ละขั้นตอน (โหลดโมเดล, คำอธิบายภาพ, OCR)')
+    parser.add_argument('--prometheus', type=str, help='เขียนเวลาแต่ละขั้นตอนเป็นไฟล์ Prometheus textfile')
+    parser.add_argument('--trace', type=str, help='เขียน Chrome trace (เปิดดูใน chrome://tracing หรือ ui.perfetto.dev)')
     args = parser.parse_args()
+    args.num_beams = 1 if args.decoding == 'greedy' else max(1, args.num_beams)
     
+    from ocr_pool import parse_preprocess
+    try:
+        args.ocr_preprocess = parse_preprocess(args.ocr_preprocess)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    # จับเวลาเฉพาะเมื่อขอรายงาน (OCR ที่รันใน process pool ของโหมดหลายภาพไม่ถูกรวม)
+    profiling = args.report or args.prometheus or args.trace
+    if profiling:
+        metrics.start(command="image_to_text", image=args.image, batch=args.image is None)
+    try:
+        if args.image is None:
+            run_batch(args)
+        else:
+            run_single(args)
+    finally:
+        if profiling:
+            metrics.finish(args.report, args.prometheus, args.trace)
+
+def run_single(args):
+    """
+    โหมดภาพเดียว: แสดงคำอธิบายและข้อความของภาพ
+    """
     # ตรวจสอบว่าไฟล์ภาพมีอยู่จริงหรือไม่
     if not os.path.exists(args.image):
         print(f"ไม่พบไฟล์ภาพที่ระบุ: {args.image}")
         return
     
     try:
-        # โหลดโมเดลและ processor
-        model, processor = load_model_and_processor()
-        
-        # แปลงรูปภาพเป็นข้อความและดึงข้อความจากรูปภาพ
-        caption, extracted_text = image_to_text(args.image, model, processor)
+        if args.worker:
+            # ส่งงานให้ worker ที่โหลดโมเดลไว้แล้ว ไม่ต้องโหลดโมเดลใหม่
+            print(f"กำลังส่งงานไปยัง worker ที่ {args.worker}")
+            image_path = os.path.abspath(args.image)
+            caption = call_worker(args.worker, "caption", {"image_path": image_path,
+                                                           "num_beams": args.num_beams})["caption"]
+            extracted_text = call_worker(args.worker, "ocr", {"image_path": image_path,
+                                                              "preprocess": args.ocr_preprocess})["text"]
+        else:
+            # โหลดโมเดลและ processor
+            model, processor = load_model_and_processor(args.quantize, args.compile)
+            
+            # แปลงรูปภาพเป็นข้อความและดึงข้อความจากรูปภาพ
+            caption, extracted_text = image_to_text(args.image, model, processor,
+                                                    display=not args.no_display,
+                                                    ocr_preprocess=args.ocr_preprocess,
+                                                    num_beams=args.num_beams)
         
         print("\nคำอธิบายรูปภาพ:")
         print(caption)
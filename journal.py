@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import threading
+
+# บันทึกการทำงาน (journal) ของแต่ละฉากและขั้นตอน เป็นไฟล์ JSONL ที่เขียนต่อท้ายทีละบรรทัด
+# แต่ละบรรทัดมี stage, scene, inputs (คีย์ของค่าที่ใช้สร้าง), outputs และ status
+# เมื่อรันซ้ำ ขั้นตอนที่เคยเสร็จแล้วด้วย inputs เดียวกันจะถูกข้าม จึงทำต่อจากจุดที่หยุดไปได้ทันที
+
+STAGES = ("images", "speech", "encode", "video")
+
+
+class Journal:
+    """
+    journal ของการรันโปรเจกต์
+
+    Args:
+        path: ไฟล์ JSONL ของ journal
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._latest = {}
+        lines = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                        self._latest[(record["stage"], record["inputs"])] = record
+                    except (ValueError, KeyError, TypeError):
+                        # บรรทัดสุดท้ายอาจเขียนไม่ครบถ้าโปรแกรมหยุดกลางคัน
+                        continue
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # ถ้ามีบรรทัดเก่าที่ถูกแทนที่แล้วมาก ให้เขียนไฟล์ใหม่เหลือเฉพาะสถานะล่าสุด
+        if lines > 2 * len(self._latest) + 100:
+            self._compact()
+        self._file = open(path, "a", encoding="utf-8")
+        if lines and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _compact(self):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in self._latest.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+
+    def done(self, stage, inputs):
+        """
+        คืน outputs ของขั้นตอนที่เคยเสร็จแล้วด้วย inputs เดียวกัน หรือ None ถ้ายังไม่เคยเสร็จ
+        """
+        with self._lock:
+            record = self._latest.get((stage, inputs))
+        if record is None or record["status"] != "done":
+            return None
+        return record["outputs"]
+
+    def record(self, stage, inputs, outputs=None, status="done", scene=None, error=None):
+        """
+        บันทึกสถานะของขั้นตอน
+
+        Args:
+            stage: ชื่อขั้นตอน ("images", "speech", "encode" หรือ "video")
+            inputs: คีย์ของค่าที่ใช้สร้าง (จาก asset_cache.make_key)
+            outputs: dict ของผลลัพธ์ เช่น {"image_path": ...}
+            status: "done" หรือ "failed"
+            scene: ลำดับของฉาก (ถ้ามี)
+            error: ข้อความข้อผิดพลาดเมื่อ status เป็น "failed"
+        """
+        record = {
+            "stage": stage,
+            "scene": scene,
+            "inputs": inputs,
+            "outputs": outputs or {},
+            "status": status,
+            "time": time.time(),
+        }
+        if error is not None:
+            record["error"] = error
+        with self._lock:
+            self._latest[(stage, inputs)] = record
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
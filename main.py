@@ -1,178 +1,117 @@
 import os
-import torch
-from diffusers import StableDiffusionPipeline
-from PIL import Image
-import numpy as np
-from moviepy.editor import VideoFileClip, ImageClip, AudioFileClip, concatenate_videoclips, CompositeAudioClip
-from transformers import pipeline, AutoProcessor, AutoModelForTextToWaveform
-import soundfile as sf
-import time
-import librosa
-from gtts import gTTS
+import sys
+import argparse
 
-# กำหนดโฟลเดอร์สำหรับเก็บโมเดลที่ดาวน์โหลด
-os.environ["TRANSFORMERS_CACHE"] = "./model_cache"
-os.environ["HF_HOME"] = "./model_cache"
+from project import load_project
+from diffusion_profiles import PROFILES
+from journal import STAGES
+from motion import MOTIONS
+from pipeline import GRAPH_STAGES, run_project
 
-# 1. สร้างไดเร็กทอรีสำหรับเก็บไฟล์
-os.makedirs("images", exist_ok=True)
-os.makedirs("audio", exist_ok=True)
-os.makedirs("output", exist_ok=True)
-os.makedirs("model_cache", exist_ok=True)
+# โปรเจกต์เริ่มต้น (ฉาก prompt และการตั้งค่าอยู่ในไฟล์โปรเจกต์ ไม่ต้องแก้สคริปต์อีก)
+DEFAULT_PROJECT = "projects/penguin_trip.yaml"
 
-# 2. กำหนดเนื้อหาวิดีโอ - แต่ละฉากพร้อมคำบรรยาย
-scenes = [
-    {
-        "prompt": "a penguin, a cat and a dog packing luggage together in a messy room with excited expressions",
-        "text": "เพนกวิน: เฮ้ย! ทุกคนเตรียมตัวให้พร้อม! วันนี้เราจะไปเที่ยวทะเลกัน! \nแมว: แต่ฉันเอาเสื้อเชฟไปทำไมฟะ? \nหมา: ผมเอาเสื้อซูเปอร์ฮีโร่ไป...เผื่อต้องช่วยใคร!",
-        "duration": 6
-    },
-    {
-        "prompt": "the same penguin from scene 1 now standing on a tropical beach sweating with sunglasses sliding down its face",
-        "text": "เพนกวิน: นี่...เราต้องมาทะเลร้อนๆ ทำไมนะ!? ผมคิดว่ามันจะเหมือนในโปสเตอร์น่ะ... \n(เสียงแมวกับหมาในระยะไกล): ก็แกเป็นคนเลือกที่เที่ยวเองไง!",
-        "duration": 5
-    },
-    {
-        "prompt": "the cat chef trying to barbecue fish but the fish jumps out of the grill and runs toward the ocean",
-        "text": "แมว: เดี๋ยวๆ! อย่ากลับไปนะ! นั่นเป็นอาหารเย็นของเรา! \nเพนกวิน: (ยืนอ้าปากค้าง) โอ้...นั่นคือเพื่อนผม...",
-        "duration": 5
-    },
-    {
-        "prompt": "the superhero dog stuck in a palm tree trying to reach a coconut while the penguin and cat look up worried",
-        "text": "หมา: ไม่ต้องห่วง! ผมเป็นซูเปอร์ฮีโร่...แค่ติดต้นไม้เฉยๆ! \nแมว: นั่นมันกะลาส้มไม่ใช่กะโหลกศีรษะนะโว้ย! \nเพนกวิน: ใครไปเรียกเจ้าหน้าที่ชายหาดที...",
-        "duration": 6
-    }
-]
+def parse_jobs(value):
+    """
+    อ่านค่า --jobs ในรูปแบบ STAGE=N
 
-# 3. สร้างภาพด้วย Stable Diffusion
-def generate_images():
-    print("กำลังสร้างภาพ...")
-    
-    # ตรวจสอบว่ามีโมเดลที่บันทึกไว้แล้วหรือไม่
-    local_model_path = "./model_cache/stable-diffusion"
-    
-    if os.path.exists(local_model_path):
-        print(f"ใช้โมเดลที่บันทึกไว้จาก {local_model_path}")
-        pipe = StableDiffusionPipeline.from_pretrained(local_model_path, local_files_only=True)
-    else:
-        print("กำลังดาวน์โหลดโมเดล Stable Diffusion...")
-        # ใช้โมเดล open access แทน runwayml/stable-diffusion-v1-5
-        model_id = "CompVis/stable-diffusion-v1-4"  # โมเดลที่เป็น open access
-        pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float16)
-        # บันทึกโมเดลไว้ใช้ในครั้งต่อไป
-        pipe.save_pretrained(local_model_path)
-    
-    if torch.cuda.is_available():
-        pipe = pipe.to("cuda")
-    else:
-        # ใช้ CPU โดยปรับใช้ float32 แทน float16
-        pipe = pipe.to("cpu")
-        pipe.safety_checker = None  # ปิด safety checker เพื่อประหยัดหน่วยความจำ
-    
-    # สร้างภาพตามคำอธิบาย (prompt) แต่ละฉาก
-    for i, scene in enumerate(scenes):
-        # ตรวจสอบว่ามีภาพที่สร้างไว้แล้วหรือไม่
-        image_path = f"images/scene_{i+1}.png"
-        if os.path.exists(image_path):
-            print(f"ใช้ภาพที่มีอยู่แล้วที่ {image_path}")
-        else:
-            print(f"กำลังสร้างภาพที่ {i+1}/{len(scenes)}")
-            image = pipe(scene["prompt"], num_inference_steps=30).images[0]
-            image.save(image_path)
-        
-        scene["image_path"] = image_path
-    
-    print("สร้างภาพเสร็จสิ้น!")
-
-# 4. สร้างเสียงพูดด้วย Text-to-Speech
-# 4. สร้างเสียงพูดด้วย Google Text-to-Speech
-def generate_speech():
-    print("กำลังสร้างเสียงพูด...")
-    
-    # สร้างเสียงพูดสำหรับแต่ละฉาก
-    for i, scene in enumerate(scenes):
-        audio_path = f"audio/speech_{i+1}.mp3"
-        
-        # ตรวจสอบว่ามีไฟล์เสียงที่สร้างไว้แล้วหรือไม่
-        if os.path.exists(audio_path):
-            print(f"ใช้ไฟล์เสียงที่มีอยู่แล้วที่ {audio_path}")
-            
-            # ถ้ามีไฟล์อยู่แล้ว อ่านความยาวของเสียง
-            try:
-                audio_duration = librosa.get_duration(path=audio_path)
-                print(f"  ความยาวของเสียง: {audio_duration:.2f} วินาที")
-                
-                # ปรับความยาวของฉากให้เท่ากับความยาวของเสียง + 1 วินาทีเพื่อความเรียบร้อย
-                scene["duration"] = audio_duration + 1
-            except Exception as e:
-                print(f"  ไม่สามารถอ่านความยาวของเสียงได้: {e}")
-        else:
-            print(f"กำลังสร้างเสียงพูดที่ {i+1}/{len(scenes)}")
-            
-            # ทำให้แน่ใจว่าไม่มีการทำงานซ้อนกัน
-            temp_audio_path = f"audio/temp_speech_{i+1}_{int(time.time())}.mp3"
-            
-            # สร้างเสียงพูดด้วย Google TTS (รองรับภาษาไทย)
-            tts = gTTS(text=scene["text"], lang='th', slow=False)
-            tts.save(temp_audio_path)
-            
-            # ตรวจสอบความยาวของเสียง
-            audio_duration = librosa.get_duration(path=temp_audio_path)
-            print(f"  ความยาวของเสียง: {audio_duration:.2f} วินาที")
-            
-            # ปรับความยาวของฉากให้เท่ากับความยาวของเสียง + 1 วินาทีเพื่อความเรียบร้อย
-            scene["duration"] = audio_duration + 1
-            
-            # เปลี่ยนชื่อไฟล์จากชั่วคราวเป็นชื่อจริง
-            os.rename(temp_audio_path, audio_path)
-        
-        scene["audio_path"] = audio_path
-    
-    print("สร้างเสียงพูดเสร็จสิ้น!")
+    Returns:
+        tuple (stage, จำนวนงานพร้อมกัน)
+    """
+    stage, separator, count = value.partition("=")
+    if not separator or stage not in GRAPH_STAGES:
+        raise argparse.ArgumentTypeError(
+            f"ต้องอยู่ในรูปแบบ STAGE=N โดย STAGE เป็น {', '.join(GRAPH_STAGES)} (ได้รับ {value!r})")
+    try:
+        count = int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"จำนวนงานของ {stage} ต้องเป็นจำนวนเต็ม (ได้รับ {count!r})")
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"จำนวนงานของ {stage} ต้องมากกว่า 0 (ได้รับ {count})")
+    return stage, count
 
-# 5. สร้างวิดีโอจากภาพและเสียง
-def create_video():
-    print("กำลังสร้างวิดีโอ...")
-    output_path = "output/final_video.mp4"
-    
-    # ตรวจสอบว่ามีไฟล์วิดีโอที่สร้างไว้แล้วหรือไม่
-    if os.path.exists(output_path):
-        print(f"ไฟล์วิดีโอมีอยู่แล้วที่ {output_path}")
-        return
-    
-    video_clips = []
-    
-    for i, scene in enumerate(scenes):
-        # สร้าง clip จากภาพ
-        img_clip = ImageClip(scene["image_path"]).set_duration(scene["duration"])
-        
-        # เพิ่มเสียงพูด
-        audio_clip = AudioFileClip(scene["audio_path"])
-        img_clip = img_clip.set_audio(audio_clip)
-        
-        # เพิ่ม transition (crossfade) ระหว่างฉาก
-        if i > 0:  # เริ่มจากฉากที่ 2 เป็นต้นไป
-            img_clip = img_clip.crossfadein(1.0)
-        
-        video_clips.append(img_clip)
-    
-    # รวม clip ทั้งหมด
-    final_clip = concatenate_videoclips(video_clips, method="compose")
-    
-    # บันทึกวิดีโอ
-    final_clip.write_videofile(output_path, fps=24)
-    
-    print(f"สร้างวิดีโอเสร็จสิ้น! ไฟล์อยู่ที่ {output_path}")
+def main(argv=None, default_project=DEFAULT_PROJECT):
+    parser = argparse.ArgumentParser(description='สร้างวิดีโอสั้นจากไฟล์โปรเจกต์ (YAML/JSON)')
+    parser.add_argument('--project', type=str, default=default_project,
+                        help=f'ไฟล์โปรเจกต์ที่กำหนดฉาก เสียง โมเดล และไฟล์ผลลัพธ์ (ค่าเริ่มต้น {default_project})')
+    parser.add_argument('--worker', type=str, default=os.environ.get("SHOTVDO_WORKER"),
+                        help='URL ของ model worker ที่โหลดโมเดลค้างไว้ เช่น http://127.0.0.1:8765')
+    parser.add_argument('--chunk-size', type=int, default=50,
+                        help='จำนวนฉากที่อ่านและประมวลผลพร้อมกัน (สำหรับโปรเจกต์ขนาดใหญ่)')
+    parser.add_argument('--scheduler', choices=['graph', 'sequential'],
+                        help='graph = สร้างภาพ เสียง และเข้ารหัสแต่ละฉากซ้อนกัน, sequential = ทีละขั้นตอน')
+    parser.add_argument('--jobs', action='append', default=[], metavar='STAGE=N', type=parse_jobs,
+                        help=f'จำนวนงานพร้อมกันของแต่ละขั้นตอน ({", ".join(GRAPH_STAGES)}) '
+                             f'เช่น --jobs speech=8 --jobs encode=4')
+    parser.add_argument('--tts-engine', choices=['gtts', 'local', 'tone'],
+                        help='เอนจินเสียงพูดของทุกเสียงในโปรเจกต์: gtts (Google), local (โมเดลในเครื่อง), tone (จำลอง)')
+    parser.add_argument('--profile', choices=list(PROFILES),
+                        help='โปรไฟล์ความเร็วของการสร้างภาพ เช่น cpu-fast (ดู diffusion_profiles.py)')
+    parser.add_argument('--subtitles', choices=['soft', 'burn', 'none'],
+                        help='คำบรรยายจากบทพูด: soft (track คำบรรยายในวิดีโอ), burn (ซ้อนในภาพ), none (ไม่ใส่)')
+    parser.add_argument('--transition', choices=['crossfade', 'fadeblack', 'slide', 'none'],
+                        help='รอยต่อระหว่างฉาก (สร้างเฉพาะเฟรมช่วงรอยต่อ) หรือ none')
+    parser.add_argument('--motion', choices=[*MOTIONS, 'kenburns', 'none'],
+                        help='การเคลื่อนกล้องบนภาพนิ่งของทุกฉาก (kenburns = สลับซูมและแพน)')
+    parser.add_argument('--music', type=str,
+                        help='เพลงประกอบ (วนซ้ำตลอดวิดีโอ และเบาลงอัตโนมัติขณะมีเสียงพูด)')
+    parser.add_argument('--audio-mix', action='store_true',
+                        help='ประกอบเสียงทั้งเรื่องเป็น track เดียวและปรับความดังของเสียงพูดให้เท่ากัน')
+    parser.add_argument('--report', type=str,
+                        help='ไฟล์รายงาน JSON ของเวลาแต่ละขั้นตอน (ค่าเริ่มต้น output/.<ชื่อวิดีโอ>.report.json)')
+    parser.add_argument('--prometheus', type=str,
+                        help='เขียนเวลาแต่ละขั้นตอนเป็นไฟล์ Prometheus textfile')
+    parser.add_argument('--trace', type=str,
+                        help='เขียน Chrome trace ของการรัน (เปิดดูใน chrome://tracing หรือ ui.perfetto.dev)')
+    policy = parser.add_mutually_exclusive_group()
+    policy.add_argument('--reuse', action='store_true',
+                        help='ใช้ไฟล์วิดีโอที่มีอยู่แล้ว แม้ journal ไม่มีบันทึกว่าตรงกับฉากปัจจุบัน')
+    policy.add_argument('--force', action='store_true',
+                        help='สร้างทุกขั้นตอนใหม่ทั้งหมด ไม่ใช้แคชและ journal')
+    policy.add_argument('--force-stage', action='append', default=[], choices=list(STAGES),
+                        help='สร้างขั้นตอนที่กำหนดใหม่ (ใช้ซ้ำได้ เช่น --force-stage images --force-stage video)')
+    args = parser.parse_args(argv)
 
-# 6. รันฟังก์ชันทั้งหมด
-def main():
     try:
-        generate_images()
-        generate_speech()
-        create_video()
-        print("เสร็จสิ้นการสร้างวิดีโอ! ไฟล์อยู่ที่ output/final_video.mp4")
+        project = load_project(args.project)
+        if args.worker:
+            project.settings["worker_url"] = args.worker
+        if args.scheduler:
+            project.settings["scheduler"] = args.scheduler
+        if args.force:
+            project.settings["force_stages"] = list(STAGES)
+        elif args.force_stage:
+            project.settings["force_stages"] = args.force_stage
+        if args.reuse:
+            project.settings["reuse_existing"] = True
+        if args.subtitles:
+            project.settings["subtitles"] = None if args.subtitles == "none" else args.subtitles
+        if args.transition:
+            project.settings["transition"] = None if args.transition == "none" else args.transition
+        if args.motion:
+            project.settings["motion"] = None if args.motion == "none" else args.motion
+        if args.music:
+            project.settings["music_path"] = args.music
+        if args.audio_mix or args.music:
+            project.settings["audio_mix"] = True
+        if args.profile:
+            project.settings["diffusion_profile"] = args.profile
+        for key, value in (("metrics_report", args.report), ("metrics_prometheus", args.prometheus),
+                           ("metrics_trace", args.trace)):
+            if value:
+                project.settings[key] = value
+        if args.tts_engine:
+            for voice in project.settings["voices"].values():
+                voice["engine"] = args.tts_engine
+        for stage, count in args.jobs:
+            project.settings["stage_concurrency"][stage] = count
+        output_path = run_project(project, chunk_size=args.chunk_size)
+        print(f"เสร็จสิ้นการสร้างวิดีโอ! ไฟล์อยู่ที่ {output_path}")
     except Exception as e:
         print(f"เกิดข้อผิดพลาด: {e}")
+        import traceback
+        traceback.print_exc()  # แสดงข้อผิดพลาดโดยละเอียด
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# เก็บเวลาของแต่ละขั้นตอน (wall/CPU), หน่วยความจำ (RSS) และจำนวนรายการที่ประมวลผล
+# RSS ของแต่ละงานคือค่าปัจจุบันของ process ตอนจบงาน และส่วนที่เปลี่ยนไประหว่างงาน (งานใน thread อื่นรวมอยู่ด้วย)
+# ส่วน peak RSS (ru_maxrss) เป็นค่าสูงสุดของทั้ง process ตั้งแต่เริ่ม จึงรายงานเฉพาะระดับการรัน
+# เวลา CPU ของแต่ละงานคือ CPU ของทั้ง process (ทุก thread) รวมกับ process ลูกที่จบแล้ว (เช่น ffmpeg) ระหว่างงาน
+# งานที่รันพร้อมกันจึงนับเวลา CPU ของกันและกันด้วย
+# ยอดรวมต่อขั้นตอน (stages) นับเฉพาะงานชั้นนอกสุดของขั้นตอนนั้น งานที่ซ้อนอยู่ในงานของขั้นตอนเดียวกัน
+# (เช่น load_pipeline ภายใน generate_images) ไม่ถูกนับซ้ำ
+# ฟังก์ชันที่ครอบด้วย @instrument จะถูกจับเวลาเฉพาะเมื่อเรียก start() แล้วเท่านั้น
+# (model worker ที่รันค้างไว้จึงไม่สะสมข้อมูลโดยไม่จำเป็น)
+#
+# ผลลัพธ์:
+#   write_report():       รายงาน JSON สรุปต่อขั้นตอน
+#   write_prometheus():   ไฟล์ textfile สำหรับ node_exporter (--collector.textfile)
+#   write_chrome_trace(): ไฟล์ trace เปิดดูได้ใน chrome://tracing หรือ https://ui.perfetto.dev
+#
+# หมายเหตุ: งานที่รันใน process pool (เช่น OCR ของ ocr_pool.py) ไม่ถูกรวมในรายงานของ process หลัก
+
+_lock = threading.Lock()
+_enabled = False
+_spans = []
+_run = {}
+# ความลึกของงานที่เปิดอยู่ต่อขั้นตอนใน thread นี้
+_local = threading.local()
+
+
+def current_rss_bytes():
+    """
+    คืนหน่วยความจำที่ process ใช้อยู่ตอนนี้ (RSS, bytes) จาก /proc/self/statm (Linux) หรือ psutil
+    หรือ None ถ้าวัดไม่ได้
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def peak_rss_bytes():
+    """
+    คืนหน่วยความจำสูงสุดของ process ตั้งแต่เริ่ม (high-water mark, bytes) หรือ None ถ้าวัดไม่ได้
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux รายงานเป็น KB ส่วน macOS รายงานเป็น bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def cpu_seconds():
+    """
+    คืนเวลา CPU ของ process (ทุก thread) รวมกับ process ลูกที่จบแล้ว (วินาที)
+    """
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+
+def start(**meta):
+    """
+    เริ่มเก็บข้อมูลของการรันใหม่ (ล้างข้อมูลเดิม)
+
+    Args:
+        meta: ข้อมูลเพิ่มเติมที่ต้องการเก็บในรายงาน เช่น project="..."
+    """
+    global _enabled
+    with _lock:
+        _spans.clear()
+        _run.clear()
+        _run.update(meta=meta, started=time.time(), wall=time.perf_counter(), cpu=cpu_seconds())
+        _enabled = True
+
+
+def stop():
+    global _enabled
+    _enabled = False
+
+
+@contextlib.contextmanager
+def span(name, stage=None, items=None):
+    """
+    จับเวลาของโค้ดในบล็อก with (ไม่ทำอะไรถ้ายังไม่ได้เรียก start())
+
+    ตัวอย่าง:
+        with span("concat_segments", "video", items=len(segments)):
+            concat_segments(segments, output_path)
+
+    Args:
+        name: ชื่อของงาน
+        stage: ขั้นตอนที่งานนี้อยู่ (ค่าเริ่มต้นเท่ากับ name)
+        items: จำนวนรายการที่งานนี้ประมวลผล
+    """
+    if not _enabled:
+        yield
+        return
+    stage = stage or name
+    depth = _local.__dict__.setdefault("depth", {})
+    nested = depth.get(stage, 0) > 0
+    depth[stage] = depth.get(stage, 0) + 1
+    start_time = time.time()
+    wall = time.perf_counter()
+    cpu = cpu_seconds()
+    rss = current_rss_bytes()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        depth[stage] -= 1
+        end_rss = current_rss_bytes()
+        record = {
+            "name": name,
+            "stage": stage,
+            "nested": nested,
+            "start": start_time,
+            "wall_seconds": time.perf_counter() - wall,
+            "cpu_seconds": cpu_seconds() - cpu,
+            "rss_bytes": end_rss,
+            "rss_delta_bytes": end_rss - rss if end_rss is not None and rss is not None else None,
+            "items": items,
+            "pid": os.getpid(),
+            "thread": threading.get_ident(),
+            "thread_name": threading.current_thread().name,
+        }
+        if error:
+            record["error"] = error
+        with _lock:
+            if _enabled:
+                _spans.append(record)
+
+
+def instrument(stage, items=None, name=None):
+    """
+    decorator สำหรับจับเวลาของฟังก์ชัน
+
+    Args:
+        stage: ขั้นตอนที่ฟังก์ชันนี้อยู่ เช่น "images"
+        items: ฟังก์ชันที่รับอาร์กิวเมนต์เดียวกันแล้วคืนจำนวนรายการ เช่น lambda scenes, *a, **k: len(scenes)
+        name: ชื่อของงานในรายงาน (ค่าเริ่มต้นเป็นชื่อฟังก์ชัน)
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(name or fn.__name__, stage, items(*args, **kwargs) if items else None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def spans():
+    """
+    คืนสำเนาของข้อมูลการเรียกทั้งหมดของการรันล่าสุด (หนึ่ง dict ต่อการเรียก)
+    """
+    with _lock:
+        return list(_spans)
+
+
+def summary():
+    """
+    สรุปข้อมูลต่อชื่องาน
+
+    Returns:
+        dict ของรายงาน (ดู write_report)
+    """
+    with _lock:
+        spans = list(_spans)
+        run = dict(_run)
+    tasks = {}
+    stages = {}
+    for record in spans:
+        if not record.get("nested"):
+            stage = stages.setdefault(record["stage"], {"calls": 0, "errors": 0, "items": 0,
+                                                        "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            stage["calls"] += 1
+            stage["errors"] += 1 if "error" in record else 0
+            stage["items"] += record["items"] or 0
+            stage["wall_seconds"] += record["wall_seconds"]
+            stage["cpu_seconds"] += record["cpu_seconds"]
+        task = tasks.setdefault(record["name"], {
+            "stage": record["stage"], "calls": 0, "errors": 0, "items": 0,
+            "wall_seconds": 0.0, "cpu_seconds": 0.0, "max_wall_seconds": 0.0,
+            "max_rss_bytes": None, "max_rss_delta_bytes": None,
+        })
+        task["calls"] += 1
+        task["errors"] += 1 if "error" in record else 0
+        task["items"] += record["items"] or 0
+        task["wall_seconds"] += record["wall_seconds"]
+        task["cpu_seconds"] += record["cpu_seconds"]
+        task["max_wall_seconds"] = max(task["max_wall_seconds"], record["wall_seconds"])
+        for field, value in (("max_rss_bytes", record["rss_bytes"]), ("max_rss_delta_bytes", record["rss_delta_bytes"])):
+            if value is not None:
+                task[field] = value if task[field] is None else max(task[field], value)
+    for task in tasks.values():
+        task["items_per_second"] = task["items"] / task["wall_seconds"] if task["wall_seconds"] else None
+    return {
+        "meta": run.get("meta", {}),
+        "started": run.get("started"),
+        "wall_seconds": time.perf_counter() - run["wall"] if run else 0.0,
+        "cpu_seconds": cpu_seconds() - run["cpu"] if run else 0.0,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "spans": len(spans),
+        "stages": stages,
+        "tasks": tasks,
+    }
+
+
+def _write_atomic(path, text):
+    # เขียนไฟล์ชั่วคราวแล้วแทนที่ ตัวอ่าน (เช่น node_exporter) จะไม่เห็นไฟล์ที่เขียนไม่ครบ
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def write_report(path, report=None):
+    """
+    เขียนรายงาน JSON ของการรัน: เวลารวม, CPU, peak RSS ของ process, ยอดรวมต่อขั้นตอน (เฉพาะงานชั้นนอกสุด)
+    และสรุปต่องาน (calls, items, wall/CPU, items/วินาที, RSS ตอนจบงานและส่วนที่เพิ่มขึ้นสูงสุด)
+    """
+    report = report or summary()
+    _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus(path, report=None, prefix="shotvdo"):
+    """
+    เขียนไฟล์ Prometheus textfile ของการรันล่าสุด
+    """
+    report = report or summary()
+    metrics = (
+        ("calls", "counter", "จำนวนครั้งที่เรียก", "calls"),
+        ("errors", "counter", "จำนวนครั้งที่เกิดข้อผิดพลาด", "errors"),
+        ("items", "counter", "จำนวนรายการที่ประมวลผล", "items"),
+        ("wall_seconds", "counter", "เวลาจริงรวม (วินาที)", "wall_seconds"),
+        ("cpu_seconds", "counter", "เวลา CPU รวมของ process และ process ลูกระหว่างงาน (วินาที)", "cpu_seconds"),
+        ("max_wall_seconds", "gauge", "เวลาจริงของการเรียกที่นานที่สุด (วินาที)", "max_wall_seconds"),
+    )
+    lines = []
+    for name, kind, description, field in metrics:
+        metric = f"{prefix}_task_{name}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for task_name, task in sorted(report["tasks"].items()):
+            lines.append(f'{metric}{{task="{_label(task_name)}",stage="{_label(task["stage"])}"}} {task[field]}')
+    for name, description in (("wall_seconds", "เวลาจริงรวมของขั้นตอน ไม่นับงานที่ซ้อนกัน (วินาที)"),
+                              ("cpu_seconds", "เวลา CPU รวมของขั้นตอน ไม่นับงานที่ซ้อนกัน (วินาที)")):
+        metric = f"{prefix}_stage_{name}_total"
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for stage_name, stage in sorted(report.get("stages", {}).items()):
+            lines.append(f'{metric}{{stage="{_label(stage_name)}"}} {stage[name]}')
+    for name, description in (("wall_seconds", "เวลาจริงของการรัน (วินาที)"),
+                              ("cpu_seconds", "เวลา CPU ของ process และ process ลูก (วินาที)"),
+                              ("peak_rss_bytes", "หน่วยความจำสูงสุดของ process (bytes)")):
+        if report[name] is None:
+            continue
+        lines.append(f"# HELP {prefix}_run_{name} {description}")
+        lines.append(f"# TYPE {prefix}_run_{name} gauge")
+        lines.append(f"{prefix}_run_{name} {report[name]}")
+    _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def write_chrome_trace(path):
+    """
+    เขียนไฟล์ Chrome trace (Trace Event Format) หนึ่ง event ต่อการเรียก แยกแถวตาม thread
+    """
+    with _lock:
+        spans = list(_spans)
+        origin = _run.get("started", 0.0)
+    events = []
+    threads = {}
+    for record in spans:
+        threads[(record["pid"], record["thread"])] = record["thread_name"]
+        args = {"cpu_seconds": round(record["cpu_seconds"], 6), "rss_bytes": record["rss_bytes"],
+                "rss_delta_bytes": record["rss_delta_bytes"], "nested": record.get("nested", False)}
+        if record["items"] is not None:
+            args["items"] = record["items"]
+        if "error" in record:
+            args["error"] = record["error"]
+        events.append({
+            "name": record["name"],
+            "cat": record["stage"],
+            "ph": "X",
+            "ts": round((record["start"] - origin) * 1e6, 1),
+            "dur": round(record["wall_seconds"] * 1e6, 1),
+            "pid": record["pid"],
+            "tid": record["thread"],
+            "args": args,
+        })
+    for (pid, tid), name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    _write_atomic(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+def print_summary(report=None):
+    """
+    แสดงสรุปเวลาของแต่ละงาน เรียงจากนานที่สุด
+    """
+    report = report or summary()
+    print(f"สรุปเวลา: ทั้งหมด {report['wall_seconds']:.2f} วินาที (CPU {report['cpu_seconds']:.2f} วินาที)")
+    for name, stage in sorted(report.get("stages", {}).items(), key=lambda item: -item[1]["wall_seconds"]):
+        print(f"  ขั้นตอน {name}: {stage['wall_seconds']:.2f} วินาที, CPU {stage['cpu_seconds']:.2f} วินาที")
+    for name, task in sorted(report["tasks"].items(), key=lambda item: -item[1]["wall_seconds"]):
+        items = f", {task['items']} รายการ" if task["items"] else ""
+        print(f"  {name}: {task['wall_seconds']:.2f} วินาที, CPU {task['cpu_seconds']:.2f} วินาที, "
+              f"{task['calls']} ครั้ง{items}")
+    if report["peak_rss_bytes"]:
+        print(f"  หน่วยความจำสูงสุด {report['peak_rss_bytes'] / 1024 ** 2:.0f} MB")
+
+
+def finish(report_path=None, prometheus_path=None, trace_path=None, show=True):
+    """
+    หยุดเก็บข้อมูลแล้วเขียนผลลัพธ์ที่กำหนด
+
+    Returns:
+        dict ของรายงาน
+    """
+    report = summary()
+    stop()
+    if report_path:
+        write_report(report_path, report)
+    if prometheus_path:
+        write_prometheus(prometheus_path, report)
+    if trace_path:
+        write_chrome_trace(trace_path)
+    if show:
+        print_summary(report)
+    return report
@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+
+# ที่เก็บโมเดลใน model_cache แบบเขียนครั้งเดียว (atomic)
+#
+# - เขียนโมเดลเป็น safetensors ลงโฟลเดอร์ชั่วคราวข้างโฟลเดอร์จริง เขียน manifest (ขนาดและ sha256 ของทุกไฟล์)
+#   เป็นไฟล์สุดท้าย แล้วจึงเปลี่ยนชื่อเป็นโฟลเดอร์จริง โฟลเดอร์ที่เขียนไม่ครบจึงไม่ถูกใช้
+# - ตรวจความครบถ้วนจาก manifest ก่อนโหลด (ขนาดไฟล์ทุกครั้ง, sha256 เมื่อสั่ง verify)
+# - โหลดน้ำหนักของโมเดล transformers แบบ memory-mapped: tensor ชี้ไปที่ page ของไฟล์โดยตรง
+#   หลาย process บนเครื่องเดียวกันจึงใช้ page ร่วมกันใน page cache แทนการคัดลอกคนละชุด
+#
+# ตรวจ checksum ของโมเดลที่เก็บไว้:
+#   python model_store.py verify ./model_cache/stable-diffusion
+
+MANIFEST_NAME = "shotvdo_manifest.json"
+
+
+def _hash_file(path, chunk_size=8 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _list_files(model_dir):
+    for root, dirs, files in os.walk(model_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, model_dir).replace(os.sep, "/"), path
+
+
+def write_manifest(model_dir, source):
+    """
+    เขียน manifest ของทุกไฟล์ในโฟลเดอร์โมเดล (ขนาดและ sha256)
+    """
+    files = {
+        name: {"size": os.path.getsize(path), "sha256": _hash_file(path)}
+        for name, path in _list_files(model_dir) if name != MANIFEST_NAME
+    }
+    manifest = {"source": source, "created": time.time(), "files": files}
+    with open(os.path.join(model_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    return manifest
+
+
+def read_manifest(model_dir):
+    try:
+        with open(os.path.join(model_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_complete(model_dir, verify=False):
+    """
+    ตรวจสอบว่าโฟลเดอร์โมเดลเขียนครบตาม manifest
+
+    Args:
+        model_dir: โฟลเดอร์โมเดล
+        verify: ตรวจ sha256 ของทุกไฟล์ด้วย (ช้า) ถ้าไม่กำหนดจะตรวจเฉพาะขนาดไฟล์
+
+    Returns:
+        True ถ้าครบถ้วน
+    """
+    manifest = read_manifest(model_dir)
+    if manifest is None:
+        return False
+    for name, entry in manifest["files"].items():
+        path = os.path.join(model_dir, name)
+        if not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+            return False
+        if verify and _hash_file(path) != entry["sha256"]:
+            return False
+    return True
+
+
+def save_atomic(model_dir, save, source):
+    """
+    บันทึกโมเดลลงโฟลเดอร์ชั่วคราว เขียน manifest แล้วเปลี่ยนชื่อเป็น model_dir
+
+    Args:
+        model_dir: โฟลเดอร์โมเดลที่ต้องการ
+        save: ฟังก์ชันที่รับโฟลเดอร์ชั่วคราวแล้วบันทึกโมเดลลงไป (เช่นเรียก save_pretrained)
+        source: ที่มาของโมเดล (เช่นชื่อบน HuggingFace) เก็บไว้ใน manifest
+    """
+    model_dir = os.path.abspath(model_dir)
+    parent = os.path.dirname(model_dir)
+    os.makedirs(parent, exist_ok=True)
+    temp_dir = f"{model_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    try:
+        save(temp_dir)
+        write_manifest(temp_dir, source)
+        if is_complete(model_dir):
+            # process อื่นบันทึกเสร็จก่อนแล้ว
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return model_dir
+        if os.path.exists(model_dir):
+            # โฟลเดอร์เดิมที่ไม่สมบูรณ์หรือรูปแบบเก่า ย้ายออกก่อนลบ เพื่อให้ rename เป็น atomic
+            stale_dir = f"{model_dir}.stale-{os.getpid()}"
+            os.rename(model_dir, stale_dir)
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        os.rename(temp_dir, model_dir)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    print(f"บันทึกโมเดลไว้ที่ {model_dir}")
+    return model_dir
+
+
+def open_model(model_dir, source, load, save):
+    """
+    โหลดโมเดลจาก model_dir ถ้าครบถ้วน ไม่เช่นนั้นโหลดจาก source แล้วบันทึกแบบ atomic
+
+    โฟลเดอร์ที่ไม่มี manifest (จากเวอร์ชันก่อน) จะถูกลองโหลดและเขียนใหม่เป็น safetensors
+    ถ้าโหลดไม่ได้ (เช่นเขียนไม่ครบ) จะดาวน์โหลดใหม่
+
+    Args:
+        model_dir: โฟลเดอร์ใน model_cache
+        source: ชื่อโมเดลบน HuggingFace
+        load: ฟังก์ชันที่รับ path หรือชื่อโมเดลแล้วคืนโมเดล (หรือ tuple ของโมเดลและ processor)
+        save: ฟังก์ชันที่รับ (โมเดล, โฟลเดอร์) แล้วบันทึกเป็น safetensors
+
+    Returns:
+        ผลลัพธ์ของ load
+    """
+    if is_complete(model_dir):
+        print(f"กำลังโหลดโมเดลจาก local: {model_dir}")
+        return load(model_dir)
+
+    loaded = None
+    if os.path.isdir(model_dir) and os.listdir(model_dir):
+        try:
+            loaded = load(model_dir)
+            print(f"{model_dir} ไม่มี manifest จะบันทึกใหม่เป็น safetensors")
+        except Exception as e:
+            print(f"{model_dir} ไม่สมบูรณ์ ({e}) จะดาวน์โหลดใหม่")
+    if loaded is None:
+        print(f"กำลังดาวน์โหลดโมเดล {source}... (อาจใช้เวลาสักครู่)")
+        loaded = load(source)
+    save_atomic(model_dir, lambda temp_dir: save(loaded, temp_dir), source)
+    return loaded
+
+
+def mmap_safetensors(path):
+    """
+    เปิดไฟล์ safetensors แบบ memory-mapped (copy-on-write) และคืน dict ของ tensor ที่ชี้ไปที่ไฟล์โดยตรง
+
+    page ที่ไม่ถูกแก้ไขใช้ร่วมกันได้ระหว่าง process ที่เปิดไฟล์เดียวกัน
+    """
+    import mmap
+    import struct
+    import torch
+
+    dtypes = {
+        "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+        "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8, "U8": torch.uint8,
+        "BOOL": torch.bool,
+    }
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        # ACCESS_COPY: เขียนได้โดยไม่กระทบไฟล์ (torch.frombuffer ต้องการ buffer ที่เขียนได้)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    base = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        start, end = info["data_offsets"]
+        dtype = dtypes[info["dtype"]]
+        if end == start:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(buffer, dtype=dtype, count=(end - start) // dtype.itemsize,
+                                         offset=base + start).view(info["shape"])
+    return tensors
+
+
+def load_pretrained(model_class, path, mmap=True, **kwargs):
+    """
+    โหลดโมเดล transformers จาก path ถ้าเป็นโฟลเดอร์ที่มี safetensors จะโหลดน้ำหนักแบบ memory-mapped
+
+    Args:
+        model_class: เช่น AutoModelForCausalLM
+        path: โฟลเดอร์โมเดลหรือชื่อบน HuggingFace
+        mmap: ใช้ memory-mapped loading (False = from_pretrained ปกติ)
+        kwargs: ส่งต่อให้ from_pretrained
+
+    Returns:
+        โมเดลในโหมด eval
+    """
+    weight_files = []
+    if os.path.isdir(path):
+        weight_files = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                        if name.endswith(".safetensors")]
+    if mmap and weight_files and not kwargs:
+        try:
+            return _load_mmapped(model_class, path, weight_files)
+        except Exception as e:
+            print(f"โหลดแบบ memory-mapped ไม่ได้ ({e}) จะโหลดแบบปกติ")
+    return model_class.from_pretrained(path, low_cpu_mem_usage=True, **kwargs).eval()
+
+
+def _load_mmapped(model_class, path, weight_files):
+    from accelerate import init_empty_weights
+    from transformers import AutoConfig
+
+    config = AutoConfig.from_pretrained(path)
+    # สร้างโครงของโมเดลโดยไม่จองหน่วยความจำของน้ำหนัก (buffer ยังสร้างตามปกติ)
+    with init_empty_weights(include_buffers=False):
+        model = model_class.from_config(config)
+    state = {}
+    for weight_file in weight_files:
+        state.update(mmap_safetensors(weight_file))
+    # assign=True ให้ parameter ชี้ไปที่ tensor ของไฟล์แทนการคัดลอก
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    missing = [name for name, param in model.named_parameters() if param.device.type == "meta"]
+    if missing:
+        raise ValueError(f"ไม่พบน้ำหนัก {', '.join(missing[:3])}")
+    return model.eval()
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "verify":
+        print("ใช้: python model_store.py verify <โฟลเดอร์โมเดล>")
+        sys.exit(2)
+    model_dir = sys.argv[2]
+    manifest = read_manifest(model_dir)
+    if manifest is None:
+        print(f"{model_dir}: ไม่มี manifest")
+        sys.exit(1)
+    if is_complete(model_dir, verify=True):
+        print(f"{model_dir}: ครบถ้วน {len(manifest['files'])} ไฟล์ (จาก {manifest['source']})")
+        return
+    print(f"{model_dir}: ไม่ครบถ้วนหรือ checksum ไม่ตรง")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
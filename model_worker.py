@@ -0,0 +1,156 @@
+import os
+import json
+import argparse
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# worker ที่รันค้างไว้และโหลดโมเดลเพียงครั้งเดียว แล้วรับงานผ่าน HTTP บน localhost
+# งานที่รองรับ:
+#   POST /generate_images  สร้างภาพด้วย StableDiffusionPipeline ตามการตั้งค่าของโปรเจกต์
+#   POST /caption          สร้างคำอธิบายรูปภาพด้วยโมเดล GIT
+#   POST /ocr              ดึงข้อความจากรูปภาพด้วย Tesseract
+#   GET  /health           ตรวจสอบสถานะ
+#
+# ตัวอย่าง:
+#   python model_worker.py --port 8765
+#   python main.py --worker http://127.0.0.1:8765
+
+# โมเดลที่โหลดแล้วจะเก็บไว้ที่นี่ตลอดอายุของ worker
+_models = {}
+_load_lock = threading.Lock()
+# โมเดลแต่ละตัวรันได้ทีละงาน (pipeline ไม่ได้ออกแบบให้เรียกพร้อมกันหลาย thread)
+_run_locks = {}
+
+
+def get_model(name, loader):
+    """
+    คืนโมเดลที่โหลดไว้แล้ว หรือโหลดใหม่ถ้ายังไม่เคยโหลด
+
+    Args:
+        name: ชื่อของโมเดลที่ใช้เป็นคีย์
+        loader: ฟังก์ชันสำหรับโหลดโมเดล
+
+    Returns:
+        tuple: (โมเดล, lock สำหรับใช้งานโมเดลนั้น)
+    """
+    with _load_lock:
+        if name not in _models:
+            print(f"กำลังโหลดโมเดล {name} ...")
+            _models[name] = loader()
+            _run_locks[name] = threading.Lock()
+            print(f"โหลดโมเดล {name} เสร็จเรียบร้อย")
+        return _models[name], _run_locks[name]
+
+
+def handle_generate_images(payload):
+    import pipeline
+    from batch_diffusion import generate_batched
+    from project import DEFAULT_SETTINGS
+
+    # การตั้งค่าของโปรเจกต์ที่ส่งมาจากไคลเอนต์ (โมเดลแยกตาม local_model_path)
+    settings = {**DEFAULT_SETTINGS, **payload.get("settings", {})}
+    pipe, lock = get_model(f"diffusion:{settings['local_model_path']}:{settings['diffusion_profile']}",
+                           lambda: pipeline.load_pipeline(settings))
+
+    outputs = []
+    with lock:
+        for job, image in generate_batched(
+                pipe,
+                payload["jobs"],
+                settings["image_batch_size"],
+                settings["num_inference_steps"],
+                settings["guidance_scale"],
+                settings["width"],
+                settings["height"]):
+            image.save(job["output_path"])
+            outputs.append(job["output_path"])
+    return {"outputs": outputs}
+
+
+def handle_caption(payload):
+    from PIL import Image
+    import image_to_text
+
+    (model, processor), lock = get_model("caption", image_to_text.load_model_and_processor)
+    image = Image.open(payload["image_path"])
+    with lock:
+        caption = image_to_text.generate_caption(image, model, processor, payload.get("num_beams", 5))
+    return {"caption": caption}
+
+
+def handle_ocr(payload):
+    import image_to_text
+
+    # Tesseract รันเป็น process แยกอยู่แล้ว จึงไม่ต้องใช้ lock
+    return {"text": image_to_text.extract_text_from_image(payload["image_path"], payload.get("preprocess"))}
+
+
+HANDLERS = {
+    "generate_images": handle_generate_images,
+    "caption": handle_caption,
+    "ocr": handle_ocr,
+}
+
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "models": sorted(_models)})
+        else:
+            self._send_json(404, {"error": f"ไม่พบ {self.path}"})
+
+    def do_POST(self):
+        handler = HANDLERS.get(self.path.strip("/"))
+        if handler is None:
+            self._send_json(404, {"error": f"ไม่รู้จักงาน {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length).decode("utf-8"))
+            self._send_json(200, handler(payload))
+        except Exception as e:
+            traceback.print_exc()
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='worker ที่โหลดโมเดลค้างไว้สำหรับสร้างภาพ คำอธิบายภาพ และ OCR')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='ที่อยู่ที่รอรับงาน (ควรเป็น localhost)')
+    parser.add_argument('--port', type=int, default=8765, help='พอร์ตที่รอรับงาน')
+    parser.add_argument('--preload', nargs='*', default=[],
+                        help='โหลดโมเดลไว้ล่วงหน้าก่อนรับงาน: caption หรือไฟล์โปรเจกต์ (.yaml/.json)')
+    args = parser.parse_args()
+
+    for name in args.preload:
+        if name == 'caption':
+            import image_to_text
+            get_model("caption", image_to_text.load_model_and_processor)
+        else:
+            import pipeline
+            from diffusion_profiles import apply_profile
+            from project import load_project
+            settings = apply_profile(load_project(name).settings)
+            get_model(f"diffusion:{settings['local_model_path']}:{settings['diffusion_profile']}",
+                      lambda: pipeline.load_pipeline(settings))
+
+    server = ThreadingHTTPServer((args.host, args.port), WorkerHandler)
+    print(f"worker พร้อมรับงานที่ http://{args.host}:{args.port} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nหยุดการทำงานของ worker")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
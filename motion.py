@@ -0,0 +1,152 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# การเคลื่อนกล้องบนภาพนิ่ง (pan/zoom หรือ "Ken Burns") สำหรับ segment ของฉาก
+#
+# เส้นทางกล้องของทุกเฟรมคำนวณด้วย NumPy ครั้งเดียว (กรอบที่ตัดจากภาพต้นฉบับของแต่ละเฟรม)
+# แล้วแต่ละเฟรมคือ Image.resize(box=กรอบ) ของ Pillow ซึ่งสุ่มตัวอย่างแบบ affine ใน C และปล่อย GIL
+# จึงสร้างเฟรมทีละกลุ่มพร้อมกันหลาย thread ได้ และส่งต่อให้ encoder ทันที
+# หน่วยความจำจึงไม่เกินเฟรมหนึ่งกลุ่ม ไม่ว่าฉากจะยาวเท่าไร
+# (แทนการใช้ callback ต่อเฟรมของ MoviePy เช่น clip.fl ซึ่งทำงานใน Python ทุกพิกเซล)
+
+MOTIONS = ("zoom_in", "zoom_out", "pan_left", "pan_right", "pan_up", "pan_down")
+
+# "kenburns" เลือกการเคลื่อนกล้องสลับกันตามลำดับฉาก
+KENBURNS_CYCLE = ("zoom_in", "pan_right", "zoom_out", "pan_left")
+
+_RESAMPLE = {"nearest": 0, "bilinear": 2, "bicubic": 3}
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def scene_motion(scene, settings, index):
+    """
+    การเคลื่อนกล้องของฉาก ("motion" ของฉาก หรือ settings["motion"]) หรือ None ถ้าไม่เคลื่อน
+
+    Args:
+        scene: ฉาก
+        settings: การตั้งค่าของโปรเจกต์
+        index: ลำดับของฉาก (ใช้เลือกการเคลื่อนของ "kenburns")
+    """
+    motion = scene.get("motion") or settings["motion"]
+    if not motion or motion == "none":
+        return None
+    if motion == "kenburns":
+        return KENBURNS_CYCLE[index % len(KENBURNS_CYCLE)]
+    if motion not in MOTIONS:
+        raise ValueError(f"ไม่รู้จักการเคลื่อนกล้อง {motion} (เลือกได้: kenburns, none, {', '.join(MOTIONS)})")
+    return motion
+
+
+def camera_boxes(source_size, output_size, motion, progress, zoom=1.15):
+    """
+    คำนวณกรอบที่ตัดจากภาพต้นฉบับของทุกเฟรมพร้อมกัน
+
+    Args:
+        source_size: (กว้าง, สูง) ของภาพต้นฉบับ
+        output_size: (กว้าง, สูง) ของวิดีโอ (กรอบมีสัดส่วนเดียวกับวิดีโอ)
+        motion: ชื่อการเคลื่อนใน MOTIONS
+        progress: array ของความคืบหน้า 0-1 ของแต่ละเฟรม
+        zoom: การซูมสูงสุด (1.15 = กรอบเล็กลง 15%)
+
+    Returns:
+        array (จำนวนเฟรม, 4) ของกรอบ (ซ้าย, บน, ขวา, ล่าง) เป็นพิกัดทศนิยม
+    """
+    import numpy as np
+
+    source_width, source_height = source_size
+    aspect = output_size[0] / output_size[1]
+    # กรอบที่ใหญ่ที่สุดที่มีสัดส่วนเท่ากับวิดีโอ (ภาพ 512x512 -> วิดีโอ 16:9 ตัดด้านบนล่างออก)
+    base_width = min(source_width, source_height * aspect)
+    base_height = base_width / aspect
+
+    # เร่งแล้วชะลอ (smoothstep) ให้กล้องไม่กระตุกที่ต้นและท้ายฉาก
+    p = np.asarray(progress, dtype=np.float64)
+    p = p * p * (3 - 2 * p)
+    if motion == "zoom_in":
+        scale = 1 + (zoom - 1) * p
+    elif motion == "zoom_out":
+        scale = zoom - (zoom - 1) * p
+    else:
+        scale = np.full_like(p, zoom)
+    width = base_width / scale
+    height = base_height / scale
+
+    # กล้องเลื่อนไปตามพื้นที่ที่เหลือของภาพ ตำแหน่งอื่นอยู่กลางภาพ
+    slack_x = (source_width - width) / 2
+    slack_y = (source_height - height) / 2
+    center_x = np.full_like(p, source_width / 2)
+    center_y = np.full_like(p, source_height / 2)
+    if motion == "pan_left":
+        center_x = center_x + slack_x * (1 - 2 * p)
+    elif motion == "pan_right":
+        center_x = center_x - slack_x * (1 - 2 * p)
+    elif motion == "pan_up":
+        center_y = center_y + slack_y * (1 - 2 * p)
+    elif motion == "pan_down":
+        center_y = center_y - slack_y * (1 - 2 * p)
+    return np.stack([center_x - width / 2, center_y - height / 2,
+                     center_x + width / 2, center_y + height / 2], axis=1)
+
+
+def _load(image_path):
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        image.load()
+    return image
+
+
+def _executor(threads):
+    # thread pool ใช้ร่วมกันทั้ง process (segment หลายฉากส่งงานเข้ามาพร้อมกันได้)
+    with _executors_lock:
+        if threads not in _executors:
+            _executors[threads] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="motion")
+        return _executors[threads]
+
+
+def motion_frames(image_path, motion, count, width, height, zoom=1.15, resample="bilinear", block=8, threads=4):
+    """
+    สร้างเฟรม RGB ของการเคลื่อนกล้องทีละกลุ่ม
+
+    Args:
+        image_path: ภาพนิ่งของฉาก
+        motion: ชื่อการเคลื่อนใน MOTIONS
+        count: จำนวนเฟรม
+        width, height: ขนาดของวิดีโอ
+        zoom: การซูมสูงสุด
+        resample: "bilinear" (เร็ว), "bicubic" (คมกว่า) หรือ "nearest"
+        block: จำนวนเฟรมต่อกลุ่ม (หน่วยความจำที่ใช้คือ block เฟรม)
+        threads: จำนวน thread ที่สร้างเฟรมพร้อมกัน
+
+    Yields:
+        bytes ของเฟรม RGB (rgb24) ตามลำดับ
+    """
+    import numpy as np
+
+    image = _load(image_path)
+    progress = (np.arange(count) + 0.5) / max(1, count)
+    boxes = camera_boxes(image.size, (width, height), motion, progress, zoom)
+    executor = _executor(max(1, threads))
+    method = _RESAMPLE[resample]
+
+    def render(box):
+        return image.resize((width, height), resample=method, box=tuple(float(value) for value in box)).tobytes()
+
+    for start in range(0, count, block):
+        yield from executor.map(render, boxes[start:start + block])
+
+
+def motion_frame(image_path, motion, progress, width, height, zoom=1.15, resample="bilinear"):
+    """
+    เฟรมเดียวของการเคลื่อนกล้องที่ความคืบหน้า progress (0 = ต้นฉาก, 1 = ท้ายฉาก) เป็น array uint8
+    ใช้เป็นภาพต้นและปลายของรอยต่อระหว่างฉาก (transitions.py) ให้ต่อเนื่องกับกล้อง
+    """
+    import numpy as np
+
+    image = _load(image_path)
+    box = camera_boxes(image.size, (width, height), motion, [progress], zoom)[0]
+    frame = image.resize((width, height), resample=_RESAMPLE[resample], box=tuple(float(value) for value in box))
+    return np.asarray(frame, dtype=np.uint8)
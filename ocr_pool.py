@@ -0,0 +1,95 @@
+import os
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+from image_to_text import extract_text_from_image
+
+# รัน OCR (Tesseract) ใน process pool แยกจากโมเดลสร้างคำอธิบายภาพ
+# ทำให้ใช้ได้หลาย core และโมเดลไม่ต้องรอ OCR ของแต่ละภาพ
+
+
+def parse_preprocess(spec):
+    """
+    แปลงข้อความกำหนดการเตรียมภาพเป็น dict สำหรับ preprocess_for_ocr
+
+    ตัวอย่าง: "grayscale,downscale=1600,binarize" -> {"grayscale": True, "max_side": 1600, "binarize": "otsu"}
+
+    Args:
+        spec: ข้อความคั่นด้วยจุลภาค ประกอบด้วย grayscale, downscale=<พิกเซล>, binarize[=<0-255>|otsu]
+
+    Returns:
+        dict หรือ None ถ้าไม่ได้กำหนด
+    """
+    if not spec:
+        return None
+    options = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().partition("=")
+        if name == "grayscale":
+            options["grayscale"] = True
+        elif name == "downscale":
+            options["max_side"] = int(value or 1600)
+        elif name == "binarize":
+            options["binarize"] = "otsu" if value in ("", "otsu") else int(value)
+        elif name:
+            raise ValueError(f"ไม่รู้จักการเตรียมภาพ: {name} (ใช้ได้: grayscale, downscale=N, binarize[=N])")
+    return options
+
+
+def _init_worker():
+    # Tesseract ใช้ OpenMP หลาย thread ต่อภาพ เมื่อรันหลาย process พร้อมกันให้ใช้ thread เดียวต่อ process
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+class OCRPool:
+    """
+    process pool สำหรับดึงข้อความจากรูปภาพ
+
+    ตัวอย่าง:
+        with OCRPool(workers=4) as pool:
+            future = pool.submit("frame.png", {"grayscale": True})
+            text = future.result()
+
+    Args:
+        workers: จำนวน process ที่รัน Tesseract พร้อมกัน
+        preprocess: การเตรียมภาพเริ่มต้นของทุกงาน (แต่ละงานกำหนดแยกได้ใน submit)
+    """
+
+    def __init__(self, workers=2, preprocess=None):
+        self.workers = max(1, int(workers))
+        self.preprocess = preprocess
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def submit(self, image_path, preprocess=None):
+        """
+        ส่งภาพเข้าคิว OCR
+
+        Returns:
+            Future ของข้อความที่ดึงได้
+        """
+        return self._executor.submit(extract_text_from_image, image_path, preprocess or self.preprocess)
+
+    def stream(self, image_paths, depth=None, preprocess=None):
+        """
+        ส่งภาพเข้าคิวล่วงหน้าโดยมีงานค้างไม่เกิน depth งาน (ค่าเริ่มต้น 2 เท่าของจำนวน process)
+
+        Yields:
+            tuple: (เส้นทางภาพ, Future ของข้อความ) ตามลำดับเดิม
+        """
+        depth = depth or self.workers * 2
+        pending = collections.deque()
+        for image_path in image_paths:
+            pending.append((image_path, self.submit(image_path, preprocess)))
+            if len(pending) >= depth:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,1017 @@
+import os
+import math
+import time
+import functools
+import importlib.util
+import itertools
+import threading
+
+from audio_mix import SAMPLE_RATE, decode, mix_track, normalize
+from asset_cache import AssetCache, image_cache_key, make_key, speech_cache_key
+from audio_probe import DurationIndex
+from diffusion_profiles import apply_profile, configure_pipeline
+from journal import Journal
+import metrics
+from metrics import instrument, span
+from motion import motion_frame, motion_frames, scene_motion
+from project import voice_for
+from scheduler import TaskGraph
+from subtitles import SUBTITLE_MODES, find_font, mux_subtitles, render_line, scene_cues, write_subtitles
+from transitions import TRANSITIONS, encode_transition_segment, transition_seconds
+from tts import get_backend, synthesize_all, synthesize_with_retry
+from video_assembly import assemble_video, concat_segments, encode_scene_segment, get_ffmpeg_exe
+from worker_client import call_worker
+
+# ขั้นตอนการสร้างวิดีโอ: generate_images -> generate_speech -> create_video
+# ทุกขั้นตอนรับรายการฉากและการตั้งค่าของโปรเจกต์ (ดู DEFAULT_SETTINGS ใน project.py)
+# torch, diffusers และไลบรารีขนาดใหญ่อื่น ๆ จะ import เมื่อขั้นตอนนั้นต้องทำงานจริงเท่านั้น
+# ถ้าทุกฉากมีภาพและเสียงในแคชแล้ว จะไม่ต้อง import ไลบรารีเหล่านี้เลย
+
+# กำหนดโฟลเดอร์สำหรับเก็บโมเดลที่ดาวน์โหลด
+os.environ["TRANSFORMERS_CACHE"] = "./model_cache"
+os.environ["HF_HOME"] = "./model_cache"
+
+# โมเดลและแคชที่เปิดแล้วจะใช้ซ้ำตลอดการทำงานของ process
+_pipelines = {}
+_caches = {}
+_duration_indexes = {}
+_journals = {}
+_generate_lock = threading.Lock()
+
+
+def prepare_directories(settings):
+    # สร้างไดเร็กทอรีสำหรับเก็บไฟล์
+    os.makedirs("images", exist_ok=True)
+    os.makedirs("audio", exist_ok=True)
+    os.makedirs("model_cache", exist_ok=True)
+    os.makedirs(os.path.dirname(settings["output_path"]) or ".", exist_ok=True)
+
+
+def get_cache(settings, kind):
+    """
+    คืนแคชภาพ ("image"), เสียง ("speech"), segment วิดีโอ ("segment"), ภาพคำบรรยาย ("subtitle")
+    หรือเสียงที่ถอดรหัสแล้ว ("pcm") ตามการตั้งค่า
+    """
+    root = settings[f"{kind}_cache_dir"]
+    if root not in _caches:
+        extension = {"image": ".png", "speech": ".mp3", "segment": ".mp4", "subtitle": ".png",
+                     "pcm": ".npy"}[kind]
+        _caches[root] = AssetCache(root, extension, max_bytes=settings[f"{kind}_cache_max_bytes"])
+    return _caches[root]
+
+
+def get_duration_index(settings):
+    """
+    คืนดัชนีความยาวของเสียงที่เก็บไว้ข้างแคชเสียง (durations.json)
+    """
+    root = settings["speech_cache_dir"]
+    if root not in _duration_indexes:
+        os.makedirs(root, exist_ok=True)
+        _duration_indexes[root] = DurationIndex(os.path.join(root, "durations.json"))
+    return _duration_indexes[root]
+
+
+def _run_path(settings, suffix):
+    # ไฟล์ของการรันเก็บไว้ข้างไฟล์วิดีโอ เช่น output/.final_video.journal.jsonl
+    output_path = os.path.abspath(settings["output_path"])
+    name = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(os.path.dirname(output_path), f".{name}.{suffix}")
+
+
+def get_journal(settings):
+    """
+    คืน journal ของโปรเจกต์ (ค่าเริ่มต้นอยู่ข้างไฟล์วิดีโอ หรือกำหนดด้วย journal_path)
+    """
+    path = os.path.abspath(settings["journal_path"] or _run_path(settings, "journal.jsonl"))
+    if path not in _journals:
+        _journals[path] = Journal(path)
+    return _journals[path]
+
+
+def close_journal(settings):
+    path = os.path.abspath(settings["journal_path"] or _run_path(settings, "journal.jsonl"))
+    journal = _journals.pop(path, None)
+    if journal is not None:
+        journal.close()
+
+
+def forced(settings, stage):
+    """
+    ตรวจสอบว่าต้องสร้างขั้นตอนนี้ใหม่ทั้งหมดหรือไม่ (--force หรือ --force-stage)
+    """
+    return stage in settings["force_stages"]
+
+
+# 3. สร้างภาพด้วย Stable Diffusion
+@instrument("model_load")
+def load_pipeline(settings):
+    """
+    โหลด StableDiffusionPipeline ตามการตั้งค่า (โหลดครั้งเดียวต่อโมเดลและโปรไฟล์)
+    """
+    local_model_path = settings["local_model_path"]
+    profile = settings["diffusion_profile"]
+    if (local_model_path, profile) in _pipelines:
+        return _pipelines[(local_model_path, profile)]
+
+    import torch
+    from diffusers import StableDiffusionPipeline
+    from model_store import open_model
+
+    def load(path):
+        kwargs = {"low_cpu_mem_usage": True}
+        if os.path.isdir(path):
+            kwargs["local_files_only"] = True
+        elif settings["torch_dtype"]:
+            # dtype ใช้ตอนดาวน์โหลดครั้งแรกเท่านั้น (โมเดลที่บันทึกไว้จะเก็บ dtype นั้น)
+            kwargs["torch_dtype"] = getattr(torch, settings["torch_dtype"])
+        return StableDiffusionPipeline.from_pretrained(path, **kwargs)
+
+    # โหลดจาก local ถ้าบันทึกไว้ครบแล้ว ไม่เช่นนั้นดาวน์โหลดแล้วบันทึกเป็น safetensors แบบ atomic
+    pipe = open_model(local_model_path, settings["model_id"], load,
+                      lambda pipe, path: pipe.save_pretrained(path, safe_serialization=True))
+
+    if torch.cuda.is_available():
+        pipe = pipe.to("cuda")
+    else:
+        # ใช้ CPU โดยปรับใช้ float32 แทน float16
+        pipe = pipe.to("cpu")
+        pipe.safety_checker = None  # ปิด safety checker เพื่อประหยัดหน่วยความจำ
+
+    if profile != "default":
+        print(f"ใช้โปรไฟล์ {profile}")
+        pipe = configure_pipeline(pipe, profile)
+
+    _pipelines[(local_model_path, profile)] = pipe
+    return pipe
+
+
+def scene_image_key(scene, settings):
+    """
+    คีย์แคชของภาพฉาก (จาก prompt และการตั้งค่า ไม่ใช่ลำดับฉาก)
+    """
+    return image_cache_key(
+        scene["prompt"],
+        scene.get("negative_prompt", settings["negative_prompt"]),
+        settings["model_id"],
+        settings["num_inference_steps"],
+        settings["guidance_scale"],
+        settings["width"],
+        settings["height"],
+        scene.get("seed", settings["seed"]),
+        settings["diffusion_profile"],
+    )
+
+
+def _generate_to_files(pipe, jobs, settings):
+    # สร้างภาพเป็นกลุ่มแล้วบันทึกลงไฟล์ชั่วคราวของแต่ละงาน
+    from batch_diffusion import generate_batched
+    for job, image in generate_batched(
+            pipe, jobs, settings["image_batch_size"], settings["num_inference_steps"],
+            settings["guidance_scale"], settings["width"], settings["height"]):
+        image.save(job["output_path"])
+        yield job
+
+
+def plan_images(scenes, settings):
+    """
+    ตรวจสอบแคชของทุกฉาก กำหนด scene["image_path"] ให้ฉากที่มีภาพแล้ว และคืนงานของภาพที่ต้องสร้าง
+
+    ฉากที่เหมือนกันจะถูกรวมเป็นงานเดียวเพื่อสร้างเพียงครั้งเดียว
+
+    Args:
+        scenes: รายการฉาก
+        settings: การตั้งค่าของโปรเจกต์
+
+    Returns:
+        รายการงาน (dict ที่มี key, prompt, negative_prompt, seed, output_path และ scenes)
+    """
+    image_cache = get_cache(settings, "image")
+    pending = {}
+    for scene in scenes:
+        key = scene_image_key(scene, settings)
+        if key in pending:
+            pending[key]["scenes"].append(scene)
+            continue
+
+        image_path = None if forced(settings, "images") else image_cache.get(key)
+        if image_path:
+            print(f"พบภาพเดิมที่ {image_path}")
+            scene["image_path"] = image_path
+        else:
+            pending[key] = {
+                "key": key,
+                "prompt": scene["prompt"],
+                "negative_prompt": scene.get("negative_prompt", settings["negative_prompt"]),
+                "seed": scene.get("seed", settings["seed"]),
+                "output_path": os.path.abspath(f"images/temp_{key[:16]}_{os.getpid()}.png"),
+                "scenes": [scene],
+            }
+    return list(pending.values())
+
+
+@instrument("images", items=lambda jobs, settings: sum(len(job["scenes"]) for job in jobs))
+def render_image_jobs(jobs, settings):
+    """
+    สร้างภาพของงานที่ได้จาก plan_images ย้ายเข้าแคช และกำหนด scene["image_path"]
+
+    Args:
+        jobs: รายการงานจาก plan_images
+        settings: การตั้งค่าของโปรเจกต์
+    """
+    try:
+        _render_image_jobs(jobs, settings)
+    except Exception as e:
+        journal = get_journal(settings)
+        for job in jobs:
+            if "image_path" not in job["scenes"][0]:
+                journal.record("images", job["key"], status="failed", error=str(e))
+        raise
+
+
+def _render_image_jobs(jobs, settings):
+    image_cache = get_cache(settings, "image")
+    if settings["worker_url"]:
+        # ส่งงานให้ worker ที่โหลดโมเดลค้างไว้ ไม่ต้องโหลดโมเดลใหม่ทุกครั้ง
+        print(f"กำลังส่งงานสร้างภาพ {len(jobs)} ภาพไปยัง worker ที่ {settings['worker_url']}")
+        call_worker(settings["worker_url"], "generate_images", {
+            "settings": {k: v for k, v in settings.items() if k != "voices"},
+            "jobs": [{k: job[k] for k in ("prompt", "negative_prompt", "seed", "output_path")} for job in jobs],
+        })
+        finished = jobs
+    else:
+        # โหลดโมเดลเฉพาะเมื่อมีฉากที่ต้องสร้างภาพใหม่
+        pipe = load_pipeline(settings)
+        print(f"กำลังสร้างภาพ {len(jobs)} ภาพ (ครั้งละ {settings['image_batch_size']} ภาพ)")
+        finished = _generate_to_files(pipe, jobs, settings)
+
+    # pipeline ไม่รองรับการเรียกพร้อมกันหลาย thread
+    with _generate_lock:
+        for n, job in enumerate(finished):
+            # ย้ายภาพจากไฟล์ชั่วคราวเข้าแคช
+            image_path = image_cache.put(job["key"], job["output_path"], meta={"prompt": job["prompt"]})
+            print(f"สร้างภาพที่ {n+1}/{len(jobs)} เสร็จแล้ว")
+            get_journal(settings).record("images", job["key"], {"image_path": image_path})
+            for scene in job["scenes"]:
+                scene["image_path"] = image_path
+
+
+@instrument("images", items=lambda scenes, settings: len(scenes))
+def generate_images(scenes, settings):
+    """
+    สร้างภาพของทุกฉากที่ยังไม่มีในแคช และกำหนด scene["image_path"]
+
+    Args:
+        scenes: รายการฉาก
+        settings: การตั้งค่าของโปรเจกต์
+    """
+    print("กำลังสร้างภาพ...")
+    jobs = plan_images(scenes, settings)
+    if jobs:
+        render_image_jobs(jobs, settings)
+    print("สร้างภาพเสร็จสิ้น!")
+
+
+# 4. สร้างเสียงพูดด้วย Text-to-Speech (ค่าเริ่มต้นคือ Google Text-to-Speech)
+def _speech_job(scene, settings):
+    # คืนคีย์แคช การตั้งค่าเสียง และเอนจิน TTS ของฉาก
+    voice = voice_for(scene, settings)
+    key = speech_cache_key(scene["text"], voice["lang"], voice["engine"], voice["slow"])
+    return key, voice, get_backend(voice["engine"])
+
+
+def _temp_speech_path(key, backend):
+    return f"audio/temp_speech_{key[:16]}_{int(time.time())}{backend.extension}"
+
+
+@instrument("speech", name="probe_duration")
+def _set_scene_duration(scene, audio_path, settings):
+    # อ่านความยาวของเสียงจาก header ของไฟล์ (ไฟล์ที่เคยอ่านแล้วจะใช้ค่าจากดัชนี)
+    try:
+        audio_duration = get_duration_index(settings).duration(audio_path)
+        print(f"  ความยาวของเสียง: {audio_duration:.2f} วินาที")
+
+        # ปรับความยาวของฉากให้เท่ากับความยาวของเสียง + 1 วินาทีเพื่อความเรียบร้อย
+        # (คำบรรยายแบ่งเวลาตามความยาวของเสียงพูดจริง)
+        scene["speech_duration"] = audio_duration
+        scene["duration"] = audio_duration + 1
+    except Exception as e:
+        print(f"  ไม่สามารถอ่านความยาวของเสียงได้: {e}")
+
+
+@instrument("speech", items=lambda scene, settings, batched=False: 1)
+def synthesize_scene_speech(scene, settings, batched=False):
+    """
+    สร้างเสียงพูดของฉากเดียว (ถ้ายังไม่มีในแคช) และกำหนด scene["audio_path"] กับ scene["duration"]
+
+    Args:
+        scene: ฉาก
+        settings: การตั้งค่าของโปรเจกต์
+        batched: เสียงของฉากสร้างแล้วด้วย synthesize_speech_batch (ใช้จากแคชแม้ใช้ --force-stage speech)
+    """
+    speech_cache = get_cache(settings, "speech")
+    key, voice, backend = _speech_job(scene, settings)
+    audio_path = None if forced(settings, "speech") and not batched else speech_cache.get(key)
+
+    # ตรวจสอบว่ามีไฟล์เสียงที่สร้างไว้แล้วหรือไม่
+    if audio_path:
+        print(f"ใช้ไฟล์เสียงที่มีอยู่แล้วที่ {audio_path}")
+    else:
+        try:
+            temp_audio_path = synthesize_with_retry(
+                backend, scene["text"], voice, _temp_speech_path(key, backend),
+                settings["tts_retries"], settings["tts_backoff"])
+        except Exception as e:
+            get_journal(settings).record("speech", key, status="failed", error=str(e))
+            raise
+        # ย้ายไฟล์จากชั่วคราวเข้าแคช (os.replace เช่นเดียวกับการเปลี่ยนชื่อไฟล์)
+        audio_path = speech_cache.put(key, temp_audio_path, meta={"text": scene["text"][:80]})
+        get_journal(settings).record("speech", key, {"audio_path": audio_path})
+
+    _set_scene_duration(scene, audio_path, settings)
+    scene["audio_path"] = audio_path
+    return audio_path
+
+
+@instrument("speech", name="speech_batch", items=lambda scenes, settings: len(scenes))
+def synthesize_speech_batch(scenes, settings):
+    """
+    สร้างเสียงพูดของฉากที่ยังไม่มีในแคชพร้อมกัน (เอนจินที่มี batch_size > 1 เช่น local สร้างเป็น batch)
+    แล้วพิมพ์ปริมาณงานของแต่ละเอนจิน ไม่ได้กำหนด scene["audio_path"] (ดู generate_speech)
+
+    ฉากที่ยังไม่มีเสียงจะถูกส่งไปยังเอนจิน TTS พร้อมกันไม่เกิน stage_concurrency["speech"] คำขอ
+
+    Args:
+        scenes: รายการฉาก
+        settings: การตั้งค่าของโปรเจกต์
+
+    Returns:
+        รายการคีย์แคชเสียงของแต่ละฉากตามลำดับ
+    """
+    speech_cache = get_cache(settings, "speech")
+
+    # แยกฉากที่ยังไม่มีเสียงตามเอนจิน (ข้อความเดียวกันสร้างเพียงครั้งเดียว)
+    keys = []
+    missing = {}
+    for scene in scenes:
+        key, voice, backend = _speech_job(scene, settings)
+        keys.append(key)
+        if key not in missing and (forced(settings, "speech") or speech_cache.get(key) is None):
+            missing[key] = (scene["text"], voice, backend)
+
+    by_backend = {}
+    for key, (text, voice, backend) in missing.items():
+        by_backend.setdefault(backend.name, (backend, []))[1].append((key, text, voice))
+
+    for backend, items in by_backend.values():
+        print(f"กำลังสร้างเสียงพูด {len(items)} รายการด้วย {backend.name} "
+              f"(พร้อมกันไม่เกิน {settings['stage_concurrency']['speech']} รายการ)")
+        start = time.perf_counter()
+        try:
+            paths = synthesize_all(
+                [(text, voice, _temp_speech_path(key, backend)) for key, text, voice in items],
+                backend,
+                max_concurrency=settings["stage_concurrency"]["speech"],
+                retries=settings["tts_retries"],
+                backoff=settings["tts_backoff"],
+            )
+        except Exception as e:
+            for key, _, _ in items:
+                get_journal(settings).record("speech", key, status="failed", error=str(e))
+            raise
+        elapsed = time.perf_counter() - start
+
+        audio_seconds = 0.0
+        durations = get_duration_index(settings)
+        for (key, text, _), temp_audio_path in zip(items, paths):
+            # ย้ายไฟล์จากชั่วคราวเข้าแคช (os.replace เช่นเดียวกับการเปลี่ยนชื่อไฟล์)
+            audio_path = speech_cache.put(key, temp_audio_path, meta={"text": text[:80]})
+            get_journal(settings).record("speech", key, {"audio_path": audio_path})
+            audio_seconds += durations.duration(audio_path)
+        # ปริมาณงานของเอนจิน: ความยาวเสียงที่สร้างได้ต่อเวลาที่ใช้
+        print(f"  {backend.name}: เสียง {audio_seconds:.1f} วินาที ใช้เวลา {elapsed:.1f} วินาที "
+              f"({audio_seconds / max(elapsed, 1e-9):.2f} วินาทีเสียง/วินาที)")
+
+    return keys
+
+
+@instrument("speech", items=lambda scenes, settings: len(scenes))
+def generate_speech(scenes, settings):
+    """
+    สร้างเสียงพูดของทุกฉากที่ยังไม่มีในแคช และกำหนด scene["audio_path"] กับ scene["duration"]
+
+    Args:
+        scenes: รายการฉาก
+        settings: การตั้งค่าของโปรเจกต์
+    """
+    print("กำลังสร้างเสียงพูด...")
+    speech_cache = get_cache(settings, "speech")
+    keys = synthesize_speech_batch(scenes, settings)
+
+    # กำหนดไฟล์เสียงและความยาวของแต่ละฉากตามลำดับเดิม
+    for i, (scene, key) in enumerate(zip(scenes, keys)):
+        audio_path = speech_cache.get(key)
+        print(f"เสียงพูดที่ {i+1}/{len(scenes)}: {audio_path}")
+        _set_scene_duration(scene, audio_path, settings)
+        scene["audio_path"] = audio_path
+    get_duration_index(settings).flush()
+
+    print("สร้างเสียงพูดเสร็จสิ้น!")
+
+
+# 5. สร้างวิดีโอจากภาพและเสียง
+def scene_segment_key(scene, settings, index):
+    """
+    คีย์ของ segment วิดีโอของฉาก (จากคีย์ของภาพ เสียง ความยาว และการตั้งค่าการเข้ารหัส)
+    คำนวณได้ก่อนสร้างภาพและเสียง เพราะภาพ เสียง และความยาวของเสียงขึ้นกับคีย์ของมันเท่านั้น
+    ต้องเรียกก่อนที่ generate_speech จะแทน scene["duration"] ด้วยความยาวของเสียง
+    """
+    # คำบรรยายแบบ burn อยู่ในภาพของ segment (เวลาของแต่ละบรรทัดขึ้นกับเสียง จึงอยู่ในคีย์ของเสียงแล้ว)
+    extra = {}
+    if settings["subtitles"] == "burn":
+        extra = {"subtitles": scene.get("text"), "subtitle_style": subtitle_style(settings)}
+    motion = scene_motion(scene, settings, index)
+    if motion:
+        extra["motion"] = (motion, settings["motion_zoom"], settings["motion_resample"])
+    return make_key(
+        kind="segment",
+        image=scene_image_key(scene, settings),
+        speech=_speech_job(scene, settings)[0],
+        duration=scene.get("duration"),
+        fps=settings["fps"],
+        width=settings["width"],
+        height=settings["height"],
+        fade_in=_fade_in(settings, index),
+        **extra,
+    )
+
+
+def _fade_in(settings, index):
+    # เฟดเข้าจากสีดำที่ต้นฉาก (ไม่ใช้เมื่อมี transition ระหว่างฉากแล้ว)
+    if index == 0 or settings["transition"]:
+        return 0.0
+    return settings["crossfade"]
+
+
+def _fallback_fade_in(settings):
+    # assemble_video ไม่มีรอยต่อแบบ transitions.py จึงใช้การเฟดเข้าของแต่ละฉากแทน (เหมือน crossfade เดิม)
+    if settings["transition"]:
+        print(f"การประกอบวิดีโอแบบสำรองไม่รองรับ transition {settings['transition']} "
+              f"จะเฟดเข้า {settings['transition_duration']} วินาทีแทน")
+        return settings["transition_duration"]
+    return settings["crossfade"]
+
+
+def static_segment_key(segment_key, settings, last):
+    """
+    คีย์ของ segment ภาพนิ่งของฉาก: เมื่อมี transition ฉากที่ไม่ใช่ฉากสุดท้ายจะสั้นลงเท่ากับความยาวของรอยต่อ
+
+    Args:
+        segment_key: คีย์จาก scene_segment_key
+        settings: การตั้งค่าของโปรเจกต์
+        last: เป็นฉากสุดท้ายของวิดีโอหรือไม่
+    """
+    if not settings["transition"] or last:
+        return segment_key
+    return make_key(kind="segment", scene=segment_key, trim=settings["transition_duration"])
+
+
+def transition_key(key_a, key_b, settings):
+    """
+    คีย์ของ segment รอยต่อจากฉาก A ไปฉาก B (จากคีย์ของ segment ทั้งสองฉากและการตั้งค่า transition)
+    """
+    return make_key(kind="transition", a=key_a, b=key_b, transition=settings["transition"],
+                    seconds=settings["transition_duration"])
+
+
+def project_video_key(project):
+    """
+    คีย์ของวิดีโอทั้งเรื่อง (จากคีย์ของทุกฉากตามลำดับ) ใช้ตรวจว่าไฟล์วิดีโอเดิมตรงกับโปรเจกต์หรือไม่
+    """
+    settings = project.settings
+    return make_key(
+        kind="video",
+        scenes=[scene_segment_key(scene, settings, i) for i, scene in enumerate(project.iter_scenes())],
+        engine=settings["video_engine"],
+        output_path=os.path.abspath(settings["output_path"]),
+        subtitles=settings["subtitles"],
+        transition=settings["transition"] and (settings["transition"], settings["transition_duration"]),
+        audio=settings["audio_mix"] and (settings["loudness_target"], _music_source(settings),
+                                         settings["music_volume_db"], settings["ducking_db"]),
+    )
+
+
+def should_write_video(settings, video_key=None):
+    """
+    ตรวจสอบว่าต้องสร้างไฟล์วิดีโอหรือไม่
+
+    ถ้ามีไฟล์อยู่แล้ว จะข้ามเมื่อ journal บันทึกว่าสร้างจากฉากชุดเดียวกัน (video_key) หรือเมื่อใช้ --reuse
+    และจะสร้างใหม่เมื่อใช้ --force / --force-stage video หรือเมื่อฉากเปลี่ยนไป
+    """
+    output_path = settings["output_path"]
+    if not os.path.exists(output_path):
+        return True
+
+    if forced(settings, "video"):
+        print(f"จะสร้างวิดีโอใหม่แทนไฟล์เดิมที่ {output_path}")
+    elif video_key and get_journal(settings).done("video", video_key):
+        print(f"ไฟล์วิดีโอที่ {output_path} ตรงกับฉากปัจจุบันแล้ว")
+        return False
+    elif settings["reuse_existing"]:
+        print(f"ใช้ไฟล์วิดีโอที่มีอยู่แล้วที่ {output_path}")
+        return False
+    else:
+        print(f"ไฟล์วิดีโอที่ {output_path} ไม่ตรงกับฉากปัจจุบัน จะสร้างใหม่")
+    # ลบไฟล์เดิม
+    os.remove(output_path)
+    return True
+
+
+def subtitle_style(settings):
+    """
+    การตั้งค่าที่มีผลต่อภาพคำบรรยาย (ใช้ในคีย์ของแคชและของ segment)
+    """
+    return {
+        "font": find_font(settings["subtitle_font"]),
+        "font_size": settings["subtitle_font_size"],
+        "width": settings["width"],
+    }
+
+
+@instrument("encode", name="render_subtitles")
+def render_scene_subtitles(scene, settings):
+    """
+    วาดคำบรรยายของฉากเป็นภาพ (บรรทัดละครั้ง บรรทัดที่เคยวาดแล้วใช้จากแคช) และกำหนด scene["subtitles"]
+
+    Args:
+        scene: ฉากที่มี "text" และ "speech_duration" (หลังสร้างเสียงแล้ว)
+        settings: การตั้งค่าของโปรเจกต์
+
+    Returns:
+        รายการ {"image_path", "start", "end"} โดยเวลานับจากต้นฉาก
+    """
+    subtitle_cache = get_cache(settings, "subtitle")
+    style = subtitle_style(settings)
+    subtitles = []
+    for start, end, line in scene_cues(scene):
+        key = make_key(kind="subtitle", text=line, **style)
+        image_path = subtitle_cache.get(key)
+        if image_path is None:
+            temp_path = os.path.join(subtitle_cache.root, f"temp_{key[:16]}_{threading.get_ident()}.png")
+            render_line(line, temp_path, style["width"], style["font"], style["font_size"])
+            image_path = subtitle_cache.put(key, temp_path, meta={"text": line[:80]})
+        subtitles.append({"image_path": image_path, "start": start, "end": end})
+    scene["subtitles"] = subtitles
+    return subtitles
+
+
+@instrument("video", name="subtitles")
+def write_video_subtitles(cues, settings):
+    """
+    เขียนไฟล์คำบรรยายข้างไฟล์วิดีโอ และใส่เป็น track ในวิดีโอเมื่อใช้คำบรรยายแบบ soft
+
+    Args:
+        cues: รายการ (เวลาเริ่ม, เวลาจบ, ข้อความ) ของทั้งเรื่อง
+        settings: การตั้งค่าของโปรเจกต์
+    """
+    output_path = settings["output_path"]
+    subtitle_path = f"{os.path.splitext(output_path)[0]}.{settings['subtitle_format']}"
+    write_subtitles(cues, subtitle_path, settings["subtitle_format"], settings["width"], settings["height"],
+                    find_font(settings["subtitle_font"]), settings["subtitle_font_size"])
+    print(f"เขียนคำบรรยาย {len(cues)} บรรทัดที่ {subtitle_path}")
+    if settings["subtitles"] != "soft":
+        return subtitle_path
+    if get_ffmpeg_exe() is None:
+        print("ไม่พบ ffmpeg จะไม่ใส่ track คำบรรยายในวิดีโอ (ใช้ไฟล์คำบรรยายข้างวิดีโอแทน)")
+        return subtitle_path
+    mux_subtitles(output_path, subtitle_path)
+    return subtitle_path
+
+
+def _timeline_cues(scenes):
+    # คำบรรยายของทั้งเรื่อง: เวลาของแต่ละฉากต่อจากความยาวรวมของฉากก่อนหน้า
+    cues = []
+    offset = 0.0
+    for scene in scenes:
+        cues.extend(scene_cues(scene, offset))
+        offset += scene["duration"]
+    return cues
+
+
+def _music_source(settings):
+    # เพลงประกอบระบุด้วยเส้นทาง ขนาด และเวลาแก้ไข (เปลี่ยนไฟล์แล้วจะประกอบเสียงใหม่)
+    path = settings["music_path"]
+    if not path:
+        return None
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+
+def load_pcm(path, settings, channels=1, gain_db=0.0):
+    """
+    เสียงที่ถอดรหัสและปรับความดังแล้ว (array float32 แบบ memory-mapped) จากแคช PCM หรือถอดรหัสใหม่
+    รันใหม่จึงไม่ต้องถอดรหัสและวัดความดังของเสียงเดิมซ้ำ
+
+    Args:
+        path: ไฟล์เสียง
+        settings: การตั้งค่าของโปรเจกต์
+        channels: 1 (เสียงพูด) หรือ 2 (เพลงประกอบ)
+        gain_db: ความดังเทียบกับ loudness_target (dB)
+    """
+    import numpy as np
+
+    stat = os.stat(path)
+    target = settings["loudness_target"] + gain_db
+    key = make_key(kind="pcm", path=os.path.abspath(path), size=stat.st_size, mtime=stat.st_mtime,
+                   sample_rate=SAMPLE_RATE, channels=channels, target=target)
+    pcm_cache = get_cache(settings, "pcm")
+    pcm_path = pcm_cache.get(key)
+    if not pcm_path:
+        samples = normalize(decode(path, SAMPLE_RATE, channels), target)
+        temp_path = os.path.join(pcm_cache.root, f"temp_{key[:16]}_{os.getpid()}.npy")
+        np.save(temp_path, samples)
+        pcm_path = pcm_cache.put(key, temp_path, meta={"source": os.path.basename(path)})
+    return np.load(pcm_path, mmap_mode="r")
+
+
+@instrument("video", name="audio_mix", items=lambda tracks, settings: len(tracks))
+def mix_audio(tracks, settings):
+    """
+    ประกอบเสียงพูดของทุกฉากเป็น track เดียว (ดู audio_mix.py) ไว้ข้างไฟล์วิดีโอ
+
+    Args:
+        tracks: รายการ {"audio_path", "duration"} ของทุกฉากตามลำดับ
+        settings: การตั้งค่าของโปรเจกต์
+
+    Returns:
+        ไฟล์ WAV ของ track เสียง (ลบได้หลังต่อวิดีโอ)
+    """
+    fades = None
+    if settings["transition"]:
+        # เสียงของฉากก่อนหน้าค่อย ๆ เบาลงตลอดรอยต่อ (เหมือน encode_transition_segment)
+        fades = [transition_seconds(track["duration"], settings["transition_duration"], settings["fps"])
+                 for track in tracks[:-1]] + [0.0]
+    music = None
+    if settings["music_path"]:
+        music = load_pcm(settings["music_path"], settings, channels=2, gain_db=settings["music_volume_db"])
+    track_path = _run_path(settings, "audio.wav")
+    clips = (load_pcm(track["audio_path"], settings) for track in tracks)
+    mix_track(clips, [track["duration"] for track in tracks], track_path, SAMPLE_RATE, fades=fades, music=music,
+              ducking_db=settings["ducking_db"])
+    print(f"ประกอบเสียงของ {len(tracks)} ฉากแล้ว")
+    return track_path
+
+
+def _concat_with_audio(segments, tracks, settings):
+    # ต่อ segment แบบ stream copy โดยใช้ track เสียงที่ประกอบแล้ว (ถ้าเปิด audio_mix)
+    audio_path = mix_audio(tracks, settings) if settings["audio_mix"] else None
+    try:
+        with span("concat_segments", "video", items=len(segments)):
+            concat_segments(segments, settings["output_path"], audio_path)
+    finally:
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+
+
+@instrument("video", items=lambda scenes, settings, video_key=None: len(scenes))
+def create_video(scenes, settings, video_key=None):
+    """
+    ประกอบวิดีโอจากภาพและเสียงของทุกฉาก
+
+    Args:
+        scenes: รายการฉากที่มี "image_path", "audio_path", "duration" และ "segment_key" (ถ้ามี)
+        settings: การตั้งค่าของโปรเจกต์
+        video_key: คีย์ของวิดีโอจาก project_video_key (ใช้บันทึกใน journal)
+    """
+    print("กำลังสร้างวิดีโอ...")
+    output_path = settings["output_path"]
+
+    # ตรวจสอบว่ามีไฟล์วิดีโอที่สร้างไว้แล้วหรือไม่
+    if not should_write_video(settings, video_key):
+        return
+
+    print("กำลังบันทึกวิดีโอ...")
+    try:
+        if (settings["video_engine"] == "ffmpeg" and get_ffmpeg_exe()
+                and all("segment_key" in scene for scene in scenes)):
+            # เข้ารหัสเฉพาะฉากที่ segment ยังไม่อยู่ในแคช แล้วต่อทั้งหมดแบบ stream copy
+            segments = []
+            for i, scene in enumerate(scenes):
+                last = i == len(scenes) - 1
+                if settings["transition"] and i > 0:
+                    previous = scenes[i - 1]
+                    segments.append(get_transition(
+                        previous, scene, settings, transition_key(previous["segment_key"], scene["segment_key"],
+                                                                  settings), i))
+                segments.append(get_segment(scene, settings, static_segment_key(scene["segment_key"], settings, last),
+                                            i, trim=bool(settings["transition"]) and not last))
+            _concat_with_audio(segments, scenes, settings)
+        else:
+            if settings["subtitles"] == "burn":
+                for scene in scenes:
+                    render_scene_subtitles(scene, settings)
+            # ประกอบวิดีโอด้วย ffmpeg filtergraph หรือ MoviePy (ทีละ video_window ฉากถ้าโปรเจกต์ยาว)
+            assemble_video(scenes, output_path, fps=settings["fps"], engine=settings["video_engine"],
+                           fade_in=_fallback_fade_in(settings), window=settings["video_window"],
+                           size=(settings["width"], settings["height"]))
+        if settings["subtitles"]:
+            write_video_subtitles(_timeline_cues(scenes), settings)
+    except Exception as e:
+        if video_key:
+            get_journal(settings).record("video", video_key, status="failed", error=str(e))
+        raise
+    if video_key:
+        get_journal(settings).record("video", video_key, {"output_path": output_path})
+
+    print(f"สร้างวิดีโอเสร็จสิ้น! ไฟล์อยู่ที่ {output_path}")
+
+
+@instrument("encode", items=lambda scene, settings, segment_key, index, trim=False: 1)
+def get_segment(scene, settings, segment_key, index, trim=False):
+    """
+    คืน segment ของฉากจากแคช หรือเข้ารหัสใหม่ถ้ายังไม่มี (หรือใช้ --force-stage encode)
+
+    Args:
+        scene: ฉากที่มี "image_path", "audio_path" และ "duration"
+        settings: การตั้งค่าของโปรเจกต์
+        segment_key: คีย์จาก static_segment_key (หรือ scene_segment_key เมื่อไม่มี transition)
+        index: ลำดับของฉาก
+        trim: ตัดท้ายฉากออกเท่ากับความยาวของรอยต่อไปยังฉากถัดไป (ดู get_transition)
+
+    Returns:
+        เส้นทางของ segment ในแคช
+    """
+    segment_cache = get_cache(settings, "segment")
+    segment_path = None if forced(settings, "encode") else segment_cache.get(segment_key)
+    if segment_path:
+        return segment_path
+
+    journal = get_journal(settings)
+    if settings["subtitles"] == "burn":
+        render_scene_subtitles(scene, settings)
+    if trim:
+        seconds = transition_seconds(scene["duration"], settings["transition_duration"], settings["fps"])
+        scene = dict(scene, duration=scene["duration"] - seconds)
+    frames = None
+    motion = scene_motion(scene, settings, index)
+    if motion:
+        # เฟรมของกล้องสร้างทีละกลุ่มและส่งเข้า encoder ทันที (ปัดขึ้นเพื่อไม่ให้เฟรมขาดก่อน -t)
+        frames = motion_frames(scene["image_path"], motion, math.ceil(scene["duration"] * settings["fps"] - 1e-6),
+                               settings["width"], settings["height"], settings["motion_zoom"],
+                               settings["motion_resample"], threads=settings["motion_threads"])
+    temp_path = os.path.join(segment_cache.root, f"temp_{segment_key[:16]}_{os.getpid()}.mp4")
+    try:
+        encode_scene_segment(scene, temp_path, settings["fps"], settings["width"], settings["height"],
+                             _fade_in(settings, index), frames=frames)
+    except Exception as e:
+        journal.record("encode", segment_key, status="failed", scene=index, error=str(e))
+        raise
+    segment_path = segment_cache.put(segment_key, temp_path, meta={"scene": index})
+    journal.record("encode", segment_key, {"segment_path": segment_path}, scene=index)
+    print(f"เข้ารหัส segment ของฉากที่ {index + 1} แล้ว")
+    return segment_path
+
+
+@instrument("encode", name="transition", items=lambda scene_a, scene_b, settings, key, index: 1)
+def get_transition(scene_a, scene_b, settings, key, index):
+    """
+    คืน segment รอยต่อจากฉาก A ไปฉาก B จากแคช หรือสร้างใหม่ (เฉพาะเฟรมของรอยต่อ ดู transitions.py)
+
+    Args:
+        scene_a: ฉากก่อนหน้า (หลังสร้างภาพและเสียงแล้ว)
+        scene_b: ฉากถัดไป (หลังสร้างภาพแล้ว)
+        settings: การตั้งค่าของโปรเจกต์
+        key: คีย์จาก transition_key
+        index: ลำดับของฉาก B
+
+    Returns:
+        เส้นทางของ segment ในแคช
+    """
+    segment_cache = get_cache(settings, "segment")
+    segment_path = None if forced(settings, "encode") else segment_cache.get(key)
+    if segment_path:
+        return segment_path
+
+    journal = get_journal(settings)
+    seconds = transition_seconds(scene_a["duration"], settings["transition_duration"], settings["fps"])
+    # ฉากที่กล้องเคลื่อน: รอยต่อเริ่มจากเฟรมสุดท้ายของ A และจบที่เฟรมแรกของ B
+    size = (settings["width"], settings["height"])
+    motion_a = scene_motion(scene_a, settings, index - 1)
+    motion_b = scene_motion(scene_b, settings, index)
+    frame_a = motion_a and motion_frame(scene_a["image_path"], motion_a, 1.0, *size, settings["motion_zoom"],
+                                        settings["motion_resample"])
+    frame_b = motion_b and motion_frame(scene_b["image_path"], motion_b, 0.0, *size, settings["motion_zoom"],
+                                        settings["motion_resample"])
+    temp_path = os.path.join(segment_cache.root, f"temp_{key[:16]}_{os.getpid()}.mp4")
+    try:
+        encode_transition_segment(scene_a, scene_b, temp_path, settings["transition"], seconds,
+                                  settings["fps"], *size, frame_a=frame_a, frame_b=frame_b)
+    except Exception as e:
+        journal.record("encode", key, status="failed", scene=index, error=str(e))
+        raise
+    segment_path = segment_cache.put(key, temp_path, meta={"scene": index, "transition": settings["transition"]})
+    journal.record("encode", key, {"segment_path": segment_path}, scene=index)
+    print(f"สร้างรอยต่อไปยังฉากที่ {index + 1} แล้ว ({settings['transition']} {seconds:.2f} วินาที)")
+    return segment_path
+
+
+# 6. รันทุกขั้นตอนของโปรเจกต์
+
+# stage ของงานใน run_graph (กำหนดจำนวนงานพร้อมกันได้ด้วย settings["stage_concurrency"] หรือ --jobs)
+GRAPH_STAGES = ("images", "speech", "encode")
+
+
+def _iter_chunks(scenes, chunk_size):
+    while True:
+        chunk = list(itertools.islice(scenes, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_sequential(project, chunk_size=50):
+    """
+    รันทีละขั้นตอน: สร้างภาพ -> สร้างเสียง (ทีละกลุ่มของฉาก) -> ประกอบวิดีโอ
+    """
+    settings = project.settings
+
+    # เก็บเฉพาะข้อมูลที่ create_video ต้องใช้ ไม่เก็บ prompt ของทุกฉากไว้
+    timeline = []
+    for chunk in _iter_chunks(project.iter_scenes(), chunk_size):
+        # คีย์ของ segment ต้องคำนวณก่อนที่ความยาวของฉากจะถูกแทนด้วยความยาวของเสียง
+        for scene in chunk:
+            scene["segment_key"] = scene_segment_key(scene, settings, len(timeline))
+            timeline.append(scene)
+        generate_images(chunk, settings)
+        generate_speech(chunk, settings)
+        for i, scene in enumerate(chunk):
+            timeline[len(timeline) - len(chunk) + i] = {
+                key: scene.get(key) for key in ("image_path", "audio_path", "duration", "speech_duration", "text",
+                                                "motion", "segment_key")
+            }
+
+    if not timeline:
+        raise ValueError("โปรเจกต์ไม่มีฉาก")
+    create_video(timeline, settings, project_video_key(project))
+
+
+def run_graph(project, chunk_size=50):
+    """
+    รันแบบกราฟงานต่อฉาก: เสียงพูดของฉากสร้างพร้อมกับภาพ และเข้ารหัส segment ของฉาก
+    ได้ทันทีที่ภาพและเสียงของฉากนั้นเสร็จ จากนั้นต่อ segment ทั้งหมดแบบ stream copy
+
+    จำนวนงานพร้อมกันของแต่ละขั้นตอนกำหนดด้วย settings["stage_concurrency"]
+    segment เก็บในแคชตามคีย์ของภาพ เสียง และความยาว รันใหม่หลังแก้ไขฉากจึงเข้ารหัสเฉพาะฉากที่เปลี่ยน
+    รอยต่อระหว่างฉาก (settings["transition"]) สร้างได้เมื่อภาพของทั้งสองฉากและเสียงของฉากก่อนหน้าเสร็จ
+    """
+    settings = project.settings
+    output_path = settings["output_path"]
+    video_key = project_video_key(project)
+    write_video = should_write_video(settings, video_key)
+    limits = settings["stage_concurrency"]
+    batch_size = max(1, settings["image_batch_size"])
+
+    segments = []
+    tracks = []
+    cues = []
+    offset = 0.0
+    index = 0
+    # ฉากก่อนหน้า: (ฉาก, คีย์ segment, งานที่ต้องเสร็จก่อนสร้างรอยต่อ)
+    previous = None
+    chunks = _iter_chunks(project.iter_scenes(), chunk_size)
+    chunk = next(chunks, None)
+    while chunk:
+        # อ่านกลุ่มถัดไปล่วงหน้า เพื่อรู้ว่าฉากใดเป็นฉากสุดท้าย (ฉากสุดท้ายไม่ถูกตัดท้ายให้รอยต่อ)
+        next_chunk = next(chunks, None)
+        if previous is not None:
+            # งานของกลุ่มก่อนหน้าเสร็จแล้วทั้งหมด
+            previous = previous[:2] + ([],)
+        # ตรวจแคชใน thread หลักก่อนเริ่มรันงาน
+        jobs = plan_images(chunk, settings)
+        graph = TaskGraph()
+
+        # งานสร้างภาพแยกตาม micro-batch
+        image_task = {}
+        for b, start in enumerate(range(0, len(jobs), batch_size)):
+            batch = jobs[start:start + batch_size]
+            name = graph.add(f"images:{index}:{b}", "images",
+                             functools.partial(render_image_jobs, batch, settings))
+            for job in batch:
+                for scene in job["scenes"]:
+                    image_task[id(scene)] = name
+
+        # เอนจินที่สร้างเสียงเป็น batch (เช่น local) สร้างทีละ batch_size ฉากในงานเดียว
+        # งานเสียงของแต่ละฉากรอ batch ของตัวเองแล้วใช้เสียงจากแคช
+        speech_batch = {}
+        pending = {}
+        for scene in chunk:
+            backend = _speech_job(scene, settings)[2]
+            if backend.batch_size > 1:
+                pending.setdefault(backend.name, (backend, []))[1].append(scene)
+        for backend, scenes in pending.values():
+            for start in range(0, len(scenes), backend.batch_size):
+                group = scenes[start:start + backend.batch_size]
+                task = graph.add(f"speech-batch:{index}:{backend.name}:{start}", "speech",
+                                 functools.partial(synthesize_speech_batch, group, settings))
+                for scene in group:
+                    speech_batch[id(scene)] = task
+
+        for scene in chunk:
+            batch = speech_batch.get(id(scene))
+            speech = graph.add(f"speech:{index}", "speech",
+                               functools.partial(synthesize_scene_speech, scene, settings, batched=bool(batch)),
+                               deps=[batch] if batch else [])
+            if write_video:
+                segment_key = scene_segment_key(scene, settings, index)
+                last = next_chunk is None and scene is chunk[-1]
+                image = [image_task[id(scene)]] if id(scene) in image_task else []
+                if settings["transition"] and previous is not None:
+                    scene_a, key_a, deps_a = previous
+                    graph.add(f"transition:{index}", "encode", functools.partial(
+                        get_transition, scene_a, scene, settings, transition_key(key_a, segment_key, settings), index),
+                        deps=deps_a + image)
+                graph.add(f"encode:{index}", "encode", functools.partial(
+                    get_segment, scene, settings, static_segment_key(segment_key, settings, last), index,
+                    trim=bool(settings["transition"]) and not last), deps=[speech] + image)
+                previous = (scene, segment_key, [speech] + image)
+            index += 1
+
+        print(f"กำลังรันงาน {len(graph)} งาน (ฉากที่ {index - len(chunk) + 1}-{index})")
+        results = graph.run(limits)
+        if write_video:
+            for i in range(index - len(chunk), index):
+                if f"transition:{i}" in results:
+                    segments.append(results[f"transition:{i}"])
+                segments.append(results[f"encode:{i}"])
+            for scene in chunk:
+                if settings["audio_mix"]:
+                    tracks.append({"audio_path": scene["audio_path"], "duration": scene["duration"]})
+                if settings["subtitles"]:
+                    cues.extend(scene_cues(scene, offset))
+                offset += scene["duration"]
+        chunk = next_chunk
+
+    if index == 0:
+        raise ValueError("โปรเจกต์ไม่มีฉาก")
+    if write_video:
+        print("กำลังต่อวิดีโอ...")
+        try:
+            _concat_with_audio(segments, tracks, settings)
+            if settings["subtitles"]:
+                write_video_subtitles(cues, settings)
+        except Exception as e:
+            get_journal(settings).record("video", video_key, status="failed", error=str(e))
+            raise
+        get_journal(settings).record("video", video_key, {"output_path": output_path})
+        print(f"สร้างวิดีโอเสร็จสิ้น! ไฟล์อยู่ที่ {output_path}")
+
+
+def run_project(project, chunk_size=50):
+    """
+    สร้างวิดีโอจากโปรเจกต์ โดยอ่านและประมวลผลฉากทีละกลุ่ม
+
+    Args:
+        project: Project ที่อ่านจากไฟล์โปรเจกต์
+        chunk_size: จำนวนฉากที่ประมวลผลพร้อมกันในหน่วยความจำ
+
+    Returns:
+        เส้นทางของไฟล์วิดีโอ
+    """
+    settings = project.settings
+    apply_profile(settings)
+    prepare_directories(settings)
+
+    if settings["transition"] not in (None,) + TRANSITIONS:
+        raise ValueError(f"ไม่รู้จัก transition {settings['transition']} (เลือกได้: {', '.join(TRANSITIONS)})")
+    if settings["subtitles"] not in (None,) + SUBTITLE_MODES:
+        raise ValueError(f"ไม่รู้จักคำบรรยายแบบ {settings['subtitles']} (เลือกได้: {', '.join(SUBTITLE_MODES)})")
+    if settings["music_path"]:
+        if not os.path.exists(settings["music_path"]):
+            raise FileNotFoundError(f"ไม่พบเพลงประกอบ {settings['music_path']}")
+        # เพลงประกอบผสมได้เฉพาะใน track เสียงที่ประกอบแล้ว
+        settings["audio_mix"] = True
+    if settings["audio_mix"] and importlib.util.find_spec("numpy") is None:
+        print("ไม่พบ numpy จะใช้เสียงในแต่ละ segment แทนการประกอบเสียงทั้งเรื่อง")
+        settings["audio_mix"] = False
+    if settings["scheduler"] == "graph" and get_ffmpeg_exe() is None:
+        print("ไม่พบ ffmpeg จะรันทีละขั้นตอนแทน")
+        settings["scheduler"] = "sequential"
+
+    metrics.start(project=project.path, scheduler=settings["scheduler"],
+                  profile=settings["diffusion_profile"])
+    try:
+        if settings["scheduler"] == "graph":
+            run_graph(project, chunk_size)
+        elif settings["scheduler"] == "sequential":
+            run_sequential(project, chunk_size)
+        else:
+            raise ValueError(f"ไม่รู้จัก scheduler {settings['scheduler']} (เลือกได้: graph, sequential)")
+    finally:
+        close_journal(settings)
+        for cache in _caches.values():
+            cache.flush()
+        for index in _duration_indexes.values():
+            index.flush()
+        # รายงานเขียนเสมอ (รวมถึงเมื่อเกิดข้อผิดพลาด) เพื่อดูว่าขั้นตอนใดใช้เวลามากที่สุด
+        metrics.finish(settings["metrics_report"] or _run_path(settings, "report.json"),
+                       settings["metrics_prometheus"], settings["metrics_trace"])
+    return settings["output_path"]
@@ -0,0 +1,212 @@
+import os
+import json
+
+# อ่านไฟล์โปรเจกต์ (YAML หรือ JSON) ที่กำหนดฉาก prompt เสียงพูด โมเดล ความละเอียด fps และไฟล์ผลลัพธ์
+#
+# ฉากกำหนดได้ 2 แบบ:
+#   scenes:       รายการฉากในไฟล์โปรเจกต์เลย (เหมาะกับโปรเจกต์เล็ก)
+#   scenes_file:  ไฟล์ JSONL ที่มีหนึ่งฉากต่อหนึ่งบรรทัด จะถูกอ่านทีละบรรทัดเมื่อใช้งาน
+#                 จึงไม่ต้องเก็บฉากนับพันไว้ในหน่วยความจำพร้อมกัน
+
+# ค่าเริ่มต้นของการตั้งค่าทั้งหมด ค่าใดที่ไม่ได้กำหนดในไฟล์โปรเจกต์จะใช้ค่านี้
+DEFAULT_SETTINGS = {
+    # ไฟล์ผลลัพธ์และวิดีโอ
+    "output_path": "output/final_video.mp4",
+    "fps": 24,
+    "width": 512,
+    "height": 512,
+    "video_engine": "ffmpeg",     # "ffmpeg" (เร็ว) หรือ "moviepy" (วิธีเดิม)
+    "crossfade": 0.0,             # ระยะเวลาเฟดเข้าจากสีดำของแต่ละฉาก (วินาที) เมื่อไม่ได้กำหนด transition
+    "transition": None,           # รอยต่อระหว่างฉาก: "crossfade", "fadeblack", "slide" หรือ None (ดู transitions.py)
+    "transition_duration": 1.0,   # ความยาวของรอยต่อ (วินาที) ใช้ช่วงท้ายของฉากก่อนหน้า
+    # การเคลื่อนกล้องบนภาพนิ่ง: "kenburns" (สลับซูมและแพนตามลำดับฉาก), "zoom_in", "zoom_out",
+    # "pan_left", "pan_right", "pan_up", "pan_down" หรือ None (ภาพนิ่ง) ฉากกำหนดเองได้ด้วย "motion" (ดู motion.py)
+    "motion": None,
+    "motion_zoom": 1.15,          # การซูมสูงสุด
+    "motion_resample": "bilinear",  # "bilinear" (เร็ว) หรือ "bicubic" (คมกว่า)
+    "motion_threads": 4,          # จำนวน thread ที่สร้างเฟรมต่อ segment
+    "video_window": 32,           # จำนวนฉากที่เปิดพร้อมกันตอนประกอบวิดีโอ (None = ทั้งเรื่องในครั้งเดียว)
+    # คำบรรยายจากบทพูด: "soft" (track คำบรรยายในวิดีโอ), "burn" (ซ้อนในภาพ) หรือ None (ไม่ใส่)
+    # ทั้งสองแบบเขียนไฟล์คำบรรยาย (<ชื่อวิดีโอ>.srt หรือ .ass) ไว้ข้างไฟล์วิดีโอด้วย
+    "subtitles": None,
+    "subtitle_format": "srt",     # "srt" หรือ "ass"
+    "subtitle_font": None,        # ไฟล์ฟอนต์ .ttf (None = ฟอนต์ภาษาไทยที่พบในเครื่อง เช่น Garuda หรือ Tahoma)
+    "subtitle_font_size": 28,
+    # เสียงของวิดีโอ: ประกอบเสียงพูดทุกฉากเป็น track เดียวก่อนเข้ารหัส พร้อมปรับความดังให้เท่ากัน (ดู audio_mix.py)
+    "audio_mix": False,           # True = ประกอบเสียงทั้งเรื่องและปรับความดัง (False = เสียงในแต่ละ segment ตามเดิม)
+    "loudness_target": -16.0,     # ความดังของเสียงพูด (LUFS)
+    "music_path": None,           # เพลงประกอบ (วนซ้ำตลอดวิดีโอ) หรือ None
+    "music_volume_db": -18.0,     # ความดังของเพลงเทียบกับเสียงพูด (dB)
+    "ducking_db": 12.0,           # ลดเสียงเพลงลงขณะมีเสียงพูด (dB)
+    # โมเดล Stable Diffusion
+    "model_id": "CompVis/stable-diffusion-v1-4",
+    "local_model_path": "./model_cache/stable-diffusion",
+    "torch_dtype": None,          # เช่น "float16" ตอนดาวน์โหลดโมเดลครั้งแรก
+    "negative_prompt": None,
+    "num_inference_steps": 30,
+    "guidance_scale": 7.5,
+    "seed": 42,
+    "image_batch_size": 2,        # จำนวนฉากต่อการเรียก pipe หนึ่งครั้ง
+    "diffusion_profile": "default",  # "default", "cpu-fast", "lcm" หรือ "distilled" ดู diffusion_profiles.py
+    # เสียงพูด: ชื่อเสียง -> การตั้งค่า (ฉากเลือกด้วย "voice")
+    # engine: "gtts", "local" (โมเดลภาษาไทยในเครื่อง ไม่ต้องใช้อินเทอร์เน็ต)
+    #         หรือ "tone" (เอนจินจำลองแบบออฟไลน์สำหรับทดสอบ) ดู tts.BACKENDS
+    "voices": {"default": {"engine": "gtts", "lang": "th", "slow": False}},
+    "tts_retries": 3,             # จำนวนครั้งที่ลองใหม่เมื่อสร้างเสียงไม่สำเร็จ
+    "tts_backoff": 1.0,           # เวลารอก่อนลองใหม่ครั้งแรก (เพิ่มเป็นสองเท่าทุกครั้ง)
+    # แคช
+    "image_cache_dir": "images/cache",
+    "image_cache_max_bytes": 2 * 1024 ** 3,
+    "speech_cache_dir": "audio/cache",
+    "speech_cache_max_bytes": 512 * 1024 ** 2,
+    # segment วิดีโอของแต่ละฉาก (ควรใหญ่กว่าวิดีโอที่ยาวที่สุด เพื่อไม่ให้ segment ของวิดีโอเดียวกันถูกลบ)
+    "segment_cache_dir": "video/segments",
+    "segment_cache_max_bytes": 8 * 1024 ** 3,
+    "subtitle_cache_dir": "images/subtitles",
+    "subtitle_cache_max_bytes": 256 * 1024 ** 2,
+    # เสียงพูดที่ถอดรหัสและปรับความดังแล้ว (.npy) ใช้ซ้ำเมื่อประกอบวิดีโอใหม่
+    "pcm_cache_dir": "audio/pcm",
+    "pcm_cache_max_bytes": 2 * 1024 ** 3,
+    # การทำงาน
+    "scheduler": "graph",         # "graph" (รันขั้นตอนซ้อนกันต่อฉาก) หรือ "sequential" (ทีละขั้นตอน)
+    "stage_concurrency": {"images": 1, "speech": 4, "encode": 2},
+    # เมื่อรันซ้ำ: ขั้นตอนที่ journal บันทึกว่าเสร็จแล้วด้วยข้อมูลเดียวกันจะถูกข้าม
+    "force_stages": [],           # ขั้นตอนที่ต้องสร้างใหม่ทั้งหมด: "images", "speech", "encode", "video"
+    "reuse_existing": False,      # ใช้ไฟล์วิดีโอที่มีอยู่แล้วแม้ journal ไม่มีบันทึกว่าตรงกับฉากปัจจุบัน
+    "journal_path": None,         # None = .<ชื่อวิดีโอ>.journal.jsonl ข้างไฟล์วิดีโอ
+    "metrics_report": None,       # None = .<ชื่อวิดีโอ>.report.json ข้างไฟล์วิดีโอ (เวลา, CPU, peak RSS ต่อขั้นตอน)
+    "metrics_prometheus": None,   # ไฟล์ Prometheus textfile (ถ้ากำหนด)
+    "metrics_trace": None,        # ไฟล์ Chrome trace (ถ้ากำหนด) เปิดดูใน chrome://tracing
+    "worker_url": None,
+}
+
+SCENE_KEYS = {"prompt", "text", "duration", "seed", "voice", "negative_prompt", "motion"}
+
+
+class ProjectError(ValueError):
+    """
+    ไฟล์โปรเจกต์ไม่ถูกต้อง
+    """
+
+
+def _read_document(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def validate_scene(scene, where):
+    """
+    ตรวจสอบว่าฉากมีข้อมูลที่จำเป็นครบ
+
+    Args:
+        scene: dict ของฉาก
+        where: ตำแหน่งของฉาก ใช้ในข้อความแจ้งข้อผิดพลาด
+    """
+    if not isinstance(scene, dict):
+        raise ProjectError(f"{where}: ฉากต้องเป็น object")
+    missing = {"prompt", "text"} - scene.keys()
+    if missing:
+        raise ProjectError(f"{where}: ไม่มี {', '.join(sorted(missing))}")
+    unknown = scene.keys() - SCENE_KEYS
+    if unknown:
+        raise ProjectError(f"{where}: ไม่รู้จัก {', '.join(sorted(unknown))}")
+    return scene
+
+
+class Project:
+    """
+    โปรเจกต์วิดีโอที่อ่านจากไฟล์
+
+    Args:
+        path: เส้นทางไปยังไฟล์โปรเจกต์ (.yaml, .yml หรือ .json)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        document = _read_document(path)
+        if not isinstance(document, dict):
+            raise ProjectError(f"{path}: ไฟล์โปรเจกต์ต้องเป็น object")
+
+        self._inline_scenes = document.pop("scenes", None)
+        scenes_file = document.pop("scenes_file", None)
+        if (self._inline_scenes is None) == (scenes_file is None):
+            raise ProjectError(f"{path}: ต้องกำหนด scenes หรือ scenes_file อย่างใดอย่างหนึ่ง")
+        # path ของ scenes_file อ้างอิงจากโฟลเดอร์ของไฟล์โปรเจกต์
+        self.scenes_file = (
+            os.path.join(os.path.dirname(os.path.abspath(path)), scenes_file)
+            if scenes_file else None
+        )
+
+        if document.pop("ask_before_regenerate", None) is not None:
+            # การถามผู้ใช้ด้วย input() ถูกแทนด้วย --force / --force-stage / --reuse
+            print(f"{path}: ask_before_regenerate เลิกใช้แล้ว ใช้ --force หรือ --force-stage แทน")
+
+        unknown = document.keys() - DEFAULT_SETTINGS.keys()
+        if unknown:
+            raise ProjectError(f"{path}: ไม่รู้จักการตั้งค่า {', '.join(sorted(unknown))}")
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(document)
+        self.settings["stage_concurrency"] = {
+            **DEFAULT_SETTINGS["stage_concurrency"], **document.get("stage_concurrency", {})
+        }
+        # เสียงที่กำหนดในโปรเจกต์จะเติมค่าเริ่มต้นที่ไม่ได้ระบุ
+        default_voice = DEFAULT_SETTINGS["voices"]["default"]
+        self.settings["voices"] = {
+            name: {**default_voice, **(voice or {})}
+            for name, voice in {**DEFAULT_SETTINGS["voices"], **document.get("voices", {})}.items()
+        }
+
+    def iter_scenes(self):
+        """
+        อ่านฉากทีละฉาก (ถ้าใช้ scenes_file จะอ่านจากไฟล์ทีละบรรทัด)
+
+        Yields:
+            dict ของฉาก (สำเนาใหม่ทุกครั้ง แก้ไขได้โดยไม่กระทบโปรเจกต์)
+        """
+        if self._inline_scenes is not None:
+            for i, scene in enumerate(self._inline_scenes):
+                yield dict(validate_scene(scene, f"{self.path} ฉากที่ {i+1}"))
+            return
+
+        with open(self.scenes_file, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    scene = json.loads(line)
+                except ValueError as e:
+                    raise ProjectError(f"{self.scenes_file} บรรทัดที่ {line_number}: {e}") from e
+                yield validate_scene(scene, f"{self.scenes_file} บรรทัดที่ {line_number}")
+
+
+def voice_for(scene, settings):
+    """
+    คืนการตั้งค่าเสียงของฉาก (engine, lang, slow) ตาม "voice" ของฉาก
+
+    Args:
+        scene: dict ของฉาก
+        settings: การตั้งค่าของโปรเจกต์
+    """
+    name = scene.get("voice", "default")
+    if name not in settings["voices"]:
+        raise ProjectError(f"ไม่รู้จักเสียง {name}")
+    return settings["voices"][name]
+
+
+def load_project(path):
+    """
+    อ่านไฟล์โปรเจกต์
+
+    Args:
+        path: เส้นทางไปยังไฟล์โปรเจกต์
+
+    Returns:
+        Project
+    """
+    if not os.path.exists(path):
+        raise ProjectError(f"ไม่พบไฟล์โปรเจกต์: {path}")
+    return Project(path)
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ตัวจัดลำดับงานแบบกราฟ (task graph) สำหรับรันขั้นตอนต่าง ๆ ของแต่ละฉากซ้อนกัน
+# งานแต่ละชิ้นอยู่ใน stage หนึ่ง (เช่น images, speech, encode) และจะเริ่มได้เมื่องานที่ขึ้นต่อกันเสร็จแล้ว
+# แต่ละ stage มี thread pool ของตัวเอง จำนวนงานที่รันพร้อมกันจึงกำหนดแยกกันได้
+
+
+class TaskError(RuntimeError):
+    """
+    งานในกราฟทำงานไม่สำเร็จ (สาเหตุจริงอยู่ใน __cause__)
+    """
+
+
+class TaskGraph:
+    """
+    กราฟของงานที่ขึ้นต่อกัน
+
+    ตัวอย่าง:
+        graph = TaskGraph()
+        graph.add("image:1", "images", make_image)
+        graph.add("speech:1", "speech", make_speech)
+        graph.add("encode:1", "encode", encode, deps=["image:1", "speech:1"])
+        results = graph.run({"images": 1, "speech": 4, "encode": 2})
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def add(self, name, stage, fn, deps=()):
+        """
+        เพิ่มงานเข้ากราฟ
+
+        Args:
+            name: ชื่องาน (ต้องไม่ซ้ำ)
+            stage: ชื่อ stage ที่ใช้กำหนดจำนวนงานพร้อมกัน
+            fn: ฟังก์ชันที่ไม่มีอาร์กิวเมนต์ ผลลัพธ์ที่คืนจะเก็บไว้ใน results[name]
+            deps: ชื่องานที่ต้องเสร็จก่อน
+        """
+        if name in self._tasks:
+            raise ValueError(f"มีงานชื่อ {name} อยู่แล้ว")
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"งาน {name} ขึ้นกับงาน {dep} ที่ยังไม่ได้เพิ่ม")
+        self._tasks[name] = {"stage": stage, "fn": fn, "deps": set(deps)}
+        return name
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def run(self, limits=None, default_limit=1):
+        """
+        รันงานทั้งหมดตามลำดับการขึ้นต่อกัน
+
+        Args:
+            limits: dict ของ stage -> จำนวนงานที่รันพร้อมกันได้
+            default_limit: จำนวนงานพร้อมกันของ stage ที่ไม่ได้กำหนด
+
+        Returns:
+            dict ของชื่องาน -> ผลลัพธ์
+        """
+        limits = limits or {}
+        stages = {task["stage"] for task in self._tasks.values()}
+        executors = {
+            stage: ThreadPoolExecutor(max_workers=max(1, int(limits.get(stage, default_limit))),
+                                      thread_name_prefix=f"stage-{stage}")
+            for stage in stages
+        }
+        waiting = {name: set(task["deps"]) for name, task in self._tasks.items()}
+        dependents = {name: [] for name in self._tasks}
+        for name, task in self._tasks.items():
+            for dep in task["deps"]:
+                dependents[dep].append(name)
+
+        results = {}
+        running = {}
+
+        def submit_ready():
+            for name in [name for name, deps in waiting.items() if not deps]:
+                del waiting[name]
+                task = self._tasks[name]
+                running[executors[task["stage"]].submit(task["fn"])] = name
+
+        try:
+            submit_ready()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        raise TaskError(f"งาน {name} ล้มเหลว: {error}") from error
+                    results[name] = future.result()
+                    for dependent in dependents[name]:
+                        waiting[dependent].discard(name)
+                submit_ready()
+        finally:
+            for future in running:
+                future.cancel()
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return results
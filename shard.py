@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import argparse
+import threading
+
+import metrics
+from diffusion_profiles import apply_profile
+from pipeline import (close_journal, generate_images, generate_speech, get_ffmpeg_exe, get_segment,
+                      prepare_directories, run_project, scene_segment_key, static_segment_key)
+from project import load_project
+from shard_queue import DirectoryQueue, worker_name
+
+# แบ่งฉากของโปรเจกต์ยาว ๆ ให้หลาย process หรือหลายเครื่องช่วยกันสร้าง ผ่านคิวบนโฟลเดอร์ที่ใช้ร่วมกัน
+#
+#   python shard.py init  --project projects/long.yaml --queue /shared/queue --shard-size 20
+#   python shard.py work  --queue /shared/queue --workers 4      (รันได้หลายเครื่องพร้อมกัน)
+#   python shard.py status --queue /shared/queue
+#   python shard.py merge --queue /shared/queue --wait
+#
+# worker สร้างภาพ เสียงพูด และ segment วิดีโอของแต่ละฉากลงแคช (images_cache_dir, speech_cache_dir,
+# segment_cache_dir) ซึ่งต้องอยู่บนโฟลเดอร์ที่ทุกเครื่องเห็นเป็นเส้นทางเดียวกัน
+# ขั้นตอน merge รันโปรเจกต์ตามปกติ ทุกฉากจึงมาจากแคช และเหลือเพียงการต่อวิดีโอ
+# แคชเป็นแบบ content-addressed ฉากที่ถูกทำซ้ำ (เช่นหลัง lease หมดอายุ) จึงได้ไฟล์เดียวกัน
+
+QUEUE_INFO = "queue.json"
+
+
+def _read_info(queue_dir):
+    path = os.path.join(queue_dir, QUEUE_INFO)
+    if not os.path.exists(path):
+        raise ValueError(f"{queue_dir} ไม่ใช่คิวงาน (ใช้ python shard.py init ก่อน)")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def init_queue(project_path, queue_dir, shard_size=20, reset=False):
+    """
+    สร้างคิวงานจากฉากของโปรเจกต์ งานละ shard_size ฉาก
+
+    Returns:
+        จำนวนงานที่สร้าง
+    """
+    project = load_project(project_path)
+    queue = DirectoryQueue(queue_dir)
+    if any(queue.status().values()):
+        if not reset:
+            raise ValueError(f"คิว {queue_dir} มีงานอยู่แล้ว (ใช้ --reset เพื่อเริ่มใหม่)")
+        for state in queue.STATES:
+            for name in os.listdir(os.path.join(queue_dir, state)):
+                os.remove(os.path.join(queue_dir, state, name))
+
+    count = sum(1 for _ in project.iter_scenes())
+    shard_size = max(1, shard_size)
+    for start in range(0, count, shard_size):
+        queue.submit(f"{start:06d}", range(start, min(start + shard_size, count)))
+    with open(os.path.join(queue_dir, QUEUE_INFO), "w", encoding="utf-8") as f:
+        json.dump({"project": os.path.abspath(project_path), "scenes": count, "shard_size": shard_size,
+                   "created": time.time()}, f, ensure_ascii=False, indent=2)
+    tasks = (count + shard_size - 1) // shard_size
+    print(f"สร้างคิว {tasks} งานจาก {count} ฉาก ที่ {queue_dir}")
+    return tasks
+
+
+def _load_scenes(project, indexes):
+    # อ่านเฉพาะฉากของงาน (โปรเจกต์ที่ใช้ scenes_file จะไม่ถูกอ่านทั้งหมดเข้าหน่วยความจำ)
+    wanted = set(indexes)
+    return {i: scene for i, scene in enumerate(project.iter_scenes()) if i in wanted}
+
+
+def _keep_alive(queue, task, state, stop):
+    # ต่ออายุ lease ระหว่างที่สร้างภาพกลุ่มที่ใช้เวลานาน
+    while not stop.wait(queue.lease_seconds / 3):
+        with state["lock"]:
+            done, current = list(state["done"]), list(state["current"])
+        if queue.heartbeat(task, done, current) is None:
+            print(f"เสีย lease ของงาน {task['id']} ไปแล้ว (worker อื่นจะทำฉากที่เหลือ)")
+            return
+
+
+def run_task(queue, task, project, group_size=4, encode=True, scene_count=None):
+    """
+    สร้างภาพ เสียง และ segment ของฉากในงานทีละกลุ่ม ต่ออายุ lease หลังแต่ละกลุ่ม
+    (รอยต่อระหว่างฉากต้องใช้ภาพของฉากข้างเคียงซึ่งอาจอยู่ในงานอื่น จึงสร้างตอน merge)
+
+    Returns:
+        รายการลำดับฉากที่เสร็จแล้ว
+    """
+    settings = project.settings
+    scenes = _load_scenes(project, task["scenes"])
+    state = {"lock": threading.Lock(), "done": [], "current": []}
+    stop = threading.Event()
+    keeper = threading.Thread(target=_keep_alive, args=(queue, task, state, stop), daemon=True)
+    keeper.start()
+    try:
+        remaining = list(task["scenes"])
+        while remaining:
+            group = remaining[:group_size]
+            with state["lock"]:
+                state["current"] = group
+            # ประกาศฉากที่กำลังทำก่อน เพื่อไม่ให้ worker อื่นแบ่งฉากเหล่านี้ไป
+            owned = queue.heartbeat(task, state["done"], group)
+            if owned is None:
+                break
+            # ฉากที่ worker อื่นแบ่งไปแล้วระหว่าง heartbeat ครั้งก่อนกับครั้งนี้ไม่ต้องทำซ้ำ
+            group = [i for i in group if i in owned]
+            with state["lock"]:
+                state["current"] = group
+            if not group:
+                remaining = [i for i in owned if i not in state["done"]]
+                continue
+            chunk = [scenes[i] for i in group]
+            # คีย์ของ segment ต้องคำนวณก่อนที่ความยาวของฉากจะถูกแทนด้วยความยาวของเสียง
+            keys = [scene_segment_key(scene, settings, i) for scene, i in zip(chunk, group)]
+            generate_images(chunk, settings)
+            generate_speech(chunk, settings)
+            if encode:
+                for scene, key, i in zip(chunk, keys, group):
+                    last = scene_count is not None and i == scene_count - 1
+                    get_segment(scene, settings, static_segment_key(key, settings, last), i,
+                                trim=bool(settings["transition"]) and not last)
+            with state["lock"]:
+                state["done"].extend(group)
+                state["current"] = []
+            remaining = queue.heartbeat(task, state["done"])
+            if remaining is None:
+                break
+    finally:
+        stop.set()
+        keeper.join()
+    return state["done"]
+
+
+def work(queue_dir, project_path=None, lease_seconds=300, group_size=4, poll=10.0, threads=None):
+    """
+    รับงานจากคิวจนกว่าคิวจะว่าง
+
+    Args:
+        queue_dir: โฟลเดอร์ของคิว
+        project_path: ไฟล์โปรเจกต์ (ค่าเริ่มต้นจาก queue.json)
+        lease_seconds: อายุของ lease (ควรนานกว่าเวลาสร้างภาพหนึ่งกลุ่มหลายเท่า)
+        group_size: จำนวนฉากที่ทำก่อนต่ออายุ lease และรายงานความคืบหน้าแต่ละครั้ง
+        poll: เวลารอ (วินาที) เมื่อไม่มีงานแต่ worker อื่นยังทำไม่เสร็จ
+        threads: จำนวน thread ของ torch ต่อ process (เมื่อรันหลาย process บนเครื่องเดียว)
+
+    Returns:
+        จำนวนฉากที่ worker นี้ทำเสร็จ
+    """
+    if threads:
+        # ต้องกำหนดก่อน import torch (pipeline import torch เมื่อโหลดโมเดลครั้งแรก)
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        os.environ["MKL_NUM_THREADS"] = str(threads)
+
+    info = _read_info(queue_dir)
+    project = load_project(project_path or info["project"])
+    settings = project.settings
+    name = worker_name()
+    # journal และรายงานแยกต่อ worker (ไฟล์เดียวกันเขียนพร้อมกันหลาย process ไม่ได้)
+    settings["journal_path"] = os.path.join(queue_dir, "journals", f"{name}.jsonl")
+    apply_profile(settings)
+    prepare_directories(settings)
+    encode = settings["video_engine"] == "ffmpeg" and get_ffmpeg_exe() is not None
+    queue = DirectoryQueue(queue_dir, lease_seconds=lease_seconds)
+
+    metrics.start(worker=name, queue=os.path.abspath(queue_dir))
+    total = 0
+    try:
+        while True:
+            task = queue.claim(name)
+            if task is None:
+                if queue.finished():
+                    break
+                time.sleep(poll)
+                continue
+            print(f"[{name}] เริ่มงาน {task['id']} ({len(task['scenes'])} ฉาก)")
+            done = []
+            try:
+                done = run_task(queue, task, project, group_size, encode, info["scenes"])
+            except Exception as e:
+                print(f"[{name}] งาน {task['id']} ล้มเหลว: {e}")
+                queue.fail(task, done, str(e))
+                continue
+            if queue.complete(task, done):
+                print(f"[{name}] งาน {task['id']} เสร็จ ({len(done)} ฉาก)")
+            total += len(done)
+    finally:
+        close_journal(settings)
+        metrics.finish(os.path.join(queue_dir, "reports", f"{name}.json"), show=False)
+    print(f"[{name}] ไม่มีงานเหลือ ทำเสร็จ {total} ฉาก")
+    return total
+
+
+def work_local(queue_dir, workers, project_path=None, lease_seconds=300, group_size=4):
+    """
+    รัน worker หลาย process บนเครื่องนี้ โดยแบ่ง core ให้แต่ละ process เท่า ๆ กัน
+    """
+    import multiprocessing
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=work, args=(queue_dir, project_path, lease_seconds, group_size),
+                        kwargs={"threads": threads})
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def print_status(queue_dir):
+    info = _read_info(queue_dir)
+    queue = DirectoryQueue(queue_dir)
+    status = queue.status()
+    print(f"โปรเจกต์ {info['project']}: {info['scenes']} ฉาก งานละ {info['shard_size']} ฉาก")
+    print(", ".join(f"{state} {count}" for state, count in status.items()))
+    for lease in queue.leases():
+        left = lease["expires"] - time.time()
+        print(f"  {lease['id']}: {lease['worker']} เสร็จ {len(lease.get('done', []))}/{len(lease['scenes'])} ฉาก "
+              f"(lease เหลือ {left:.0f} วินาที)")
+    return status
+
+
+def merge(queue_dir, project_path=None, wait=False, poll=10.0):
+    """
+    ต่อวิดีโอเมื่อทุกงานในคิวเสร็จแล้ว (ภาพ เสียง และ segment มาจากแคชที่ worker สร้างไว้)
+
+    Returns:
+        เส้นทางของไฟล์วิดีโอ
+    """
+    info = _read_info(queue_dir)
+    queue = DirectoryQueue(queue_dir)
+    while not queue.finished():
+        if not wait:
+            raise ValueError(f"คิวยังทำไม่เสร็จ ({queue.status()}) ใช้ --wait เพื่อรอ")
+        queue.requeue_expired()
+        time.sleep(poll)
+    failed = queue.status()["failed"]
+    if failed:
+        raise ValueError(f"มี {failed} งานที่ล้มเหลว ดูรายละเอียดใน {os.path.join(queue_dir, 'failed')}")
+    return run_project(load_project(project_path or info["project"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='แบ่งฉากของโปรเจกต์ให้หลาย process หรือหลายเครื่องผ่านคิวบนโฟลเดอร์ร่วม')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    init_parser = commands.add_parser('init', help='สร้างคิวงานจากไฟล์โปรเจกต์')
+    init_parser.add_argument('--project', type=str, required=True, help='ไฟล์โปรเจกต์')
+    init_parser.add_argument('--shard-size', type=int, default=20, help='จำนวนฉากต่องาน')
+    init_parser.add_argument('--reset', action='store_true', help='ลบงานเดิมในคิวแล้วสร้างใหม่')
+
+    work_parser = commands.add_parser('work', help='รับงานจากคิวจนกว่าคิวจะว่าง')
+    work_parser.add_argument('--workers', type=int, default=1, help='จำนวน process บนเครื่องนี้')
+    work_parser.add_argument('--lease', type=float, default=300, help='อายุของ lease (วินาที)')
+    work_parser.add_argument('--group-size', type=int, default=4, help='จำนวนฉากต่อการต่ออายุ lease')
+
+    status_parser = commands.add_parser('status', help='แสดงสถานะของคิว')
+
+    merge_parser = commands.add_parser('merge', help='ต่อวิดีโอเมื่อทุกงานเสร็จแล้ว')
+    merge_parser.add_argument('--wait', action='store_true', help='รอจนกว่าทุกงานจะเสร็จ')
+
+    for sub in (init_parser, work_parser, status_parser, merge_parser):
+        sub.add_argument('--queue', type=str, required=True, help='โฟลเดอร์ของคิวที่ทุกเครื่องเข้าถึงได้')
+    for sub in (work_parser, merge_parser):
+        sub.add_argument('--project', type=str, help='ไฟล์โปรเจกต์ (ค่าเริ่มต้นจาก queue.json)')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'init':
+            init_queue(args.project, args.queue, args.shard_size, args.reset)
+        elif args.command == 'work':
+            if args.workers > 1:
+                work_local(args.queue, args.workers, args.project, args.lease, args.group_size)
+            else:
+                work(args.queue, args.project, args.lease, args.group_size)
+        elif args.command == 'status':
+            print_status(args.queue)
+        else:
+            output_path = merge(args.queue, args.project, wait=args.wait)
+            print(f"เสร็จสิ้นการสร้างวิดีโอ! ไฟล์อยู่ที่ {output_path}")
+    except KeyboardInterrupt:
+        print("\nหยุดการทำงาน (lease ของงานที่ค้างอยู่จะหมดอายุและกลับเข้าคิว)")
+    except Exception as e:
+        print(f"เกิดข้อผิดพลาด: {e}")
+
+
+if __name__ == "__main__":
+    main()
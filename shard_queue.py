@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import socket
+
+# คิวงานบนโฟลเดอร์ที่ใช้ร่วมกัน (เช่น NFS หรือ SMB) สำหรับแบ่งฉากของโปรเจกต์ให้หลาย process หรือหลายเครื่อง
+# ไม่ต้องมี server: สถานะของงานคือโฟลเดอร์ที่ไฟล์ของงานอยู่ และการย้ายไฟล์ (rename) เป็น atomic
+#
+#   pending/<id>.json  งานที่รอ worker
+#   leased/<id>.json   งานที่ worker รับไปแล้ว มีเวลาหมดอายุ (lease) ที่ต่ออายุเป็นระยะ
+#   done/<id>.json     งานที่เสร็จแล้ว
+#   failed/<id>.json   งานที่ล้มเหลวครบจำนวนครั้งที่กำหนด
+#
+# ถ้า worker หยุดทำงาน lease จะหมดอายุและงานที่เหลือกลับไปที่ pending
+# worker ที่ว่างและไม่มีงานใน pending จะแบ่งฉากที่เหลือครึ่งหลังของงานที่ใหญ่ที่สุดมาทำ (work stealing)
+# เวลาหมดอายุใช้นาฬิกาของแต่ละเครื่อง เครื่องที่ใช้คิวร่วมกันจึงควรตั้งเวลาให้ตรงกัน (NTP)
+
+
+def worker_name():
+    """
+    ชื่อของ worker ที่ไม่ซ้ำกันระหว่างเครื่องและ process
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    temp_path = f"{path}.{worker_name()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+class FileLock:
+    """
+    lock ระหว่าง process และเครื่องด้วยไฟล์ที่สร้างแบบ O_EXCL
+
+    Args:
+        path: ไฟล์ lock
+        timeout: เวลารอสูงสุด (วินาที)
+        stale: lock ที่เก่ากว่านี้ (วินาที) ถือว่าเจ้าของหยุดทำงานไปแล้ว
+    """
+
+    def __init__(self, path, timeout=30.0, stale=60.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale = stale
+
+    def acquire(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale:
+                        # ย้ายไปชื่อที่ไม่ซ้ำก่อนลบ เพื่อไม่ให้ลบ lock ใหม่ของ process อื่น
+                        stale_path = f"{self.path}.{worker_name()}.stale"
+                        os.replace(self.path, stale_path)
+                        os.remove(stale_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"รอ lock {self.path} นานเกิน {self.timeout} วินาที")
+                time.sleep(0.05)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(worker_name())
+            return self
+
+    def release(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class DirectoryQueue:
+    """
+    คิวของงาน (กลุ่มของลำดับฉาก) บนโฟลเดอร์ที่ใช้ร่วมกัน
+
+    Args:
+        root: โฟลเดอร์ของคิว
+        lease_seconds: อายุของ lease ถ้า worker ไม่ต่ออายุภายในเวลานี้ งานจะถูกคืนเข้าคิว
+        max_attempts: จำนวนครั้งที่งานล้มเหลวได้ก่อนย้ายไป failed
+    """
+
+    STATES = ("pending", "leased", "done", "failed")
+
+    def __init__(self, root, lease_seconds=300, max_attempts=3):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in self.STATES + ("locks",):
+            os.makedirs(os.path.join(root, state), exist_ok=True)
+
+    def _path(self, state, task_id):
+        return os.path.join(self.root, state, f"{task_id}.json")
+
+    def _lock(self, task_id):
+        return FileLock(os.path.join(self.root, "locks", f"{task_id}.lock"))
+
+    def _ids(self, state):
+        return sorted(name[:-5] for name in os.listdir(os.path.join(self.root, state))
+                      if name.endswith(".json"))
+
+    def submit(self, task_id, scenes):
+        """
+        เพิ่มงานเข้าคิว
+
+        Args:
+            task_id: ชื่อของงาน (ใช้เรียงลำดับ)
+            scenes: รายการลำดับฉากของงาน
+        """
+        _write_json(self._path("pending", task_id), {"id": task_id, "scenes": list(scenes), "attempts": 0})
+
+    def claim(self, worker):
+        """
+        รับงานถัดไป (คืน lease ที่หมดอายุก่อน และแบ่งงานของ worker อื่นถ้าไม่มีงานรอ)
+
+        Returns:
+            dict ของงาน หรือ None ถ้าไม่มีงานให้ทำ
+        """
+        self.requeue_expired()
+        for task_id in self._ids("pending"):
+            task = self._take(task_id, worker)
+            if task is not None:
+                return task
+        stolen = self.steal(worker)
+        return self._take(stolen, worker) if stolen else None
+
+    def _take(self, task_id, worker):
+        # rename เป็น atomic จึงมี worker เดียวที่ย้ายงานจาก pending ได้สำเร็จ
+        with self._lock(task_id):
+            try:
+                os.rename(self._path("pending", task_id), self._path("leased", task_id))
+            except FileNotFoundError:
+                return None
+            task = _read_json(self._path("leased", task_id))
+            task.update(worker=worker, expires=time.time() + self.lease_seconds, done=[])
+            _write_json(self._path("leased", task_id), task)
+        return task
+
+    def heartbeat(self, task, done, current=()):
+        """
+        ต่ออายุ lease และบันทึกฉากที่เสร็จแล้ว
+
+        Args:
+            task: งานที่ได้จาก claim
+            done: รายการลำดับฉากที่เสร็จแล้ว
+            current: ฉากที่กำลังทำอยู่ (worker อื่นจะไม่แบ่งฉากเหล่านี้ไป)
+
+        Returns:
+            รายการฉากที่ยังต้องทำ (อาจน้อยลงถ้าถูกแบ่งไป) หรือ None ถ้าเสีย lease ไปแล้ว
+        """
+        with self._lock(task["id"]):
+            try:
+                lease = _read_json(self._path("leased", task["id"]))
+            except FileNotFoundError:
+                return None
+            if lease.get("worker") != task["worker"]:
+                return None
+            lease.update(expires=time.time() + self.lease_seconds, done=list(done), current=list(current))
+            _write_json(self._path("leased", task["id"]), lease)
+        finished = set(done)
+        return [index for index in lease["scenes"] if index not in finished]
+
+    def complete(self, task, done):
+        """
+        ย้ายงานไป done (ถ้ายังถือ lease อยู่)
+        """
+        with self._lock(task["id"]):
+            try:
+                lease = _read_json(self._path("leased", task["id"]))
+            except FileNotFoundError:
+                return False
+            if lease.get("worker") != task["worker"]:
+                return False
+            lease.update(done=list(done), finished=time.time())
+            _write_json(self._path("done", task["id"]), lease)
+            os.remove(self._path("leased", task["id"]))
+        return True
+
+    def fail(self, task, done, error):
+        """
+        คืนฉากที่เหลือของงานเข้าคิว หรือย้ายไป failed เมื่อครบ max_attempts
+        """
+        with self._lock(task["id"]):
+            try:
+                lease = _read_json(self._path("leased", task["id"]))
+            except FileNotFoundError:
+                return
+            if lease.get("worker") != task["worker"]:
+                return
+            finished = set(done)
+            remaining = [index for index in lease["scenes"] if index not in finished]
+            attempts = lease.get("attempts", 0) + 1
+            state = "failed" if attempts >= self.max_attempts else "pending"
+            _write_json(self._path(state, task["id"]), {
+                "id": task["id"], "scenes": remaining, "attempts": attempts, "error": error,
+            })
+            os.remove(self._path("leased", task["id"]))
+
+    def requeue_expired(self):
+        """
+        คืนงานที่ lease หมดอายุ (worker หยุดทำงานหรือขาดการติดต่อ) เข้าคิว เฉพาะฉากที่ยังไม่เสร็จ
+        """
+        now = time.time()
+        for task_id in self._ids("leased"):
+            with self._lock(task_id):
+                try:
+                    lease = _read_json(self._path("leased", task_id))
+                except (FileNotFoundError, ValueError):
+                    continue
+                if lease.get("expires", 0) > now:
+                    continue
+                finished = set(lease.get("done", []))
+                remaining = [index for index in lease["scenes"] if index not in finished]
+                print(f"lease ของงาน {task_id} ({lease.get('worker')}) หมดอายุ คืน {len(remaining)} ฉากเข้าคิว")
+                _write_json(self._path("pending", task_id), {
+                    "id": task_id, "scenes": remaining, "attempts": lease.get("attempts", 0),
+                })
+                os.remove(self._path("leased", task_id))
+
+    def steal(self, worker, min_scenes=2):
+        """
+        แบ่งฉากที่เหลือครึ่งหลังของงานที่เหลือมากที่สุดเป็นงานใหม่ใน pending
+
+        Returns:
+            ชื่อของงานใหม่ หรือ None ถ้าไม่มีงานที่แบ่งได้
+        """
+        candidates = []
+        for task_id in self._ids("leased"):
+            try:
+                lease = _read_json(self._path("leased", task_id))
+            except (FileNotFoundError, ValueError):
+                continue
+            if lease.get("worker") == worker:
+                continue
+            busy = set(lease.get("done", [])) | set(lease.get("current", []))
+            remaining = [index for index in lease["scenes"] if index not in busy]
+            candidates.append((len(remaining), task_id))
+        for count, task_id in sorted(candidates, reverse=True):
+            if count < min_scenes:
+                break
+            with self._lock(task_id):
+                try:
+                    lease = _read_json(self._path("leased", task_id))
+                except FileNotFoundError:
+                    continue
+                busy = set(lease.get("done", [])) | set(lease.get("current", []))
+                remaining = [index for index in lease["scenes"] if index not in busy]
+                if len(remaining) < min_scenes:
+                    continue
+                # เจ้าของงานจะเห็นรายการฉากที่ลดลงในการต่ออายุครั้งถัดไป
+                stolen = remaining[len(remaining) // 2:]
+                stolen_set = set(stolen)
+                lease["scenes"] = [index for index in lease["scenes"] if index not in stolen_set]
+                _write_json(self._path("leased", task_id), lease)
+                new_id = f"{task_id}-{stolen[0]:06d}"
+                self.submit(new_id, stolen)
+            print(f"แบ่งงาน {len(stolen)} ฉากจาก {task_id} ({lease.get('worker')}) มาเป็น {new_id}")
+            return new_id
+        return None
+
+    def leases(self):
+        """
+        คืนรายการ lease ของงานที่กำลังทำอยู่
+        """
+        leases = []
+        for task_id in self._ids("leased"):
+            try:
+                leases.append(_read_json(self._path("leased", task_id)))
+            except (FileNotFoundError, ValueError):
+                continue
+        return leases
+
+    def status(self):
+        """
+        คืนจำนวนงานในแต่ละสถานะ
+        """
+        return {state: len(self._ids(state)) for state in self.STATES}
+
+    def finished(self):
+        """
+        ตรวจสอบว่าไม่มีงานที่รอหรือกำลังทำอยู่แล้ว
+        """
+        status = self.status()
+        return status["pending"] == 0 and status["leased"] == 0
@@ -0,0 +1,264 @@
+import os
+import threading
+import subprocess
+import unicodedata
+
+from video_assembly import get_ffmpeg_exe
+
+# คำบรรยาย (subtitle) จากบทพูดของแต่ละฉาก (scene["text"])
+#
+# - แยกบทพูดเป็นบรรทัด และแบ่งเวลาของเสียงพูดที่วัดได้ให้แต่ละบรรทัดตามจำนวนตัวอักษรที่ออกเสียง
+# - "soft": เขียนไฟล์ SRT/ASS แล้วใส่เป็น track คำบรรยายในไฟล์วิดีโอแบบ stream copy (ไม่เข้ารหัสภาพใหม่)
+# - "burn": วาดแต่ละบรรทัดเป็นภาพ PNG โปร่งใสเพียงครั้งเดียว (เก็บในแคช) แล้วให้ ffmpeg ซ้อนภาพนั้น
+#   ในช่วงเวลาของบรรทัด แทนการสร้าง TextClip และประกอบใหม่ทุกเฟรมใน Python
+
+SUBTITLE_MODES = ("soft", "burn")
+SUBTITLE_FORMATS = ("srt", "ass")
+
+# ฟอนต์ที่มีตัวอักษรไทย (ใช้ตัวแรกที่พบ ถ้าไม่ได้กำหนด subtitle_font)
+THAI_FONTS = (
+    "/usr/share/fonts/truetype/tlwg/Garuda.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansThai-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansThai-Regular.ttf",
+    "C:/Windows/Fonts/tahoma.ttf",
+    "/System/Library/Fonts/Supplemental/Tahoma.ttf",
+    "/Library/Fonts/Tahoma.ttf",
+)
+
+# สระหน้า (ต้องอยู่บรรทัดเดียวกับพยัญชนะที่ตามมา) และสระหลังที่ไม่ใช่ Mn (ต้องอยู่กับพยัญชนะข้างหน้า)
+_LEADING_VOWELS = "เแโใไ"
+_FOLLOWING_VOWELS = "ะาำๅๆ"
+
+_fonts = {}
+_render_lock = threading.Lock()
+
+
+def split_lines(text):
+    """
+    แยกบทพูดเป็นบรรทัด (ตัดช่องว่างหัวท้ายและบรรทัดว่างออก)
+    """
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
+
+
+def _spoken_length(line):
+    # นับเฉพาะตัวอักษรที่ออกเสียง: ไม่นับช่องว่างและสระ/วรรณยุกต์ที่อยู่บนหรือล่างตัวอักษร (Mn)
+    return sum(1 for char in line if not char.isspace() and unicodedata.category(char) != "Mn")
+
+
+def time_lines(text, duration, start=0.0):
+    """
+    แบ่งเวลาของเสียงพูดให้แต่ละบรรทัดของบทพูดตามสัดส่วนของจำนวนตัวอักษร
+
+    Args:
+        text: บทพูดของฉาก (หลายบรรทัดได้)
+        duration: ความยาวของเสียงพูดที่วัดได้ (วินาที)
+        start: เวลาเริ่มของฉากในวิดีโอ
+
+    Returns:
+        รายการ (เวลาเริ่ม, เวลาจบ, ข้อความ)
+    """
+    lines = split_lines(text)
+    if not lines or duration <= 0:
+        return []
+    weights = [max(1, _spoken_length(line)) for line in lines]
+    total = sum(weights)
+    cues = []
+    elapsed = 0
+    for line, weight in zip(lines, weights):
+        cue_start = start + duration * elapsed / total
+        elapsed += weight
+        cues.append((cue_start, start + duration * elapsed / total, line))
+    return cues
+
+
+def scene_cues(scene, start=0.0):
+    """
+    คำบรรยายของฉาก (ใช้ความยาวของเสียงพูด ถ้ายังไม่รู้จะใช้ความยาวของฉาก)
+    """
+    duration = scene.get("speech_duration") or scene.get("duration") or 0.0
+    return time_lines(scene.get("text"), duration, start)
+
+
+def _srt_time(seconds):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def _ass_time(seconds):
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    seconds, centiseconds = divmod(centiseconds, 100)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+
+
+def _ass_text(line):
+    # { } เปิดและปิด override tag และ \ นำหน้า escape (\N, \h) ในข้อความของ ASS
+    # ASS ไม่มี escape ของ \ จึงคั่นด้วย word joiner (U+2060 ไม่แสดงผล) เพื่อไม่ให้ตัวถัดไปถูกตีความ
+    # ส่วน { } ใช้ \{ \} ซึ่ง libass แสดงเป็นวงเล็บปีกกา
+    return line.replace("\\", "\\\u2060").replace("{", "\\{").replace("}", "\\}")
+
+
+def write_srt(cues, path):
+    """
+    เขียนคำบรรยายเป็นไฟล์ SRT
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for i, (start, end, line) in enumerate(cues, 1):
+            f.write(f"{i}\n{_srt_time(start)} --> {_srt_time(end)}\n{line}\n\n")
+
+
+def write_ass(cues, path, width=512, height=512, font_name="Tahoma", font_size=28):
+    """
+    เขียนคำบรรยายเป็นไฟล์ ASS (กำหนดฟอนต์ ขนาด และกรอบสีดำใต้ตัวอักษรได้)
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[Script Info]\nScriptType: v4.00+\n")
+        f.write(f"PlayResX: {width}\nPlayResY: {height}\nWrapStyle: 0\n\n")
+        f.write("[V4+ Styles]\n")
+        f.write("Format: Name, Fontname, Fontsize, PrimaryColour, OutlineColour, BackColour, Bold, "
+                "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n")
+        f.write(f"Style: Default,{font_name},{font_size},&H00FFFFFF,&H00000000,&H80000000,0,"
+                f"3,2,0,2,16,16,{max(8, height // 20)},222\n\n")
+        f.write("[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+        for start, end, line in cues:
+            f.write(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,{_ass_text(line)}\n")
+
+
+def write_subtitles(cues, path, subtitle_format="srt", width=512, height=512, font_path=None, font_size=28):
+    """
+    เขียนไฟล์คำบรรยายตามรูปแบบที่เลือก ("srt" หรือ "ass")
+    """
+    if subtitle_format == "srt":
+        write_srt(cues, path)
+    elif subtitle_format == "ass":
+        font_name = os.path.splitext(os.path.basename(font_path))[0] if font_path else "Tahoma"
+        write_ass(cues, path, width, height, font_name, font_size)
+    else:
+        raise ValueError(f"ไม่รู้จักรูปแบบคำบรรยาย {subtitle_format} (เลือกได้: {', '.join(SUBTITLE_FORMATS)})")
+    return path
+
+
+def mux_subtitles(video_path, subtitle_path, language="tha"):
+    """
+    ใส่ไฟล์คำบรรยายเป็น track ในไฟล์วิดีโอ (stream copy ภาพและเสียง ไม่เข้ารหัสใหม่)
+
+    Args:
+        video_path: ไฟล์วิดีโอ (เขียนทับเมื่อเสร็จ)
+        subtitle_path: ไฟล์ SRT หรือ ASS
+        language: รหัสภาษาของ track คำบรรยาย
+    """
+    ffmpeg = get_ffmpeg_exe()
+    if ffmpeg is None:
+        raise RuntimeError("ไม่พบ ffmpeg")
+    root, extension = os.path.splitext(video_path)
+    # MP4/MOV รองรับเฉพาะ mov_text ส่วน MKV เก็บ SRT/ASS ได้ตามเดิม
+    codec = "mov_text" if extension.lower() in (".mp4", ".m4v", ".mov") else "copy"
+    partial_path = f"{root}.partial{extension}"
+    command = [
+        ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+        "-i", video_path, "-i", subtitle_path,
+        "-map", "0:v", "-map", "0:a?", "-map", "1:s",
+        "-c", "copy", "-c:s", codec,
+        "-metadata:s:s:0", f"language={language}",
+        "-movflags", "+faststart",
+        partial_path,
+    ]
+    subprocess.run(command, check=True)
+    os.replace(partial_path, video_path)
+    return video_path
+
+
+def find_font(font_path=None):
+    """
+    คืนฟอนต์ที่กำหนด หรือฟอนต์ภาษาไทยตัวแรกที่พบในเครื่อง (None ถ้าไม่พบ)
+    """
+    if font_path:
+        return font_path
+    for path in THAI_FONTS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _load_font(font_path, font_size):
+    from PIL import ImageFont
+
+    key = (font_path, font_size)
+    if key not in _fonts:
+        if font_path:
+            _fonts[key] = ImageFont.truetype(font_path, font_size)
+        else:
+            print("ไม่พบฟอนต์ภาษาไทย (กำหนดได้ด้วย subtitle_font) จะใช้ฟอนต์เริ่มต้นของ Pillow")
+            try:
+                _fonts[key] = ImageFont.load_default(font_size)
+            except TypeError:
+                _fonts[key] = ImageFont.load_default()
+    return _fonts[key]
+
+
+def _can_break(previous, char):
+    # ตัดบรรทัดระหว่าง previous กับ char ได้หรือไม่ (ไม่แยกสระหรือวรรณยุกต์ออกจากพยัญชนะ)
+    return (unicodedata.category(char) != "Mn" and char not in _FOLLOWING_VOWELS
+            and previous not in _LEADING_VOWELS)
+
+
+def wrap_line(line, font, max_width):
+    """
+    ตัดบรรทัดให้กว้างไม่เกิน max_width พิกเซล
+    ตัดที่ช่องว่างก่อน ถ้าคำยาวเกิน (ภาษาไทยไม่เว้นวรรคระหว่างคำ) จะตัดระหว่างตัวอักษร
+    โดยไม่แยกสระหรือวรรณยุกต์ออกจากตัวอักษรที่อยู่ข้างหน้า
+    """
+    rows = []
+    current = ""
+    for word in line.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if font.getlength(candidate) <= max_width:
+            current = candidate
+            continue
+        if current:
+            rows.append(current)
+        current = ""
+        for char in word:
+            if current and _can_break(current[-1], char) and font.getlength(current + char) > max_width:
+                rows.append(current)
+                current = ""
+            current += char
+    if current:
+        rows.append(current)
+    return rows
+
+
+def render_line(line, path, width=512, font_path=None, font_size=28):
+    """
+    วาดบรรทัดคำบรรยายเป็นภาพ PNG โปร่งใส (ตัวอักษรสีขาวบนกรอบสีดำโปร่งแสง) กว้างเท่ากับวิดีโอ
+
+    Args:
+        line: ข้อความหนึ่งบรรทัด
+        path: ไฟล์ PNG ที่จะเขียน
+        width: ความกว้างของวิดีโอ
+        font_path: ไฟล์ฟอนต์ (None = ฟอนต์ภาษาไทยที่พบในเครื่อง)
+        font_size: ขนาดตัวอักษร
+    """
+    from PIL import Image, ImageDraw
+
+    with _render_lock:
+        font = _load_font(find_font(font_path), font_size)
+        padding = max(4, font_size // 4)
+        rows = wrap_line(line, font, width - 4 * padding)
+        ascent, descent = font.getmetrics()
+        row_height = ascent + descent
+        image = Image.new("RGBA", (width, row_height * len(rows) + 2 * padding), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        box_width = max(font.getlength(row) for row in rows) + 2 * padding
+        left = (width - box_width) / 2
+        draw.rectangle([left, 0, left + box_width, image.height], fill=(0, 0, 0, 150))
+        for i, row in enumerate(rows):
+            x = (width - font.getlength(row)) / 2
+            draw.text((x, padding + i * row_height), row, font=font, fill=(255, 255, 255, 255),
+                      stroke_width=1, stroke_fill=(0, 0, 0, 255))
+        image.save(path)
+    return path
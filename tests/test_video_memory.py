@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+# การประกอบวิดีโอแบบเป็นช่วง (video_window) ต้องใช้หน่วยความจำและจำนวนไฟล์ที่เปิดคงที่เมื่อจำนวนฉากเพิ่มขึ้น
+# แต่ละจำนวนฉากรันใน process แยกด้วย benchmarks/check_video_memory.py แล้วเทียบค่าที่เพิ่มขึ้นระหว่างกัน
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+from video_assembly import get_ffmpeg_exe  # noqa: E402
+
+SCRIPT = os.path.join(ROOT, "benchmarks", "check_video_memory.py")
+RSS_TOLERANCE_MB = 50.0
+FD_TOLERANCE = 4
+
+pytestmark = [
+    pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="ต้องใช้ /proc (Linux)"),
+    pytest.mark.skipif(get_ffmpeg_exe() is None, reason="ไม่พบ ffmpeg"),
+]
+
+
+def run_child(scenes, window=8):
+    command = [sys.executable, SCRIPT, "--child-scenes", str(scenes), "--mode", "windowed",
+               "--window", str(window), "--size", "64", "--fps", "5", "--seconds", "0.5"]
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_windowed_assembly_memory_is_flat():
+    for module in ("numpy", "PIL", "moviepy"):
+        pytest.importorskip(module)
+
+    small, large = run_child(10), run_child(40)
+
+    assert large["rss_growth_mb"] - small["rss_growth_mb"] <= RSS_TOLERANCE_MB
+    assert large["fd_growth"] - small["fd_growth"] <= FD_TOLERANCE
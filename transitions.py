@@ -0,0 +1,140 @@
+from video_assembly import get_ffmpeg_exe, raw_video_input, run_with_frames
+
+# transition ระหว่างฉาก (crossfade, fadeblack, slide) ที่สร้างเฉพาะเฟรมช่วงรอยต่อ
+#
+# ฉากเป็นภาพนิ่ง จึงคำนวณเฟรมของรอยต่อได้จากภาพสองภาพด้วย NumPy ทั้งเฟรมในครั้งเดียว
+# ส่วนที่เหลือของแต่ละฉากยังเป็น segment ภาพนิ่งตามเดิม (ไม่ต้องประกอบทุกเฟรมแบบ method="compose")
+#
+# รอยต่อใช้ช่วงท้ายของฉากก่อนหน้า (ช่วงเงียบ 1 วินาทีหลังเสียงพูด) ความยาวรวมของวิดีโอจึงไม่เปลี่ยน
+# เสียงของฉากก่อนหน้าในช่วงรอยต่อค่อย ๆ เบาลงพร้อมกับภาพ และเสียงของฉากถัดไปเริ่มเมื่อภาพของฉากนั้นเต็มจอ
+#
+#   [ฉาก A (ภาพนิ่ง)] [A -> B (เฉพาะเฟรมรอยต่อ)] [ฉาก B (ภาพนิ่ง)] ...
+
+TRANSITIONS = ("crossfade", "fadeblack", "slide")
+
+# จำนวนเฟรมที่คำนวณพร้อมกันต่อครั้ง (จำกัดหน่วยความจำที่ความละเอียดสูง)
+_BLOCK_FRAMES = 8
+
+
+def transition_seconds(duration, seconds, fps):
+    """
+    ความยาวจริงของรอยต่อ: ปัดเป็นจำนวนเฟรมเต็ม และไม่เกินครึ่งหนึ่งของความยาวฉากก่อนหน้า
+
+    Args:
+        duration: ความยาวของฉากก่อนหน้า (วินาที)
+        seconds: ความยาวของรอยต่อที่ต้องการ
+        fps: จำนวนเฟรมต่อวินาที
+
+    Returns:
+        ความยาวของรอยต่อ (วินาที) ที่เป็นจำนวนเฟรมเต็ม
+    """
+    frames = max(1, int(round(min(seconds, duration / 2) * fps)))
+    return frames / fps
+
+
+def load_frame(image_path, width, height):
+    """
+    อ่านภาพเป็น array uint8 (สูง, กว้าง, 3) ขนาดเท่ากับวิดีโอ
+    """
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.LANCZOS)
+        return np.asarray(image, dtype=np.uint8)
+
+
+def transition_frames(frame_a, frame_b, transition, count):
+    """
+    สร้างเฟรมของรอยต่อจากภาพ A ไปภาพ B ทีละกลุ่ม (คำนวณทั้งกลุ่มด้วย NumPy broadcasting)
+
+    Args:
+        frame_a, frame_b: array uint8 (สูง, กว้าง, 3) ขนาดเดียวกัน
+        transition: "crossfade", "fadeblack" หรือ "slide"
+        count: จำนวนเฟรมของรอยต่อ
+
+    Yields:
+        array uint8 (จำนวนเฟรมในกลุ่ม, สูง, กว้าง, 3)
+    """
+    import numpy as np
+
+    if transition not in TRANSITIONS:
+        raise ValueError(f"ไม่รู้จัก transition {transition} (เลือกได้: {', '.join(TRANSITIONS)})")
+    # ความคืบหน้าของแต่ละเฟรม (0 = ภาพ A, 1 = ภาพ B) ไม่รวมสองปลายที่เป็นภาพนิ่งของฉากอยู่แล้ว
+    progress = (np.arange(count, dtype=np.float32) + 0.5) / count
+    width = frame_a.shape[1]
+    a = frame_a.astype(np.float32)
+    b = frame_b.astype(np.float32)
+    difference = b - a
+
+    for start in range(0, count, _BLOCK_FRAMES):
+        t = progress[start:start + _BLOCK_FRAMES][:, None, None, None]
+        if transition == "crossfade":
+            block = a + difference * t
+        elif transition == "fadeblack":
+            # ครึ่งแรก A เฟดเป็นสีดำ ครึ่งหลังสีดำเฟดเป็น B
+            block = np.where(t < 0.5, a * (1 - 2 * t), b * (2 * t - 1))
+        else:
+            # B ดัน A ออกไปทางซ้าย (เร่งแล้วชะลอด้วย smoothstep)
+            eased = t[:, 0, 0, 0] * t[:, 0, 0, 0] * (3 - 2 * t[:, 0, 0, 0])
+            offsets = np.rint(eased * width).astype(np.intp)
+            block = np.empty((len(offsets),) + frame_a.shape, dtype=np.uint8)
+            for i, offset in enumerate(offsets):
+                block[i, :, :width - offset] = frame_a[:, offset:]
+                block[i, :, width - offset:] = frame_b[:, :offset]
+            yield block
+            continue
+        yield np.clip(block + 0.5, 0, 255).astype(np.uint8)
+
+
+def encode_transition_segment(scene_a, scene_b, segment_path, transition="crossfade", seconds=1.0,
+                              fps=24, width=512, height=512, audio_codec="aac", frame_a=None, frame_b=None):
+    """
+    เข้ารหัสรอยต่อจากฉาก A ไปฉาก B เป็น segment (เฉพาะเฟรมของรอยต่อ)
+
+    ภาพส่งเข้า ffmpeg เป็น raw RGB ผ่าน stdin ส่วนเสียงคือ seconds วินาทีสุดท้ายของฉาก A
+    ที่ค่อย ๆ เบาลงตลอดช่วงรอยต่อ (เส้นเดียวกับภาพ) ใช้ codec และขนาดเดียวกับ encode_scene_segment
+    จึงต่อกับ segment ของฉากด้วย concat_segments ได้โดยไม่ต้องเข้ารหัสใหม่
+
+    Args:
+        scene_a: ฉากก่อนหน้าที่มี "image_path", "audio_path" และ "duration"
+        scene_b: ฉากถัดไปที่มี "image_path"
+        segment_path: ไฟล์ segment ที่ต้องการ
+        transition: "crossfade", "fadeblack" หรือ "slide"
+        seconds: ความยาวของรอยต่อ (จาก transition_seconds)
+        fps: จำนวนเฟรมต่อวินาที
+        width, height: ขนาดภาพของวิดีโอ
+        audio_codec: codec ของเสียง
+        frame_a, frame_b: เฟรมต้นและปลายของรอยต่อ (array uint8) เมื่อฉากมีการเคลื่อนกล้อง
+            (เฟรมสุดท้ายของ A และเฟรมแรกของ B) None = ใช้ภาพนิ่งของฉาก
+    """
+    ffmpeg = get_ffmpeg_exe()
+    if ffmpeg is None:
+        raise RuntimeError("ไม่พบ ffmpeg")
+
+    count = int(round(seconds * fps))
+    if frame_a is None:
+        frame_a = load_frame(scene_a["image_path"], width, height)
+    if frame_b is None:
+        frame_b = load_frame(scene_b["image_path"], width, height)
+    audio_start = scene_a["duration"] - seconds
+    command = [
+        ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+        *raw_video_input(width, height, fps),
+        "-i", scene_a["audio_path"],
+        "-filter_complex",
+        f"[0:v]format=yuv420p[vout];"
+        f"[1:a]aresample=44100,aformat=channel_layouts=stereo,apad,"
+        f"atrim={audio_start:.6f}:{scene_a['duration']:.6f},asetpts=PTS-STARTPTS,"
+        f"afade=t=out:st=0:d={seconds:.6f}[aout]",
+        "-map", "[vout]", "-map", "[aout]",
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+        "-c:a", audio_codec, "-ar", "44100",
+        "-t", f"{seconds:.6f}",
+        segment_path,
+    ]
+    run_with_frames(command, (frame for block in transition_frames(frame_a, frame_b, transition, count)
+                              for frame in block))
+    return segment_path
@@ -0,0 +1,326 @@
+import os
+import math
+import time
+import wave
+import random
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# เอนจินแปลงข้อความเป็นเสียงพูด (Text-to-Speech) แบบเปลี่ยนได้
+# ทุกเอนจินเขียนเสียงลงไฟล์ชั่วคราวก่อน แล้วค่อยเปลี่ยนชื่อเป็นไฟล์จริง (os.rename)
+# synthesize_all สร้างเสียงหลายฉากพร้อมกันแบบจำกัดจำนวน พร้อมลองใหม่แบบ exponential backoff
+
+
+class TTSError(RuntimeError):
+    """
+    สร้างเสียงพูดไม่สำเร็จ
+    """
+
+
+class RateLimitError(TTSError):
+    """
+    บริการ TTS ปฏิเสธเพราะส่งคำขอถี่เกินไป
+
+    Args:
+        retry_after: จำนวนวินาทีที่บริการแนะนำให้รอ (ถ้ามี)
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TTSBackend:
+    """
+    อินเทอร์เฟซของเอนจิน TTS
+
+    คลาสลูกต้องกำหนด name, extension และเมธอด synthesize
+    """
+
+    name = None
+    extension = ".mp3"
+    # จำนวนข้อความต่อการเรียก synthesize_batch (1 = ส่งทีละข้อความพร้อมกันหลาย thread)
+    batch_size = 1
+
+    def synthesize(self, text, voice, output_path):
+        """
+        สร้างเสียงพูดแล้วบันทึกลงไฟล์
+
+        Args:
+            text: ข้อความที่ต้องการให้พูด
+            voice: การตั้งค่าเสียง (lang, slow)
+            output_path: ไฟล์ที่ต้องการบันทึก
+        """
+        raise NotImplementedError
+
+    def synthesize_batch(self, texts, voice, output_paths):
+        """
+        สร้างเสียงพูดหลายข้อความ (ค่าเริ่มต้นคือเรียก synthesize ทีละข้อความ)
+        """
+        for text, output_path in zip(texts, output_paths):
+            self.synthesize(text, voice, output_path)
+
+
+class GTTSBackend(TTSBackend):
+    """
+    Google Text-to-Speech (รองรับภาษาไทย ต้องเชื่อมต่ออินเทอร์เน็ต)
+    """
+
+    name = "gtts"
+    extension = ".mp3"
+
+    def synthesize(self, text, voice, output_path):
+        from gtts import gTTS
+        from gtts.tts import gTTSError
+
+        try:
+            gTTS(text=text, lang=voice["lang"], slow=voice["slow"]).save(output_path)
+        except gTTSError as e:
+            status = getattr(getattr(e, "rsp", None), "status_code", None)
+            if status == 429:
+                retry_after = e.rsp.headers.get("Retry-After")
+                raise RateLimitError(str(e), float(retry_after) if retry_after else None) from e
+            raise TTSError(str(e)) from e
+
+
+class ToneBackend(TTSBackend):
+    """
+    เอนจินจำลองที่ทำงานแบบออฟไลน์ สร้างเสียงโทนเดียวยาวตามจำนวนตัวอักษร
+    ใช้สำหรับทดสอบและ benchmark โดยไม่ต้องเชื่อมต่อบริการ TTS
+
+    Args:
+        seconds_per_char: ความยาวเสียงต่อหนึ่งตัวอักษร
+        latency: เวลาหน่วงจำลองต่อคำขอ (วินาที)
+        sample_rate: อัตราสุ่มตัวอย่างของเสียง
+    """
+
+    name = "tone"
+    extension = ".wav"
+
+    def __init__(self, seconds_per_char=0.06, latency=0.0, sample_rate=22050):
+        self.seconds_per_char = seconds_per_char
+        self.latency = latency
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text, voice, output_path):
+        if self.latency:
+            time.sleep(self.latency)
+        seconds = max(0.5, len(text) * self.seconds_per_char)
+        frequency = 200 + (sum(map(ord, text)) % 200)
+        samples = int(seconds * self.sample_rate)
+        frames = struct.pack(
+            f"<{samples}h",
+            *(int(6000 * math.sin(2 * math.pi * frequency * n / self.sample_rate)) for n in range(samples))
+        )
+        with wave.open(output_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(frames)
+
+
+class LocalTTSBackend(TTSBackend):
+    """
+    เอนจิน TTS ภาษาไทยแบบออฟไลน์ด้วย transformers (ค่าเริ่มต้น facebook/mms-tts-tha)
+    โหลดโมเดลครั้งเดียว แล้วสร้างเสียงเป็น batch และเขียนไฟล์ WAV ด้วย soundfile โดยตรง
+
+    Args:
+        model_name: ชื่อโมเดลบน HuggingFace
+        local_model_path: โฟลเดอร์ที่เก็บโมเดลไว้ใช้ครั้งต่อไป
+        batch_size: จำนวนข้อความต่อการเรียกโมเดลหนึ่งครั้ง
+    """
+
+    name = "local"
+    extension = ".wav"
+
+    def __init__(self, model_name="facebook/mms-tts-tha", local_model_path="./model_cache/tts-tha",
+                 batch_size=8):
+        self.model_name = model_name
+        self.local_model_path = local_model_path
+        self.batch_size = batch_size
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from transformers import AutoModelForTextToWaveform, AutoTokenizer
+        from model_store import load_pretrained, open_model
+
+        def load(path):
+            return AutoTokenizer.from_pretrained(path), load_pretrained(AutoModelForTextToWaveform, path)
+
+        def save(loaded, path):
+            loaded[0].save_pretrained(path)
+            loaded[1].save_pretrained(path, safe_serialization=True)
+
+        # โหลดจาก local ถ้าบันทึกไว้ครบแล้ว (memory-mapped) ไม่เช่นนั้นดาวน์โหลดแล้วบันทึกแบบ atomic
+        self._tokenizer, self._model = open_model(self.local_model_path, self.model_name, load, save)
+        self._model.eval()
+
+    def synthesize(self, text, voice, output_path):
+        self.synthesize_batch([text], voice, [output_path])
+
+    def synthesize_batch(self, texts, voice, output_paths):
+        import torch
+        import soundfile as sf
+
+        # โมเดลใช้ได้ทีละ batch จึงล็อกไว้ทั้งตอนโหลดและตอนสร้างเสียง
+        with self._lock:
+            if self._model is None:
+                self._load()
+            inputs = self._tokenizer(list(texts), return_tensors="pt", padding=True)
+            with torch.no_grad():
+                output = self._model(**inputs)
+
+        sample_rate = self._model.config.sampling_rate
+        waveforms = output.waveform.cpu().numpy()
+        # ตัดส่วนที่เกิดจากการ padding ของข้อความที่สั้นกว่าใน batch ออก
+        lengths = getattr(output, "sequence_lengths", None)
+        for i, output_path in enumerate(output_paths):
+            length = int(lengths[i]) if lengths is not None else waveforms.shape[-1]
+            sf.write(output_path, waveforms[i, :length], sample_rate, format="WAV", subtype="PCM_16")
+
+
+# เอนจินที่เลือกได้ด้วยชื่อใน voices.<ชื่อเสียง>.engine ของไฟล์โปรเจกต์
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    ToneBackend.name: ToneBackend,
+    LocalTTSBackend.name: LocalTTSBackend,
+}
+_instances = {}
+
+
+def register_backend(backend_class):
+    """
+    เพิ่มเอนจิน TTS ใหม่ (คลาสที่สืบทอดจาก TTSBackend)
+    """
+    BACKENDS[backend_class.name] = backend_class
+    _instances.pop(backend_class.name, None)
+    return backend_class
+
+
+def get_backend(name):
+    """
+    คืนเอนจิน TTS ตามชื่อ (สร้างครั้งเดียวแล้วใช้ซ้ำ)
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"ไม่รู้จักเอนจิน TTS {name} (เลือกได้: {', '.join(sorted(BACKENDS))})")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+def synthesize_with_retry(backend, text, voice, output_path, retries=3, backoff=1.0, max_backoff=30.0):
+    """
+    สร้างเสียงพูดลงไฟล์ชั่วคราวแล้วเปลี่ยนชื่อเป็น output_path โดยลองใหม่เมื่อผิดพลาด
+
+    Args:
+        backend: เอนจิน TTS
+        text: ข้อความที่ต้องการให้พูด
+        voice: การตั้งค่าเสียง
+        output_path: ไฟล์ที่ต้องการ
+        retries: จำนวนครั้งที่ลองใหม่ได้
+        backoff: เวลารอก่อนลองใหม่ครั้งแรก (เพิ่มเป็นสองเท่าทุกครั้ง)
+        max_backoff: เวลารอสูงสุดต่อครั้ง
+
+    Returns:
+        output_path
+    """
+    base, extension = os.path.splitext(output_path)
+    for attempt in range(retries + 1):
+        # ทำให้แน่ใจว่าไม่มีการทำงานซ้อนกัน
+        temp_path = f"{base}.tmp_{os.getpid()}_{attempt}{extension}"
+        try:
+            backend.synthesize(text, voice, temp_path)
+            # เปลี่ยนชื่อไฟล์จากชั่วคราวเป็นชื่อจริง
+            os.rename(temp_path, output_path)
+            return output_path
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if attempt == retries:
+                raise TTSError(f"สร้างเสียงพูดไม่สำเร็จหลังจากลอง {retries + 1} ครั้ง: {e}") from e
+
+            delay = min(max_backoff, backoff * (2 ** attempt))
+            if isinstance(e, RateLimitError):
+                # ถูกจำกัดอัตรา ให้รอนานขึ้น (หรือตามที่บริการแนะนำ)
+                delay = max(delay * 2, e.retry_after or 0)
+            delay *= random.uniform(0.8, 1.2)
+            print(f"  สร้างเสียงพูดไม่สำเร็จ ({e}) จะลองใหม่ใน {delay:.1f} วินาที")
+            time.sleep(delay)
+
+
+def synthesize_batch_with_retry(backend, texts, voice, output_paths, retries=3, backoff=1.0,
+                                max_backoff=30.0):
+    """
+    เหมือน synthesize_with_retry แต่สร้างเสียงหลายข้อความในการเรียกเอนจินครั้งเดียว
+    """
+    temp_paths = []
+    for attempt in range(retries + 1):
+        temp_paths = [
+            f"{os.path.splitext(path)[0]}.tmp_{os.getpid()}_{attempt}{os.path.splitext(path)[1]}"
+            for path in output_paths
+        ]
+        try:
+            backend.synthesize_batch(texts, voice, temp_paths)
+            # เปลี่ยนชื่อไฟล์จากชั่วคราวเป็นชื่อจริง
+            for temp_path, output_path in zip(temp_paths, output_paths):
+                os.rename(temp_path, output_path)
+            return list(output_paths)
+        except Exception as e:
+            for temp_path in temp_paths:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            if attempt == retries:
+                raise TTSError(f"สร้างเสียงพูดไม่สำเร็จหลังจากลอง {retries + 1} ครั้ง: {e}") from e
+            delay = min(max_backoff, backoff * (2 ** attempt)) * random.uniform(0.8, 1.2)
+            print(f"  สร้างเสียงพูดไม่สำเร็จ ({e}) จะลองใหม่ใน {delay:.1f} วินาที")
+            time.sleep(delay)
+
+
+def synthesize_all(requests, backend, max_concurrency=4, retries=3, backoff=1.0):
+    """
+    สร้างเสียงพูดหลายรายการพร้อมกันแบบจำกัดจำนวน
+
+    Args:
+        requests: รายการ tuple (ข้อความ, การตั้งค่าเสียง, ไฟล์ที่ต้องการ)
+        backend: เอนจิน TTS
+        max_concurrency: จำนวนคำขอที่ส่งพร้อมกันได้
+        retries: จำนวนครั้งที่ลองใหม่ได้ต่อรายการ
+        backoff: เวลารอก่อนลองใหม่ครั้งแรก
+
+    Returns:
+        รายการไฟล์เสียงตามลำดับเดิมของ requests
+    """
+    requests = list(requests)
+    if not requests:
+        return []
+
+    if backend.batch_size > 1:
+        # เอนจินแบบ local ใช้ CPU/GPU เต็มอยู่แล้ว ส่งเป็น batch ทีละกลุ่มแทนการส่งพร้อมกันหลาย thread
+        # (ข้อความใน batch เดียวกันต้องใช้การตั้งค่าเสียงเดียวกัน)
+        paths = []
+        for start in range(0, len(requests), backend.batch_size):
+            group = requests[start:start + backend.batch_size]
+            for voice_group in _group_by_voice(group):
+                texts, voices, output_paths = zip(*voice_group)
+                synthesize_batch_with_retry(backend, texts, voices[0], output_paths, retries, backoff)
+            paths.extend(output_path for _, _, output_path in group)
+        return paths
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(requests))),
+                            thread_name_prefix="tts") as executor:
+        futures = [
+            executor.submit(synthesize_with_retry, backend, text, voice, output_path, retries, backoff)
+            for text, voice, output_path in requests
+        ]
+        # รอผลตามลำดับเดิม เพื่อให้ลำดับฉากไม่เปลี่ยน
+        return [future.result() for future in futures]
+
+
+def _group_by_voice(requests):
+    groups = {}
+    for text, voice, output_path in requests:
+        groups.setdefault(tuple(sorted(voice.items())), []).append((text, voice, output_path))
+    return list(groups.values())
@@ -0,0 +1,447 @@
+import gc
+import os
+import shutil
+import tempfile
+import itertools
+import subprocess
+
+# ประกอบวิดีโอจากภาพนิ่งและเสียงของแต่ละฉาก
+# เอนจิน "ffmpeg" ส่งภาพนิ่งเข้า encoder โดยตรงผ่าน concat demuxer ของ ffmpeg
+# จึงไม่ต้องประกอบ (composite) ทุกเฟรมใน Python เหมือน MoviePy
+# เอนจิน "moviepy" คือวิธีเดิม ใช้เป็นทางสำรองเมื่อไม่มี ffmpeg หรือ ffmpeg ทำงานไม่สำเร็จ
+#
+# โปรเจกต์ยาว ๆ ประกอบแบบเป็นช่วง (window): เปิดภาพและเสียงครั้งละไม่เกิน window ฉาก
+# เขียนแต่ละช่วงเป็นไฟล์ย่อยแล้วปิด clip ทันที จากนั้นต่อไฟล์ย่อยแบบ stream copy
+# หน่วยความจำและจำนวนไฟล์ที่เปิดอยู่จึงไม่เพิ่มตามจำนวนฉาก
+#
+# ฉากที่มี "subtitles" (รายการ {"image_path", "start", "end"} จาก subtitles.render_line) จะถูกซ้อนภาพ
+# คำบรรยายที่วาดไว้แล้วในช่วงเวลาของแต่ละบรรทัด (ดู subtitles.py)
+
+VIDEO_ENGINES = ("ffmpeg", "moviepy")
+
+
+def get_ffmpeg_exe():
+    """
+    หาเส้นทางของ ffmpeg (ใช้ตัวที่มากับ imageio-ffmpeg ก่อน แล้วค่อยหาใน PATH)
+
+    Returns:
+        เส้นทางของ ffmpeg หรือ None ถ้าไม่พบ
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which("ffmpeg")
+
+
+def _concat_path(path):
+    # concat demuxer ต้องการ path ที่ escape เครื่องหมาย ' และใช้ / เป็นตัวคั่น
+    return os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+
+
+def write_image_concat_list(scenes, list_path):
+    """
+    เขียนไฟล์รายการภาพสำหรับ concat demuxer โดยกำหนดระยะเวลาของแต่ละภาพ
+
+    Args:
+        scenes: รายการฉากที่มี "image_path" และ "duration"
+        list_path: ไฟล์รายการที่จะเขียน
+    """
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for scene in scenes:
+            f.write(f"file '{_concat_path(scene['image_path'])}'\n")
+            f.write(f"duration {scene['duration']:.6f}\n")
+        # concat demuxer จะไม่ใช้ duration ของภาพสุดท้าย ถ้าไม่ใส่ภาพสุดท้ายซ้ำอีกครั้ง
+        if scenes:
+            f.write(f"file '{_concat_path(scenes[-1]['image_path'])}'\n")
+
+
+def write_filter_script(scenes, script_path, video_filter, first_input=1):
+    """
+    เขียน filtergraph ของภาพ และต่อเสียงของทุกฉากโดยเติมความเงียบให้ยาวเท่ากับ duration ของฉาก
+
+    Args:
+        scenes: รายการฉากที่มี "audio_path" และ "duration"
+        script_path: ไฟล์ filtergraph ที่จะเขียน
+        video_filter: filtergraph ของภาพที่ลงท้ายด้วย [vout] (จาก build_video_filter)
+        first_input: ลำดับ input ของไฟล์เสียงฉากแรกในคำสั่ง ffmpeg
+    """
+    labels = []
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(f"{video_filter};\n")
+        for i, scene in enumerate(scenes):
+            label = f"a{i}"
+            f.write(
+                f"[{first_input + i}:a]aresample=44100,aformat=channel_layouts=stereo,"
+                f"apad,atrim=0:{scene['duration']:.6f},asetpts=PTS-STARTPTS[{label}];\n"
+            )
+            labels.append(f"[{label}]")
+        f.write(f"{''.join(labels)}concat=n={len(scenes)}:v=0:a=1[aout]\n")
+
+
+def build_video_filter(scenes, fps, fade_in=0.0):
+    """
+    สร้าง filtergraph ของภาพ (ลงท้ายด้วย [vout]): กำหนด fps, ปรับขนาดให้เป็นเลขคู่
+    และเฟดเข้าจากสีดำที่ต้นฉาก (ถ้ากำหนด ยกเว้นฉากแรก)
+
+    ไม่มีเฟด: input 0 คือรายการภาพ (concat demuxer)
+    มีเฟด: input 0 ถึง len(scenes) - 1 คือภาพของแต่ละฉาก (ดู image_inputs) เฟดแต่ละฉากก่อนต่อด้วย concat
+    (fade=t=in บน stream ที่ต่อแล้วทำให้ทุกเฟรมก่อน st เป็นสีดำ ฉากก่อนหน้าจึงหายไปทั้งฉาก)
+    """
+    base = f"fps={fps},scale=trunc(iw/2)*2:trunc(ih/2)*2"
+    if fade_in <= 0:
+        return f"[0:v]{base},format=yuv420p[vout]"
+    parts = []
+    labels = []
+    for i, scene in enumerate(scenes):
+        fade = f",fade=t=in:st=0:d={fade_in}" if i > 0 else ""
+        parts.append(f"[{i}:v]{base}{fade},setsar=1[v{i}]")
+        labels.append(f"[v{i}]")
+    parts.append(f"{''.join(labels)}concat=n={len(scenes)}:v=1:a=0,format=yuv420p[vout]")
+    return ";\n".join(parts)
+
+
+def image_inputs(scenes, fps):
+    """
+    input ของภาพแยกตามฉาก (ภาพนิ่งวนซ้ำยาวเท่ากับ duration ของฉาก) ใช้เมื่อต้องเฟดแต่ละฉาก
+    """
+    command = []
+    for scene in scenes:
+        command += ["-loop", "1", "-framerate", str(fps), "-t", f"{scene['duration']:.6f}",
+                    "-i", scene["image_path"]]
+    return command
+
+
+def assemble_with_ffmpeg(scenes, output_path, fps=24, fade_in=0.0, audio_codec="aac"):
+    """
+    ประกอบวิดีโอด้วย ffmpeg โดยตรง ภาพนิ่งแต่ละภาพถูกส่งเข้า encoder เพียงครั้งเดียว
+
+    Args:
+        scenes: รายการฉากที่มี "image_path", "audio_path" และ "duration"
+        output_path: ไฟล์วิดีโอที่ต้องการ
+        fps: จำนวนเฟรมต่อวินาที
+        fade_in: ระยะเวลาเฟดเข้าจากสีดำของแต่ละฉาก (ยกเว้นฉากแรก)
+        audio_codec: codec ของเสียง
+    """
+    ffmpeg = get_ffmpeg_exe()
+    if ffmpeg is None:
+        raise RuntimeError("ไม่พบ ffmpeg")
+
+    with tempfile.TemporaryDirectory(prefix="shotvdo_") as work_dir:
+        list_path = os.path.join(work_dir, "images.ffconcat")
+        filter_path = os.path.join(work_dir, "filter.txt")
+        command = [ffmpeg, "-y", "-hide_banner", "-loglevel", "error"]
+        if fade_in > 0:
+            command += image_inputs(scenes, fps)
+            first_input = len(scenes)
+        else:
+            write_image_concat_list(scenes, list_path)
+            command += ["-f", "concat", "-safe", "0", "-i", list_path]
+            first_input = 1
+        write_filter_script(scenes, filter_path, build_video_filter(scenes, fps, fade_in), first_input)
+
+        for scene in scenes:
+            command += ["-i", scene["audio_path"]]
+        command += [
+            "-filter_complex_script", filter_path,
+            "-map", "[vout]", "-map", "[aout]",
+            "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+            "-c:a", audio_codec,
+            "-t", f"{sum(scene['duration'] for scene in scenes):.6f}",
+            output_path,
+        ]
+        subprocess.run(command, check=True)
+
+
+def raw_video_input(width, height, fps):
+    """
+    อาร์กิวเมนต์ input ของ ffmpeg สำหรับเฟรม RGB ที่ส่งผ่าน stdin (ใช้กับ run_with_frames)
+    """
+    return ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-framerate", str(fps), "-i", "pipe:0"]
+
+
+def run_with_frames(command, frames):
+    """
+    รัน ffmpeg แล้วส่งเฟรม (bytes ของ rgb24) เข้า stdin ทีละเฟรม ไม่เก็บเฟรมทั้งหมดไว้ในหน่วยความจำ
+
+    Args:
+        command: คำสั่ง ffmpeg ที่มี raw_video_input เป็น input
+        frames: iterator ของเฟรม (bytes หรือ array ที่มี tobytes)
+    """
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for frame in frames:
+            process.stdin.write(frame if isinstance(frame, bytes) else frame.tobytes())
+    except BrokenPipeError:
+        # ffmpeg หยุดก่อน (เช่นครบ -t แล้ว หรือเกิดข้อผิดพลาด) ดูจาก returncode
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command)
+
+
+def encode_scene_segment(scene, segment_path, fps=24, width=512, height=512, fade_in=0.0,
+                         audio_codec="aac", frames=None):
+    """
+    เข้ารหัสฉากเดียวเป็นไฟล์วิดีโอย่อย (segment) เพื่อนำไปต่อกันภายหลังด้วย concat_segments
+
+    ทุก segment ใช้ขนาดภาพ fps และรูปแบบเสียงเดียวกัน จึงต่อกันได้โดยไม่ต้องเข้ารหัสใหม่
+
+    Args:
+        scene: ฉากที่มี "image_path", "audio_path", "duration" และ "subtitles" (ถ้ามี)
+        segment_path: ไฟล์ segment ที่ต้องการ
+        fps: จำนวนเฟรมต่อวินาที
+        width, height: ขนาดภาพของวิดีโอ
+        fade_in: ระยะเวลาเฟดเข้าจากสีดำที่ต้นฉาก (0 = ไม่เฟด)
+        audio_codec: codec ของเสียง
+        frames: iterator ของเฟรม RGB ขนาด width x height (เช่นจาก motion.motion_frames)
+            None = ใช้ภาพนิ่งของฉากตลอดทั้งฉาก
+    """
+    ffmpeg = get_ffmpeg_exe()
+    if ffmpeg is None:
+        raise RuntimeError("ไม่พบ ffmpeg")
+
+    duration = f"{scene['duration']:.6f}"
+    subtitles = scene.get("subtitles") or []
+    # ภาพคำบรรยายเป็น input ที่ 2 เป็นต้นไป ซ้อนที่ด้านล่างของภาพเฉพาะช่วงเวลาของบรรทัดนั้น
+    video_filter = f"[0:v]scale={width}:{height},fps={fps}[v0];"
+    for i, subtitle in enumerate(subtitles):
+        video_filter += (f"[v{i}][{i + 2}:v]overlay=(W-w)/2:H-h-H/20:"
+                         f"enable='between(t,{subtitle['start']:.3f},{subtitle['end']:.3f})'[v{i + 1}];")
+    video_filter += f"[v{len(subtitles)}]"
+    if fade_in > 0:
+        video_filter += f"fade=t=in:st=0:d={fade_in},"
+    video_filter += "format=yuv420p[vout]"
+
+    command = [ffmpeg, "-y", "-hide_banner", "-loglevel", "error"]
+    if frames is None:
+        command += ["-loop", "1", "-framerate", str(fps), "-i", scene["image_path"]]
+    else:
+        command += raw_video_input(width, height, fps)
+    command += ["-i", scene["audio_path"]]
+    for subtitle in subtitles:
+        command += ["-i", subtitle["image_path"]]
+    command += [
+        "-filter_complex",
+        f"{video_filter};"
+        f"[1:a]aresample=44100,aformat=channel_layouts=stereo,apad,atrim=0:{duration}[aout]",
+        "-map", "[vout]", "-map", "[aout]",
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+        "-c:a", audio_codec, "-ar", "44100",
+        "-t", duration,
+        segment_path,
+    ]
+    if frames is None:
+        subprocess.run(command, check=True)
+    else:
+        run_with_frames(command, frames)
+    return segment_path
+
+
+def concat_segments(segment_paths, output_path, audio_path=None):
+    """
+    ต่อ segment ที่เข้ารหัสแล้วเป็นวิดีโอเดียวแบบ stream copy (ไม่เข้ารหัสใหม่)
+
+    Args:
+        segment_paths: รายการไฟล์ segment ตามลำดับ
+        output_path: ไฟล์วิดีโอที่ต้องการ
+        audio_path: track เสียงของทั้งเรื่อง (เช่นจาก audio_mix.mix_track) ใช้แทนเสียงของ segment
+            ภาพยังเป็น stream copy และเข้ารหัสเฉพาะเสียงครั้งเดียว
+    """
+    ffmpeg = get_ffmpeg_exe()
+    if ffmpeg is None:
+        raise RuntimeError("ไม่พบ ffmpeg")
+
+    with tempfile.TemporaryDirectory(prefix="shotvdo_") as work_dir:
+        list_path = os.path.join(work_dir, "segments.ffconcat")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("ffconcat version 1.0\n")
+            for path in segment_paths:
+                f.write(f"file '{_concat_path(path)}'\n")
+        # เขียนไฟล์ชั่วคราวก่อน ถ้าหยุดกลางคันจะไม่เหลือไฟล์วิดีโอที่ไม่สมบูรณ์
+        root, extension = os.path.splitext(output_path)
+        partial_path = f"{root}.partial{extension}"
+        command = [
+            ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+        ]
+        if audio_path:
+            command += ["-i", audio_path, "-map", "0:v", "-map", "1:a",
+                        "-c:v", "copy", "-c:a", "aac", "-b:a", "192k", "-ar", "44100"]
+        else:
+            command += ["-c", "copy"]
+        command += ["-movflags", "+faststart", partial_path]
+        subprocess.run(command, check=True)
+        os.replace(partial_path, output_path)
+
+
+def _with_subtitles(clip, scene):
+    # ซ้อนภาพคำบรรยายที่วาดไว้แล้ว (ไม่สร้าง TextClip ใหม่ในแต่ละเฟรม)
+    subtitles = scene.get("subtitles")
+    if not subtitles:
+        return clip
+    from moviepy.editor import CompositeVideoClip, ImageClip
+
+    layers = [clip]
+    for subtitle in subtitles:
+        layers.append(ImageClip(subtitle["image_path"], transparent=True)
+                      .set_start(subtitle["start"]).set_duration(subtitle["end"] - subtitle["start"])
+                      .set_position(("center", "bottom")))
+    return CompositeVideoClip(layers, size=clip.size).set_duration(clip.duration).set_audio(clip.audio)
+
+
+def assemble_with_moviepy(scenes, output_path, fps=24, fade_in=0.0, audio_codec="aac"):
+    """
+    ประกอบวิดีโอด้วย MoviePy (วิธีเดิม ประกอบทุกเฟรมใน Python)
+
+    Args:
+        เหมือนกับ assemble_with_ffmpeg
+    """
+    from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
+
+    video_clips = []
+    for i, scene in enumerate(scenes):
+        print(f"กำลังสร้างคลิปที่ {i+1}/{len(scenes)}")
+
+        # สร้าง clip จากภาพ กำหนดให้ความยาวเท่ากับความยาวของเสียง
+        img_clip = ImageClip(scene["image_path"]).set_duration(scene["duration"])
+
+        # เพิ่มเสียงพูด
+        audio_clip = AudioFileClip(scene["audio_path"])
+        img_clip = img_clip.set_audio(audio_clip)
+
+        # เพิ่มคำบรรยาย (ภาพที่วาดไว้แล้วใน subtitles.py)
+        img_clip = _with_subtitles(img_clip, scene)
+
+        # เพิ่ม transition (crossfade) ระหว่างฉาก เริ่มจากฉากที่ 2 เป็นต้นไป
+        if i > 0 and fade_in > 0:
+            img_clip = img_clip.crossfadein(fade_in)
+
+        video_clips.append(img_clip)
+
+    # รวม clip ทั้งหมด
+    final_clip = concatenate_videoclips(video_clips, method="compose")
+
+    # บันทึกวิดีโอ
+    final_clip.write_videofile(output_path, fps=fps, audio_codec=audio_codec)
+
+
+def _close_clip(clip):
+    # ปิดตัวอ่านเสียง (ffmpeg subprocess) และคืนหน่วยความจำของเฟรม
+    if clip.audio is not None:
+        clip.audio.close()
+    clip.close()
+
+
+def assemble_with_moviepy_windowed(scenes, output_path, fps=24, fade_in=0.0, audio_codec="aac", window=32):
+    """
+    ประกอบวิดีโอด้วย MoviePy ทีละช่วง ช่วงละไม่เกิน window ฉาก แล้วต่อทุกช่วงแบบ stream copy
+
+    เปิด ImageClip และ AudioFileClip พร้อมกันไม่เกิน window ฉาก และปิดทันทีหลังเขียนช่วงนั้นเสร็จ
+    จึงสร้างวิดีโอยาวระดับชั่วโมงได้โดยใช้หน่วยความจำคงที่
+
+    Args:
+        scenes: รายการ (หรือ iterator) ของฉากที่มี "image_path", "audio_path" และ "duration"
+        output_path: ไฟล์วิดีโอที่ต้องการ
+        fps: จำนวนเฟรมต่อวินาที
+        fade_in: ระยะเวลาเฟดเข้าจากสีดำของแต่ละฉาก (ยกเว้นฉากแรก)
+        audio_codec: codec ของเสียง
+        window: จำนวนฉากที่เปิดพร้อมกันสูงสุด
+    """
+    from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
+
+    scenes = iter(scenes)
+    index = 0
+    with tempfile.TemporaryDirectory(prefix="shotvdo_") as work_dir:
+        parts = []
+        while True:
+            batch = list(itertools.islice(scenes, max(1, window)))
+            if not batch:
+                break
+            clips = []
+            try:
+                for scene in batch:
+                    clip = ImageClip(scene["image_path"]).set_duration(scene["duration"])
+                    clip = _with_subtitles(clip.set_audio(AudioFileClip(scene["audio_path"])), scene)
+                    if index > 0 and fade_in > 0:
+                        clip = clip.crossfadein(fade_in)
+                    clips.append(clip)
+                    index += 1
+                print(f"กำลังบันทึกช่วงที่ {len(parts) + 1} (ฉากที่ {index - len(batch) + 1}-{index})")
+                part_path = os.path.join(work_dir, f"part_{len(parts):05d}.mp4")
+                part = concatenate_videoclips(clips, method="compose")
+                # ทุกช่วงใช้ codec, fps และอัตราสุ่มเสียงเดียวกัน จึงต่อกันได้โดยไม่ต้องเข้ารหัสใหม่
+                part.write_videofile(part_path, fps=fps, codec="libx264", audio_codec=audio_codec,
+                                     audio_fps=44100, preset="veryfast", logger=None)
+                part.close()
+                parts.append(part_path)
+            finally:
+                for clip in clips:
+                    _close_clip(clip)
+                del clips
+                gc.collect()
+
+        if not parts:
+            raise ValueError("ไม่มีฉากสำหรับประกอบวิดีโอ")
+        if len(parts) == 1:
+            shutil.move(parts[0], output_path)
+        else:
+            concat_segments(parts, output_path)
+
+
+def assemble_with_segments(scenes, output_path, fps=24, width=512, height=512, fade_in=0.0, audio_codec="aac"):
+    """
+    ประกอบวิดีโอด้วย ffmpeg โดยเข้ารหัสทีละฉากเป็นไฟล์ชั่วคราวแล้วต่อแบบ stream copy
+    (ffmpeg เปิดไฟล์ของฉากเดียวต่อครั้ง แทนการเปิดเสียงของทุกฉากพร้อมกันใน filtergraph เดียว)
+    """
+    with tempfile.TemporaryDirectory(prefix="shotvdo_") as work_dir:
+        segments = []
+        for i, scene in enumerate(scenes):
+            segment_path = os.path.join(work_dir, f"scene_{i:06d}.mp4")
+            encode_scene_segment(scene, segment_path, fps, width, height, fade_in if i > 0 else 0.0, audio_codec)
+            segments.append(segment_path)
+        if not segments:
+            raise ValueError("ไม่มีฉากสำหรับประกอบวิดีโอ")
+        concat_segments(segments, output_path)
+
+
+def assemble_video(scenes, output_path, fps=24, engine="ffmpeg", fade_in=0.0, audio_codec="aac",
+                   window=None, size=(512, 512)):
+    """
+    ประกอบวิดีโอด้วยเอนจินที่เลือก ถ้า ffmpeg ใช้งานไม่ได้จะกลับไปใช้ MoviePy
+
+    Args:
+        scenes: รายการฉากที่มี "image_path", "audio_path" และ "duration"
+        output_path: ไฟล์วิดีโอที่ต้องการ
+        fps: จำนวนเฟรมต่อวินาที
+        engine: "ffmpeg" หรือ "moviepy"
+        fade_in: ระยะเวลาเฟดเข้าของแต่ละฉาก (ยกเว้นฉากแรก)
+        audio_codec: codec ของเสียง
+        window: ถ้ามีฉากมากกว่านี้ จะประกอบทีละช่วงเพื่อให้หน่วยความจำคงที่ (None หรือ 0 = ประกอบทั้งเรื่องในครั้งเดียว)
+        size: (กว้าง, สูง) ของวิดีโอ ใช้เมื่อประกอบทีละฉากด้วย ffmpeg
+    """
+    if engine not in VIDEO_ENGINES:
+        raise ValueError(f"ไม่รู้จักเอนจิน {engine} (เลือกได้: {', '.join(VIDEO_ENGINES)})")
+    windowed = bool(window) and len(scenes) > window
+
+    if engine == "ffmpeg":
+        try:
+            # คำบรรยายแบบ burn ซ้อนทีละฉากตอนเข้ารหัส segment
+            if windowed or any(scene.get("subtitles") for scene in scenes):
+                assemble_with_segments(scenes, output_path, fps, size[0], size[1], fade_in, audio_codec)
+            else:
+                assemble_with_ffmpeg(scenes, output_path, fps, fade_in, audio_codec)
+            return
+        except (RuntimeError, OSError, subprocess.CalledProcessError) as e:
+            print(f"ไม่สามารถประกอบวิดีโอด้วย ffmpeg ได้ ({e}) จะใช้ MoviePy แทน")
+
+    if windowed:
+        assemble_with_moviepy_windowed(scenes, output_path, fps, fade_in, audio_codec, window)
+    else:
+        assemble_with_moviepy(scenes, output_path, fps, fade_in, audio_codec)
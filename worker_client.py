@@ -0,0 +1,64 @@
+import json
+
+# ไคลเอนต์สำหรับส่งงานไปยัง model_worker.py ที่รันค้างไว้บนเครื่องเดียวกัน
+# ใช้เฉพาะไลบรารีมาตรฐาน เพื่อไม่ให้ฝั่งไคลเอนต์ต้อง import torch หรือ diffusers
+# urllib.request (ซึ่ง import ssl และ http) จะ import เมื่อเรียก worker จริงเท่านั้น
+
+DEFAULT_WORKER_URL = "http://127.0.0.1:8765"
+
+
+class WorkerError(RuntimeError):
+    """
+    ข้อผิดพลาดที่ worker ส่งกลับมา หรือเชื่อมต่อ worker ไม่ได้
+    """
+
+
+def call_worker(url, job, payload, timeout=3600):
+    """
+    ส่งงานไปยัง worker และรอผลลัพธ์
+
+    Args:
+        url: URL ของ worker เช่น http://127.0.0.1:8765
+        job: ชื่องาน ("generate_images", "caption" หรือ "ocr")
+        payload: ข้อมูลของงานในรูปแบบ dict
+        timeout: เวลารอสูงสุด (วินาที)
+
+    Returns:
+        dict ผลลัพธ์จาก worker
+    """
+    import urllib.request
+    import urllib.error
+
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/{job}",
+        data=data,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", errors="replace")
+        raise WorkerError(f"worker ตอบกลับด้วยข้อผิดพลาด {e.code}: {detail}") from e
+    except urllib.error.URLError as e:
+        raise WorkerError(f"ไม่สามารถเชื่อมต่อ worker ที่ {url}: {e.reason}") from e
+
+    if "error" in result:
+        raise WorkerError(result["error"])
+    return result
+
+
+def worker_available(url, timeout=1.0):
+    """
+    ตรวจสอบว่า worker กำลังทำงานอยู่หรือไม่
+    """
+    import urllib.request
+    import urllib.error
+
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/health", timeout=timeout) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False